@@ -1,12 +1,710 @@
 #!/bin/env python3.6
 
-import argparse, sys
+import argparse, sys, operator
 import xml.etree.ElementTree as ET
 import re
+import base64, collections, gc, hashlib, io, itertools, json, mmap, os, pickle, select, signal, socket, stat, struct, tempfile, time, traceback
+
+#
+# Neměnný popis operandu instrukce, vzniká jednou při načítání programu z XML elementu argN.
+#
+# kind: druh operandu (var, const, label, type), u formálně nevalidního operandu None
+# frame, name: rámec a jméno proměnné, u návěští jeho jméno
+# slot: index proměnné v poli rámce (GF má vlastní číslování, LF a TF sdílí společné)
+# value, type: dekódovaná hodnota a typ konstanty, u operandu typu type jméno typu,
+#              u návěští index instrukce za cílovým návěštím (doplní se po načtení celého programu)
+#
+# Vstup: <arg1 type="var">GF@val</arg1>
+#        <arg2 type="int">5</arg2>
+#
+class Operand:
+
+    __slots__ = ('kind', 'frame', 'name', 'slot', 'value', 'type')
+
+    def __init__(self, kind, frame = None, name = None, slot = None, value = None, type = None):
+        object.__setattr__(self, 'kind', kind)
+        object.__setattr__(self, 'frame', frame)
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'slot', slot)
+        object.__setattr__(self, 'value', value)
+        object.__setattr__(self, 'type', type)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Operand je neměnný')
+
+    # serializace do mezipaměti přeložených programů (obnovení přes konstruktor)
+    def __reduce__(self):
+        return (Operand, (self.kind, self.frame, self.name, self.slot, self.value, self.type))
+
+#
+# Záznam proměnné v rámci, hodnota a typ se při zápisu mění na místě.
+# Rámec je pole záznamů indexované slotem proměnné, nedefinovaná proměnná má ve slotu None.
+#
+class Variable:
+
+    __slots__ = ('value', 'type')
+
+    def __init__(self, value = None, type = None):
+        self.value = value
+        self.type = type
+
+#
+# Hodnota nil@nil, jediná instance NilValue (Nil). Ostatní typy mají nativní hodnoty Pythonu:
+# int, float, str a bool (True, False).
+#
+class NilValue:
+
+    __slots__ = ()
+
+    def __str__(self):
+        return 'nil'
+
+    # výraz v Pythonu (kód generovaný jádrem transpile)
+    def __repr__(self):
+        return 'Nil'
+
+    # při deserializaci z mezipaměti se obnoví stejná instance
+    def __reduce__(self):
+        return 'Nil'
+
+Nil = NilValue()
+
+#
+# Rozpracovaný řetězec proměnné, kterou program prodlužuje instrukcí CONCAT (cíl je zároveň prvním
+# operandem) nebo mění instrukcí SETCHAR. Znaky jsou v měnitelném bufferu (io.StringIO), takže
+# připojení je amortizovaně O(1) a záměna znaku O(1). Hodnota str se sestaví až při čtení celého
+# řetězce (WRITE, porovnání, ...) a uchová se do další změny, délka se udržuje průběžně.
+#
+# Řetězec patří jediné proměnné, MOVE a POPS předávají jeho neměnnou hodnotu str. Pro čtení se chová
+# jako str (len, indexace, porovnání, +).
+#
+class StringBuilder:
+
+    __slots__ = ('buffer', 'length', 'text')
+
+    def __init__(self, text):
+        self.buffer = io.StringIO(newline = '')
+        self.buffer.write(text)
+        self.length = len(text)
+        self.text = text
+
+    def append(self, piece):
+        if(piece.__class__ is not str):
+            piece = str(piece)
+        self.buffer.write(piece)
+        self.length += len(piece)
+        self.text = None
+
+    def setChar(self, position, char):
+        buffer = self.buffer
+        buffer.seek(position)
+        buffer.write(char)
+        buffer.seek(self.length)
+        self.text = None
+
+    def __str__(self):
+        if(self.text is None):
+            self.text = self.buffer.getvalue()
+        return self.text
+
+    def __repr__(self):
+        return repr(str(self))
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, position):
+        return str(self)[position]
+
+    def __add__(self, other):
+        if(isinstance(other, (str, StringBuilder))):
+            return str(self) + str(other)
+        return NotImplemented
+
+    def __radd__(self, other):
+        if(isinstance(other, (str, StringBuilder))):
+            return str(other) + str(self)
+        return NotImplemented
+
+    def __eq__(self, other):
+        if(isinstance(other, (str, StringBuilder))):
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        if(isinstance(other, (str, StringBuilder))):
+            return str(self) != str(other)
+        return NotImplemented
+
+    def __lt__(self, other):
+        if(isinstance(other, (str, StringBuilder))):
+            return str(self) < str(other)
+        return NotImplemented
+
+    def __gt__(self, other):
+        if(isinstance(other, (str, StringBuilder))):
+            return str(self) > str(other)
+        return NotImplemented
+
+    __hash__ = None
+
+#
+# Výstupní vyrovnávací paměť instrukce WRITE, výstup se hromadí v paměti a do proudu se zapíše
+# po dosažení zadané velikosti (limit 0 zapisuje každý zápis rovnou).
+# Vyprázdnění se volá při řádném ukončení, instrukci EXIT a před každou chybou.
+#
+class OutputBuffer:
+
+    __slots__ = ('stream', 'limit', 'chunks', 'size')
+
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.limit = limit
+        self.chunks = []
+        self.size = 0
+
+    def write(self, text):
+        self.chunks.append(text)
+        self.size += len(text)
+        if(self.size >= self.limit):
+            self.flush()
+
+    def flush(self):
+        if(self.chunks):
+            self.stream.write(''.join(self.chunks))
+            self.chunks = []
+            self.size = 0
+        self.stream.flush()
+
+#
+# Vstup instrukce READ dodávaný po částech (Session.feed). Funkce readline vrací jen celé řádky,
+# nedokončený poslední řádek až po uzavření vstupu (close), poté prázdný řetězec jako konec vstupu.
+#
+class InputQueue:
+
+    __slots__ = ('lines', 'partial', 'closed')
+
+    def __init__(self):
+        self.lines = collections.deque()
+        self.partial = ''
+        self.closed = False
+
+    def feed(self, text):
+        lines = (self.partial + text).split('\n')
+        self.partial = lines.pop()
+        self.lines.extend(line + '\n' for line in lines)
+
+    def close(self):
+        self.closed = True
+
+    #
+    # Vrátí, zda readline nebude čekat na další vstup
+    #
+    def ready(self):
+        return bool(self.lines) or self.closed
+
+    def readline(self):
+        if(self.lines):
+            return self.lines.popleft()
+        line = self.partial
+        self.partial = ''
+        return line
+
+#
+# Zásobárna lokálních rámců (polí slotů proměnných). Rámec zahozený instrukcí CREATEFRAME nebo
+# POPFRAME se vyprázdní a vrátí do zásobárny, nový rámec se přednostně odebere z ní. Alokovaných
+# rámců tak nikdy není víc než nejvíce současně existujících rámců programu.
+#
+class FramePool:
+
+    __slots__ = ('blank', 'frames', 'allocated', 'reused')
+
+    def __init__(self, size):
+        self.blank = [None] * size
+        self.frames = []
+        self.allocated = 0
+        self.reused = 0
+
+    def acquire(self):
+        if(self.frames):
+            self.reused += 1
+            return self.frames.pop()
+        self.allocated += 1
+        return self.blank[:]
+
+    def release(self, frame):
+        frame[:] = self.blank
+        self.frames.append(frame)
+
+#
+# Mezipaměť přeložených programů na disku (--cache-dir). Klíčem je otisk zdrojových bajtů programu
+# a verze interpretu (otisk jeho vlastního zdrojového kódu a verze Pythonu), obsahem je serializovaný
+# validovaný program (dekódované instrukce, sloty proměnných a návěští).
+#
+# Soubory se zapisují atomicky (dočasný soubor a přejmenování), takže adresář může sdílet více
+# souběžných běhů, i pod různými uživateli: soubory dostanou práva 0666 omezená maskou umask jako
+# běžně vytvořený soubor (sdílení skupinou tedy určuje umask a práva adresáře) a soubor, který nelze
+# přečíst, se bere jako chybějící. Po zápisu se nejdéle nepoužité soubory mažou, dokud velikost adresáře
+# nepřekračuje zadaný limit. Adresář musí být důvěryhodný, obsah se načítá modulem pickle.
+#
+class ProgramCache:
+
+    SUFFIX = '.cache'
+
+    def __init__(self, directory, limit):
+        self.directory = directory
+        self.limit = limit
+
+        # mkstemp vytváří soubory s právy 0600, uložený soubor dostane práva podle umask
+        umask = os.umask(0)
+        os.umask(umask)
+        self.mode = 0o666 & ~umask
+
+    #
+    # Vrátí klíč programu, zdrojem je cesta k souboru nebo binární proud podporující seek
+    #
+    def getKey(self, source):
+        digest = hashlib.sha256()
+        with open(__file__, 'rb') as f:
+            digest.update(f.read())
+        digest.update(sys.version.encode())
+
+        if(isinstance(source, str)):
+            f = open(source, 'rb')
+        else:
+            f = source
+        try:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        finally:
+            if(f is source):
+                f.seek(0)
+            else:
+                f.close()
+        return digest.hexdigest()
+
+    def getPath(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    #
+    # Vrátí uložený program, nebo None pokud v mezipaměti není (nebo je soubor poškozený či nečitelný)
+    #
+    def load(self, key):
+        path = self.getPath(key)
+        try:
+            with open(path, 'rb') as f:
+                program = pickle.load(f)
+        except Exception:
+            return None
+
+        # čas posledního použití pro mazání, soubor jiného uživatele ho změnit nedovolí
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return program
+
+    #
+    # Uloží program, chyba zápisu mezipaměti interpretaci neovlivní
+    #
+    def store(self, key, program):
+        try:
+            os.makedirs(self.directory, exist_ok = True)
+            fd, temporary = tempfile.mkstemp(dir = self.directory, suffix = '.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(program, f, pickle.HIGHEST_PROTOCOL)
+                os.chmod(temporary, self.mode)
+                os.replace(temporary, self.getPath(key))
+            except:
+                os.unlink(temporary)
+                raise
+            self.evict()
+        except OSError:
+            pass
+
+    #
+    # Smaže nejdéle nepoužité soubory, dokud celková velikost překračuje limit
+    #
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if(not name.endswith(self.SUFFIX)):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if(total <= self.limit):
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+
+#
+# Limity vykonávání programu (--max-insts, --timeout, --max-memory). Smyčky jader počítají vykonané
+# instrukce a limity kontrolují jen v kontrolních bodech po nejvýše CHECK_INTERVAL instrukcích, limit
+# počtu instrukcí je přesto přesný. Obsazená paměť (rezidentní paměť procesu) se zjišťuje jen při každé
+# MEMORY_CHECKS-té kontrole. Překročení limitu ukončí program chybou 59 s order instrukce, před kterou
+# se program zastavil.
+#
+# cancelled: volitelná funkce bez parametrů kontrolovaná v každém kontrolním bodě, vrátí-li True,
+#            vykonávání skončí také chybou 59 (server tak přeruší požadavek klienta, který spojení zavřel)
+#
+class ExecutionLimits:
+
+    CHECK_INTERVAL = 1024
+    MEMORY_CHECKS = 16
+
+    def __init__(self, interpreter, maxInsts, timeout, maxMemory):
+        self.interpreter = interpreter
+        self.maxInsts = maxInsts
+        self.timeout = timeout
+        self.maxMemory = maxMemory
+        self.deadline = None
+        self.checks = 0
+        self.cancelled = None
+        self.pageSize = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    #
+    # Připraví limity na nové spuštění programu, vrací první kontrolní bod
+    #
+    def start(self):
+        self.deadline = time.monotonic() + self.timeout if self.timeout != None else None
+        self.checks = 0
+        return self.getCheckpoint(0)
+
+    #
+    # Vrátí počet vykonaných instrukcí, po kterém se limity znovu zkontrolují
+    #
+    def getCheckpoint(self, executed):
+        checkpoint = executed + self.CHECK_INTERVAL
+        if(self.maxInsts != None and self.maxInsts < checkpoint):
+            checkpoint = self.maxInsts
+        return checkpoint
+
+    #
+    # Zkontroluje limity před vykonáním instrukce s indexem index, vrací další kontrolní bod
+    #
+    def check(self, executed, index):
+        if(self.maxInsts != None and executed >= self.maxInsts):
+            self.exceeded('Překročen limit počtu instrukcí ' + str(self.maxInsts), index)
+        if(self.deadline != None and time.monotonic() > self.deadline):
+            self.exceeded('Překročen časový limit ' + str(self.timeout) + ' s', index)
+        if(self.cancelled != None and self.cancelled()):
+            self.exceeded('Vykonávání přerušeno', index)
+        if(self.maxMemory != None):
+            self.checks += 1
+            if(self.checks >= self.MEMORY_CHECKS):
+                self.checks = 0
+                if(self.getMemoryUsage() > self.maxMemory):
+                    self.exceeded('Překročen limit paměti ' + str(self.maxMemory) + ' B', index)
+        return self.getCheckpoint(executed)
+
+    #
+    # Ukončí program chybou překročení limitu (MemoryError jader se hlásí jako překročení paměti)
+    #
+    def exceeded(self, message, index):
+        self.interpreter.error(message + ' před instrukcí s order ' + str(self.interpreter.instructions[index].order), 59)
+
+    #
+    # Vrátí rezidentní paměť procesu v bajtech (bez /proc maximum od spuštění procesu)
+    #
+    def getMemoryUsage(self):
+        try:
+            with open('/proc/self/statm', 'rb') as f:
+                return int(f.read().split()[1]) * self.pageSize
+        except OSError:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+#
+# Dekódovaná instrukce programu, vzniká jednou při načítání programu
+#
+# Vstup: <instruction order="5" opcode="XY">
+#
+class Instruction:
+
+    __slots__ = ('opcode', 'name', 'args', 'order')
+
+    def __init__(self, opcode, name, args, order):
+        self.opcode = opcode
+        self.name = name
+        self.args = args
+        self.order = order
+
+#
+# Chyba interpretace, code je návratový kód podle specifikace. Podtřídy odpovídají jednotlivým kódům,
+# output je zachycený výstup programu do okamžiku chyby (viz interpret.run), stats jsou statistiky do
+# okamžiku chyby (None u chyby před vykonáváním programu).
+#
+class InterpretError(Exception):
+
+    def __init__(self, message, code):
+        Exception.__init__(self, message)
+        self.message = message
+        self.code = code
+        self.output = None
+        self.stats = None
+
+#
+# chybějící nebo chybně zadaný parametr (10)
+#
+class ParameterError(InterpretError):
+    pass
+
+#
+# chyba při otevírání nebo čtení vstupního souboru (11)
+#
+class InputFileError(InterpretError):
+    pass
+
+#
+# chyba při otevření výstupního souboru pro zápis (12)
+#
+class OutputFileError(InterpretError):
+    pass
+
+#
+# chybný formát XML reprezentace programu (31)
+#
+class XMLFormatError(InterpretError):
+    pass
+
+#
+# chyba při sémantických kontrolách vstupního kódu, např. nedefinované návěští (52)
+#
+class SemanticError(InterpretError):
+    pass
+
+#
+# špatné typy operandů (53)
+#
+class OperandTypeError(InterpretError):
+    pass
+
+#
+# přístup k neexistující proměnné (54)
+#
+class UndefinedVariableError(InterpretError):
+    pass
+
+#
+# rámec neexistuje (55)
+#
+class UndefinedFrameError(InterpretError):
+    pass
+
+#
+# chybějící hodnota v proměnné, na datovém zásobníku nebo v zásobníku volání (56)
+#
+class MissingValueError(InterpretError):
+    pass
+
+#
+# špatná hodnota operandu, např. dělení nulou (57)
+#
+class OperandValueError(InterpretError):
+    pass
+
+#
+# chybná práce s řetězcem (58)
+#
+class StringOperationError(InterpretError):
+    pass
+
+#
+# překročení limitu vykonávání --max-insts, --timeout nebo --max-memory (59)
+#
+class LimitExceededError(InterpretError):
+    pass
+
+#
+# Ukončení programu instrukcí EXIT, není chybou (interpret.run vrátí code jako návratový kód)
+#
+class ProgramExit(Exception):
+
+    def __init__(self, code):
+        Exception.__init__(self, code)
+        self.code = code
+
+#
+# Výsledek jednoho spuštění programu (interpret.run)
+#
+# exitCode: návratový kód programu (0 nebo hodnota instrukce EXIT)
+# stats: hodnoty zapnutých statistik podle jména (insts, vars) v zadaném pořadí
+# output: zachycený výstup instrukce WRITE v kódování UTF-8, None při zápisu do zadaného proudu
+#
+class RunResult:
+
+    __slots__ = ('exitCode', 'stats', 'output')
+
+    def __init__(self, exitCode, stats, output):
+        self.exitCode = exitCode
+        self.stats = stats
+        self.output = output
+
+#
+# Přerušitelné vykonávání programu (interpret.start). Funkce step vykoná nejvýše budget instrukcí
+# a vrátí stav, stav interpretace mezi voláními zůstává zachovaný (vykonávání je generátor, který se
+# po každém úseku přeruší). Před instrukcí READ, pro kterou ve vstupu ještě není celý řádek, se
+# vykonávání zastaví se stavem WAITING. Vstup se dodává po částech funkcí feed a uzavírá funkcí close,
+# READ poté čte konec vstupu. Výstup se do proudu vyprázdní při každém přerušení.
+#
+# Jádro transpile vykonává relaci po instrukcích uzávěry jádra closure, profilování se neprovádí.
+# Instance interpretu má najednou jen jednu relaci, souběžné relace potřebují instance z interpret.clone.
+#
+#     session = program.start()
+#     while session.step(1000) != Session.FINISHED:
+#         if(session.status == Session.WAITING):
+#             session.feed('5\n')
+#     print(session.result.exitCode, session.result.output)
+#
+class Session:
+
+    RUNNING = 'running'
+    WAITING = 'waiting'
+    FINISHED = 'finished'
+
+    def __init__(self, interpreter, output = None, errors = None):
+        self.interpreter = interpreter
+        self.input = InputQueue()
+        self.status = self.RUNNING
+        self.result = None
+        self.budget = 0
+
+        # instrukce READ, před kterými se případně čeká na vstup
+        self.blocking = [interpret.INSTRUCTIONS[instruction.opcode][0] == 'READ' for instruction in interpreter.instructions]
+
+        self.captured = interpreter.beginRun(self.input, output, errors)
+        self.generator = self.execute()
+
+    #
+    # Přidá text na konec vstupu instrukce READ
+    #
+    def feed(self, text):
+        self.input.feed(text)
+
+    #
+    # Uzavře vstup instrukce READ
+    #
+    def close(self):
+        self.input.close()
+
+    #
+    # Vykoná nejvýše budget instrukcí, vrací stav RUNNING (vyčerpaný budget), WAITING (READ čeká na vstup)
+    # nebo FINISHED (RunResult je v result). Chyba interpretace se vyvolá jako InterpretError a relace
+    # tím skončí.
+    #
+    def step(self, budget):
+        if(self.status != self.FINISHED):
+            self.budget = budget
+            self.status = next(self.generator)
+        return self.status
+
+    #
+    # Generátor vykonávání, po každém přerušení vrací stav
+    #
+    def execute(self):
+        interpreter = self.interpreter
+        exitCode = 0
+        try:
+            if(interpreter.engine == None):
+                yield from self.executeInstructions()
+            else:
+                yield from self.executeSteps(interpreter.engine.steps)
+        except ProgramExit as exit:
+            exitCode = exit.code
+        except InterpretError as error:
+            self.status = self.FINISHED
+            interpreter.abortRun(error, self.captured)
+            raise
+
+        self.result = interpreter.finishRun(exitCode, self.captured)
+        yield self.FINISHED
+
+    #
+    # Vykonávání tabulkou obslužných funkcí (jádro table)
+    #
+    def executeInstructions(self):
+        interpreter = self.interpreter
+        instructions = interpreter.instructions
+        blocking = self.blocking
+        limits = interpreter.limits
+        end = len(instructions)
+
+        remaining = self.budget
+        executed = 0
+        checkpoint = limits.start() if limits != None else None
+        while interpreter.instructionIndex < end:
+            index = interpreter.instructionIndex
+            if(remaining == 0 or (blocking[index] and not self.input.ready())):
+                interpreter.output.flush()
+                yield self.RUNNING if remaining == 0 else self.WAITING
+                remaining = self.budget
+                continue
+
+            if(checkpoint != None and executed >= checkpoint):
+                checkpoint = limits.check(executed, index)
+            executed += 1
+            remaining -= 1
+
+            interpreter.instructionIndex += 1
+            interpreter.executeInstruction(instructions[index])
+
+    #
+    # Vykonávání uzávěry (jádra closure a transpile)
+    #
+    def executeSteps(self, steps):
+        interpreter = self.interpreter
+        blocking = self.blocking
+        limits = interpreter.limits
+        stats = bool(interpreter.statsParameters)
+        end = len(steps)
+
+        index = 0
+        remaining = self.budget
+        executed = 0
+        checkpoint = limits.start() if limits != None else None
+        while index < end:
+            if(remaining == 0 or (blocking[index] and not self.input.ready())):
+                interpreter.output.flush()
+                yield self.RUNNING if remaining == 0 else self.WAITING
+                remaining = self.budget
+                continue
+
+            if(checkpoint != None and executed >= checkpoint):
+                checkpoint = limits.check(executed, index)
+            executed += 1
+            remaining -= 1
+
+            index = steps[index]()
+            if(stats):
+                interpreter.updateStats()
 
 #
 # Interpret XML reprezentace kódu
 #
+# Knihovní rozhraní: instance nese nastavení interpretu a veškerý stav interpretace, program se
+# načte jednou funkcí load a funkcí run ho lze spouštět opakovaně. Chyby se hlásí výjimkami
+# InterpretError s návratovým kódem podle specifikace.
+#
+#     program = interpret(engine = 'closure', stats = ['insts'])
+#     program.load('program.xml')
+#     result = program.run(input = '5\n')
+#     print(result.exitCode, result.stats, result.output)
+#
+# Přerušitelné vykonávání po úsecích instrukcí se spouští funkcí start (viz Session).
+#
 class interpret:
 
 
@@ -16,7 +714,12 @@ class interpret:
     # Globální rámec, značíme GF (Global Frame), který je na začátku interpretace automaticky inicializován
     # jako prázdný; slouží pro ukládání globálních proměnných.
     #
-    GF = {}
+    # Rámce jsou pole záznamů Variable indexovaná slotem proměnné, sloty se přidělují jmenům proměnných
+    # při načítání programu (globalSlots pro GF, localSlots společně pro LF a TF).
+    #
+    GF = None
+    globalSlots = None
+    localSlots = None
     FRAME_GLOBAL = 'GF'
 
     #
@@ -24,9 +727,14 @@ class interpret:
     # rámec na zásobníku rámců; slouží pro ukládání lokálních proměnných funkcí (zásobník
     # rámců lze s výhodou využít při zanořeném či rekurzivním volání funkcí);
     #
-    LFStack = []
+    LFStack = None
     FRAME_LOCAL = 'LF'
 
+    #
+    # Zásobárna lokálních rámců (FramePool), vzniká po načtení programu
+    #
+    framePool = None
+
     #
     # Dočasný rámec, značíme TF (Temporary Frame), který slouží pro chystání nového nebo úklid starého
     # rámce (např. při volání nebo dokončování funkce), jenž může být přesunut na zásobník rámců
@@ -53,175 +761,725 @@ class interpret:
     TYPE_LABEL = 'label'
     TYPE_SYMB = 'symb'
     TYPE_TYPE = 'type'
+    TYPE_CONST = 'const'
+
+    #
+    # Regulární výrazy pro dekódování operandů při načítání programu
+    #
+    VARIABLE_REGEX = re.compile('^(' + FRAME_LOCAL + '|' + FRAME_TEMPORARY + '|' + FRAME_GLOBAL + '){1}@([a-zA-Z_\-$&%*]{1}[a-zA-Z0-9_\-$&%*]*)$')
+    LABEL_REGEX = re.compile('[a-zA-Z0-9_\-$&%*]+$')
+    TYPE_REGEX = re.compile('^(' + TYPE_STRING + '|' + TYPE_INTEGER + '|' + TYPE_BOOLEAN + '|' + TYPE_FLOAT + '|' + TYPE_NIL + '){1}$')
     TYPE_UNSPEC = 'TYPE_UNSPEC'
+    ESCAPE_REGEX = re.compile(r"\\(\d{1,3})")
+
+    #
+    # Tabulka instrukcí, index v tabulce je číselný identifikátor operačního kódu (opcode id), pod
+    # kterým je instrukce uložena v dekódovaném programu. Obsluha instrukce se tak vybírá jediným
+    # indexováním do pole obslužných funkcí (viz handlers). Třetí položkou je signatura instrukce
+    # (druhy operandů), podle které se formální stránka argumentů ověří jednou při načítání.
+    #
+    INSTRUCTIONS = (
+        ('MOVE', 'moveIns', [TYPE_VAR, TYPE_SYMB]),
+        ('CREATEFRAME', 'createFrameIns', []),
+        ('PUSHFRAME', 'pushFrameIns', []),
+        ('POPFRAME', 'popFrameIns', []),
+        ('DEFVAR', 'defVarIns', [TYPE_VAR]),
+        ('CALL', 'callIns', [TYPE_LABEL]),
+        ('RETURN', 'returnIns', []),
+        ('PUSHS', 'pushsIns', [TYPE_SYMB]),
+        ('POPS', 'popsIns', [TYPE_VAR]),
+        ('ADD', 'addIns', [TYPE_VAR, TYPE_SYMB, TYPE_SYMB]),
+        ('SUB', 'subIns', [TYPE_VAR, TYPE_SYMB, TYPE_SYMB]),
+        ('MUL', 'mulIns', [TYPE_VAR, TYPE_SYMB, TYPE_SYMB]),
+        ('IDIV', 'idivIns', [TYPE_VAR, TYPE_SYMB, TYPE_SYMB]),
+        ('LT', 'ltIns', [TYPE_VAR, TYPE_SYMB, TYPE_SYMB]),
+        ('GT', 'gtIns', [TYPE_VAR, TYPE_SYMB, TYPE_SYMB]),
+        ('EQ', 'eqIns', [TYPE_VAR, TYPE_SYMB, TYPE_SYMB]),
+        ('AND', 'andIns', [TYPE_VAR, TYPE_SYMB, TYPE_SYMB]),
+        ('OR', 'orIns', [TYPE_VAR, TYPE_SYMB, TYPE_SYMB]),
+        ('NOT', 'notIns', [TYPE_VAR, TYPE_SYMB]),
+        ('INT2CHAR', 'int2charIns', [TYPE_VAR, TYPE_SYMB]),
+        ('STRI2INT', 'stri2intIns', [TYPE_VAR, TYPE_SYMB, TYPE_SYMB]),
+        ('INT2FLOAT', 'int2floatIns', [TYPE_VAR, TYPE_SYMB]),
+        ('FLOAT2INT', 'float2intIns', [TYPE_VAR, TYPE_SYMB]),
+        ('READ', 'readIns', [TYPE_VAR, TYPE_TYPE]),
+        ('WRITE', 'writeIns', [TYPE_SYMB]),
+        ('CONCAT', 'concatIns', [TYPE_VAR, TYPE_SYMB, TYPE_SYMB]),
+        ('STRLEN', 'strlenIns', [TYPE_VAR, TYPE_SYMB]),
+        ('GETCHAR', 'getcharIns', [TYPE_VAR, TYPE_SYMB, TYPE_SYMB]),
+        ('SETCHAR', 'setcharIns', [TYPE_VAR, TYPE_SYMB, TYPE_SYMB]),
+        ('TYPE', 'typeIns', [TYPE_VAR, TYPE_SYMB]),
+        ('LABEL', 'noopIns', [TYPE_LABEL]),
+        ('JUMP', 'jumpIns', [TYPE_LABEL]),
+        ('JUMPIFEQ', 'jumpifeqIns', [TYPE_LABEL, TYPE_SYMB, TYPE_SYMB]),
+        ('JUMPIFNEQ', 'jumpifneqIns', [TYPE_LABEL, TYPE_SYMB, TYPE_SYMB]),
+        ('EXIT', 'exitIns', [TYPE_SYMB]),
+        ('DPRINT', 'dprintIns', [TYPE_SYMB]),
+        ('BREAK', 'breakIns', []),
+        ('CLEARS', 'clearsIns', []),
+        ('ADDS', 'addsIns', []),
+        ('SUBS', 'subsIns', []),
+        ('MULS', 'mulsIns', []),
+        ('IDIVS', 'idivsIns', []),
+        ('LTS', 'ltsIns', []),
+        ('GTS', 'gtsIns', []),
+        ('EQS', 'eqsIns', []),
+        ('ANDS', 'andsIns', []),
+        ('ORS', 'orsIns', []),
+        ('NOTS', 'notsIns', []),
+        ('INT2CHARS', 'int2charsIns', []),
+        ('STRI2INTS', 'stri2intsIns', []),
+        ('JUMPIFEQS', 'jumpifeqsIns', [TYPE_LABEL]),
+        ('JUMPIFNEQS', 'jumpifneqsIns', [TYPE_LABEL]),
+    )
+    OPCODES = dict((name, opcode) for opcode, (name, method, requiredArgs) in enumerate(INSTRUCTIONS))
+    OPCODE_LABEL = OPCODES['LABEL']
+
+    #
+    # Obslužné funkce instrukcí indexované číselným identifikátorem operačního kódu
+    #
+    handlers = None
+
+    #
+    # Interpretační jádra (--engine)
+    #
+    ENGINE_TABLE = 'table'
+    ENGINE_CLOSURE = 'closure'
+    ENGINE_TRANSPILE = 'transpile'
 
     #
     # Zásobník volání
     #
-    callStack = []
+    callStack = None
 
-    jumpTo = None
+    #
+    # Vstup instrukce READ (textový proud), None čte interaktivně ze standardního vstupu
+    #
     inputFile = None
-    labels = {}
 
     #
-    # Instruction order
-    # <instruction order="5" opcode="XY">
+    # Výstup instrukce WRITE (OutputBuffer), cílový proud se nastavuje při každém spuštění
+    #
+    output = None
+
+    #
+    # Chybový výstup instrukcí DPRINT a BREAK (textový proud)
+    #
+    errors = None
+    OUTPUT_BUFFER_DEFAULT = '64K'
+
+    #
+    # Od této délky se řetězec prodlužovaný instrukcí CONCAT nebo měněný instrukcí SETCHAR převede
+    # na StringBuilder, kratší řetězce se kopírují (kopie je levnější než vytvoření bufferu).
     #
-    instructionOrder = 1
+    STRING_BUILDER_THRESHOLD = 256
+    CACHE_SIZE_DEFAULT = '64M'
+    ASYNC_BUDGET = 1000
+    SIZE_REGEX = re.compile('([0-9]+)([KkMmGg]?)$')
+    labels = None
 
     #
-    # Index of line contains instruction of program
+    # Index of line contains instruction of program (čítač instrukcí, skok ho přímo přepíše)
     #
     instructionIndex = 0
 
     #
-    # Parametry pro sbírání statistik interpretace kódu. (může být --insts a --vars)
+    # Parametry pro sbírání statistik interpretace kódu, jméno statistiky (insts, vars) a její hodnota
+    # v pořadí zadání
     #
-    statsParameters = {}
+    statsParameters = None
+    STAT_INSTS = 'insts'
+    STAT_VARS = 'vars'
+
+    #
+    # Průběžný počet inicializovaných proměnných ve všech platných rámcích pro statistiku --vars,
+    # počítá se pouze pokud je statistika zapnutá (trackVariables).
+    #
+    trackVariables = False
+    initializedVariables = 0
 
     #
     # Datový zásobník. Operační kód zásobníkových instrukcí je zakončen písmenem „S“.
     # Zásobníkové instrukce případně načítají chybějící operandy z datového zásobníku a
-    # výslednou hodnotu operace případně ukládají zpět na datový zásobník.
+    # výslednou hodnotu operace případně ukládají zpět na datový zásobník. Zásobník obsahuje
+    # záznamy Variable s hodnotou a typem vyhodnocenými už při vložení (PUSHS), záznamy na
+    # zásobníku se nemění, takže je lze sdílet.
     #
-    dataStack = []
+    dataStack = None
 
     #
-    # Konstruktor volá funkci na parsování argumentů
-    # Konstruktor volá funkci run na samotnou intepretaci
+    # Načtený program (pole dekódovaných instrukcí) a jádro, které ho přeložilo (None pro jádro table)
     #
-    def __init__(self):
+    instructions = None
+    engine = None
 
-        # parsování argumentů z příkazové řádky
-        opts = self.parseCmdArgs()
-
-        # interpretace
-        self.run(opts)
+    #
+    # Limity vykonávání (ExecutionLimits), None bez limitů
+    #
+    limits = None
 
     #
-    # Funkce se volá hned po zavolání konstruktoru.
-    # Funkce se stará i intepretaci kódu předaného pomocí souboru argumentem --source nebo ze standartního vstupu
+    # Chyby podle návratového kódu
     #
-    def run(self, opts):
+    ERROR_TYPES = {
+        10: ParameterError,
+        11: InputFileError,
+        12: OutputFileError,
+        31: XMLFormatError,
+        52: SemanticError,
+        53: OperandTypeError,
+        54: UndefinedVariableError,
+        55: UndefinedFrameError,
+        56: MissingValueError,
+        57: OperandValueError,
+        58: StringOperationError,
+        59: LimitExceededError,
+    }
 
-        try:
-            if(opts.source != None):
-                tree = ET.parse(opts.source)
-                root = tree.getroot()
-            else:
-                try:
-                    input = sys.stdin.buffer
-                except AttributeError:
-                    input = sys.stdin
-                except:
-                     self.error('Nepodařilo se načíst data ze standartního vstupu', 11)
+    #
+    # Konstruktor připraví interpret se zadaným nastavením (odpovídá parametrům příkazové řádky).
+    #
+    # engine: interpretační jádro (table, closure, transpile)
+    # stats: jména sbíraných statistik v pořadí výstupu (insts, vars)
+    # outputBuffer, cacheSize: počet znaků/bajtů, případně text s příponou K nebo M
+    # cacheDir, profile, profileFolded, dumpSource: cesty jako u --cache-dir, --profile, --profile-folded a --dump-source
+    # maxInsts, timeout, maxMemory: limity vykonávání (počet instrukcí, sekundy, bajty případně s příponou K, M nebo G)
+    #
+    def __init__(self, engine = ENGINE_TABLE, stats = (), outputBuffer = OUTPUT_BUFFER_DEFAULT, cacheDir = None, cacheSize = CACHE_SIZE_DEFAULT, profile = None, profileFolded = None, dumpSource = None,
+                 maxInsts = None, timeout = None, maxMemory = None):
 
-                xmlString = input.read()
-                root = ET.fromstring(xmlString)
-        except ET.ParseError:
-            self.error("Nevalidní formát vstupního XML", 52)
+        # nastavení pro interpret.clone
+        self.options = {'engine': engine, 'stats': tuple(stats), 'outputBuffer': outputBuffer, 'cacheDir': cacheDir, 'cacheSize': cacheSize,
+            'profile': profile, 'profileFolded': profileFolded, 'maxInsts': maxInsts, 'timeout': timeout, 'maxMemory': maxMemory}
 
-        # zkontrolování názvu root elementu
-        if(root.tag != 'program'):
-            self.error('Instrukce musí být ohraničeny tagem program', 31)
+        # sestavení tabulky obslužných funkcí instrukcí
+        self.handlers = [getattr(self, method) for name, method, requiredArgs in self.INSTRUCTIONS]
 
-        if(root.get('language') != self.language):
-            self.error('Instrukce program musí obsahovat atribut language s hodnout: ' + self.language, 31)
+        # výstup instrukce WRITE a chybový výstup
+        self.output = OutputBuffer(sys.stdout, 0)
+        self.output.limit = self.parseSize(str(outputBuffer))
+        self.errors = sys.stderr
 
-        # interpret navíc oproti sekci 3.1 podporuje existenci volitelných dokumentačních textových atributů name a description v kořenovém elementu program
-        for arg in root.keys():
-            if(arg != 'language' and arg != 'name' and arg != 'description'):
-                self.error('Zakázané použití atributu: ' + arg + '. Instrukce program může obsahovat kromě povinného atributu language s hodnotou: ' +
-                self.language + ' i atributy name a description bez omezení hodnot', 31)
+        # rámce a zásobníky, přeložená jádra na ně drží odkazy, a proto se při spuštění vyprázdní na místě
+        self.GF = []
+        self.LFStack = []
+        self.TF = None
+        self.callStack = []
+        self.dataStack = []
+        self.labels = {}
+        self.globalSlots = {}
+        self.localSlots = {}
+        self.instructionIndex = 0
+
+        # statistiky
+        self.statsParameters = {}
+        for name in stats:
+            if(name != self.STAT_INSTS and name != self.STAT_VARS):
+                self.error('Neznámá statistika: ' + str(name), 10)
+            self.statsParameters[name] = 0
+        self.trackVariables = self.STAT_VARS in self.statsParameters
+        self.initializedVariables = 0
+
+        # interpretační jádro
+        if(engine not in (self.ENGINE_TABLE, self.ENGINE_CLOSURE, self.ENGINE_TRANSPILE)):
+            self.error('Neznámé interpretační jádro: ' + str(engine), 10)
+        self.engineName = engine
+        self.dumpSource = dumpSource
+
+        # mezipaměť přeložených programů
+        self.cache = None
+        if(cacheDir != None):
+            self.cache = ProgramCache(cacheDir, self.parseSize(str(cacheSize)))
+
+        # profilování, --profile-folded doplňuje profil --profile
+        if(profileFolded != None and profile == None):
+            self.error('Zadaný parametr --profile-folded vyžaduje parametr --profile.', 10)
+        self.profile = profile
+        self.profileFolded = profileFolded
+
+        # limity vykonávání
+        self.limits = None
+        if(maxInsts != None or timeout != None or maxMemory != None):
+            if(maxInsts != None):
+                if(not str(maxInsts).isdigit()):
+                    self.error('Nevalidní limit počtu instrukcí: ' + str(maxInsts), 10)
+                maxInsts = int(maxInsts)
+            if(timeout != None):
+                try:
+                    seconds = float(timeout)
+                except ValueError:
+                    seconds = 0.0
+                if(not seconds > 0):
+                    self.error('Nevalidní časový limit: ' + str(timeout), 10)
+                timeout = seconds
+            if(maxMemory != None):
+                maxMemory = self.parseSize(str(maxMemory))
+            self.limits = ExecutionLimits(self, maxInsts, timeout, maxMemory)
+
+    #
+    # Funkce načte a zvaliduje program a připraví ho zvoleným jádrem, zdrojem je cesta k souboru,
+    # binární proud nebo bajty XML reprezentace. Program lze poté opakovaně spouštět funkcí run.
+    #
+    def load(self, source):
+        if(isinstance(source, bytes)):
+            source = io.BytesIO(source)
+
+        # načtení a validace celého programu do pole dekódovaných instrukcí (případně z mezipaměti)
+        if(self.cache != None):
+            instructions = self.loadCachedProgram(source, self.cache)
+        else:
+            instructions = self.prepareProgram(source)
 
-        # v případě existujícího input souboru se ho pokusíme otevřít
-        if(opts.input != None):
-            try:
-                self.inputFile = open(opts.input, "r")
-            except:
-                self.error('Nepodařilo se otevřít soubor pro čtení vstupu: ' + opts.input,11)
+        self.prepareEngine(instructions)
 
-        # procházení všech instrukcí
-        preRun = True
-        while self.instructionIndex <= len(root) or self.jumpTo != None:
+    #
+    # Funkce připraví dekódovaný program ke spuštění zvoleným jádrem
+    #
+    def prepareEngine(self, instructions):
+        self.framePool = FramePool(len(self.localSlots))
 
-            # nějaká instrukce chtěla skočit
-            if(self.jumpTo != None):
-                self.instructionIndex = self.jumpTo
-                self.instructionOrder = self.jumpTo + 1
-                self.jumpTo = None
-                continue
-            elif(self.instructionIndex == len(root)):
-                if preRun:
-                    preRun = False
-                    self.jumpTo = 0
-                    continue
-                else:
-                    break
+        # jádra closure a transpile program přeloží jednou pro všechna spuštění
+        self.engine = None
+        if(self.engineName == self.ENGINE_CLOSURE):
+            self.engine = ClosureEngine(self)
+        elif(self.engineName == self.ENGINE_TRANSPILE):
+            self.engine = TranspileEngine(self, self.dumpSource)
+        if(self.engine != None):
+            self.engine.prepare(instructions)
 
-            # čti instrukci
-            child = root[self.instructionIndex]
-
-            if(int(child.get('order')) != self.instructionOrder):
-                self.error('Číslování instrukcí není inkrementální po 1, číslo instrukce: ' + child.get('order') + ' by mělo být: ' + str(self.instructionOrder), 31)
-            if(child.tag != 'instruction'):
-                self.error('Tag pro každou instrukci v tagu program musí být pojmenovaný instruction', 31)
-            if(child.get('opcode') == None):
-                self.error('Tag pro každou instrukci v tagu program musí obsahovat opcode u kterého nezáleží na velikosti písmen', 31)
-
-            # procházení všech argumentů (kvůli číslování)
-            argumentOrder = 1
-            for childd in list(child):
-                match = re.match(r"arg([0-9]+)", childd.tag, re.I)
-                if match:
-                    items = match.groups()
-                    if(int(items[0]) != argumentOrder):
-                        self.error('Tag pro každý operand instrukce musí obsahovat arg + číslo pořadí argumentu inkrementující se o 1, začínající na 1. Argument číslo: ' + str(argumentOrder) + ' má číslo: ' + items[0], 31)
-                else:
-                    self.error('Tag pro každý operand instrukce musí obsahovat arg + číslo pořadí argumentu inkrementující se o 1, začínající na 1', 31)
-                argumentOrder += 1
+        self.instructions = instructions
 
-            # vykonání konkrétní instrukce (zatím nevíme, jestli taková vůbec existuje, zkontrolovali jsme pouze formální stránku XML)
-            if preRun:
-                self.executePreRunInstruction(child.get('opcode'), list(child))
-            else:
-                self.executeInstruction(child.get('opcode'), list(child))
-            self.instructionOrder += 1
-            self.instructionIndex += 1
+    #
+    # Funkce vrátí nový interpret se stejným nastavením, který sdílí načtený program (dekódované instrukce
+    # se znovu nenačítají, jádra closure a transpile program jen znovu přeloží). Každá instance má vlastní
+    # stav interpretace, a tak mohou relace (start) klonů běžet souběžně.
+    #
+    def clone(self):
+        other = interpret(**self.options)
+        if(self.instructions != None):
+            other.globalSlots = self.globalSlots
+            other.localSlots = self.localSlots
+            other.labels = self.labels
+            other.prepareEngine(self.instructions)
+        return other
 
-        # interpret proběhl bez chyby, uložíme statistiky do souboru dle pořadí pokud je rozšíření aktivováno
-        if(opts.stats != None):
-            try:
-                f = open(opts.stats, "w")
-                f.truncate()
-                for info in self.statsParameters:
-                    f.write(str(self.statsParameters[info]) + "\n")
-                f.close()
-            except:
-                self.error('Nepodařilo se otevřít soubor pro zápis statistik: ' + opts.stats,12)
+    #
+    # Funkce spustí načtený program a vrátí RunResult.
+    #
+    # input: obsah vstupu instrukce READ (řetězec) nebo textový proud, None je prázdný vstup
+    #        a sys.stdin se čte interaktivně
+    # output: textový proud pro výstup instrukce WRITE, bez něj se výstup zachytí a vrátí ve výsledku
+    # errors: textový proud pro výpisy instrukcí DPRINT a BREAK (bez něj sys.stderr)
+    #
+    def run(self, input = None, output = None, errors = None):
+        captured = self.beginRun(input, output, errors)
+
+        # interpretace zvoleným jádrem (s --profile v profilovací smyčce)
+        exitCode = 0
+        try:
+            if(self.profile != None):
+                self.executeProfiled()
+            elif(self.engine != None):
+                self.engine.run()
+            elif(self.limits != None):
+                self.executeLimited(self.instructions)
+            else:
+                self.execute(self.instructions)
+        except ProgramExit as exit:
+            exitCode = exit.code
+        except InterpretError as error:
+            self.abortRun(error, captured)
+            raise
+
+        return self.finishRun(exitCode, captured)
+
+    #
+    # Funkce spustí načtený program jako přerušitelnou relaci a vrátí Session (parametry jako u run,
+    # vstup instrukce READ se relaci dodává funkcí Session.feed).
+    #
+    def start(self, output = None, errors = None):
+        return Session(self, output, errors)
+
+    #
+    # Korutina vykoná načtený program v asyncio jako relaci (start) po úsecích nejvýše budget instrukcí,
+    # mezi úseky předá řízení smyčce událostí, takže jedna smyčka obslouží mnoho souběžných relací
+    # (každá ve vlastní instanci, viz clone). Vrací RunResult, chyby vyvolá jako InterpretError.
+    #
+    # reader: vstup instrukce READ, korutina reader.readline() vrací řádek v UTF-8 (prázdné bajty jsou
+    #         konec vstupu), např. asyncio.StreamReader; bez něj je vstup prázdný
+    # writer: výstup instrukce WRITE se po každém úseku zapíše funkcí writer.write v UTF-8 a počká se
+    #         na korutinu writer.drain(), např. asyncio.StreamWriter; bez něj se výstup zachytí do výsledku
+    #
+    async def runAsync(self, reader = None, writer = None, errors = None, budget = ASYNC_BUDGET):
+        # asyncio se načítá až zde, běžné spuštění interpretu ho nepotřebuje
+        import asyncio
+
+        stream = io.StringIO() if writer != None else None
+        session = self.start(stream, errors)
+        if(reader == None):
+            session.close()
+
+        try:
+            while True:
+                status = session.step(budget)
+                if(stream != None):
+                    await self.writeAsync(stream, writer)
+
+                if(status == Session.FINISHED):
+                    return session.result
+                elif(status == Session.WAITING):
+                    line = await reader.readline()
+                    if(line):
+                        session.feed(line.decode('utf-8'))
+                    else:
+                        session.close()
+                else:
+                    await asyncio.sleep(0)
+        except InterpretError:
+            # výstup do okamžiku chyby
+            if(stream != None):
+                await self.writeAsync(stream, writer)
+            raise
+
+    #
+    # Korutina předá výstup vyprázdněný relací do writer
+    #
+    async def writeAsync(self, stream, writer):
+        data = stream.getvalue()
+        if(data):
+            stream.seek(0)
+            stream.truncate()
+            writer.write(data.encode('utf-8'))
+            await writer.drain()
+
+    #
+    # Funkce připraví vstup, výstup a stav na spuštění programu, vrací proud zachyceného výstupu (nebo None)
+    #
+    def beginRun(self, input, output, errors):
+        if(self.instructions == None):
+            self.error('Není načtený žádný program', 99)
+
+        # vstup instrukce READ
+        if(input is sys.stdin):
+            self.inputFile = None
+        elif(input == None):
+            self.inputFile = io.StringIO()
+        elif(isinstance(input, str)):
+            self.inputFile = io.StringIO(input)
+        else:
+            self.inputFile = input
+
+        # výstup instrukce WRITE
+        captured = None
+        if(output == None):
+            output = captured = io.StringIO()
+        self.output.stream = output
+        self.errors = errors if errors != None else sys.stderr
+
+        self.reset()
+        return captured
+
+    #
+    # Funkce vyprázdní výstup programu ukončeného chybou, zachycený výstup a statistiky připojí k chybě
+    #
+    def abortRun(self, error, captured):
+        self.output.flush()
+        error.stats = dict(self.statsParameters)
+        if(captured != None):
+            error.output = captured.getvalue().encode('utf-8')
+
+    #
+    # Funkce vyprázdní výstup řádně ukončeného programu a vrátí RunResult
+    #
+    def finishRun(self, exitCode, captured):
+        self.output.flush()
+        return RunResult(exitCode, dict(self.statsParameters), captured.getvalue().encode('utf-8') if captured != None else None)
+
+    #
+    # Funkce připraví stav interpretace na nové spuštění programu
+    #
+    def reset(self):
+
+        # rámce zbylé z předchozího spuštění (ukončeného instrukcí EXIT nebo chybou) se vrátí do zásobárny
+        for frame in self.LFStack:
+            self.framePool.release(frame)
+        if(self.TF != None):
+            self.framePool.release(self.TF)
+
+        # globální rámec má slot pro každou globální proměnnou programu
+        self.GF[:] = [None] * len(self.globalSlots)
+        del self.LFStack[:]
+        self.TF = None
+        del self.callStack[:]
+        del self.dataStack[:]
+        self.instructionIndex = 0
+
+        self.initializedVariables = 0
+        for name in self.statsParameters:
+            self.statsParameters[name] = 0
+
+    #
+    # Funkce načte a zvaliduje program a zaregistruje jeho návěští, vrací pole dekódovaných instrukcí,
+    # ve kterých jsou cíle skoků a volání nahrazené indexy instrukcí.
+    #
+    def prepareProgram(self, source):
+        instructions = self.loadProgram(source)
+
+        # registrace všech návěští, cílem je instrukce za návěštím
+        self.labels = {}
+        for index, instruction in enumerate(instructions):
+            if instruction.opcode == self.OPCODE_LABEL:
+                self.setLabel(instruction.args[0], index + 1)
+
+        # nahrazení návěští indexy (neexistující návěští se ohlásí už při načítání)
+        for instruction in instructions:
+            instruction.args = [self.resolveLabel(arg) if arg.kind == self.TYPE_LABEL else arg for arg in instruction.args]
+
+        return instructions
+
+    #
+    # Funkce vrátí připravený program z mezipaměti, při prvním běhu ho připraví a do mezipaměti uloží.
+    # Program ze standartního vstupu se kvůli výpočtu klíče načte celý do paměti.
+    #
+    def loadCachedProgram(self, source, cache):
+        if(not isinstance(source, str)):
+            source = io.BytesIO(source.read())
+
+        try:
+            key = cache.getKey(source)
+        except IOError:
+            self.error('Nepodařilo se otevřít soubor se zdrojovým kódem: ' + str(source), 11)
+
+        program = cache.load(key)
+        if(program != None):
+            instructions, self.globalSlots, self.localSlots, self.labels = program
+            return instructions
+
+        instructions = self.prepareProgram(source)
+        cache.store(key, (instructions, self.globalSlots, self.localSlots, self.labels))
+        return instructions
+
+    #
+    # Funkce vykoná dekódovaný program instrukci po instrukci (výchozí interpretační jádro).
+    #
+    def execute(self, instructions):
+
+        # procházení všech instrukcí, čítač ukazuje na následující instrukci už během vykonávání
+        end = len(instructions)
+        while self.instructionIndex < end:
+
+            # čti instrukci
+            instruction = instructions[self.instructionIndex]
+            self.instructionIndex += 1
+
+            self.executeInstruction(instruction)
+
+    #
+    # Funkce vykoná program s kontrolou limitů vykonávání (samostatná smyčka, bez limitů se nic nekontroluje).
+    # Instrukce mezi kontrolními body se vykonávají ve vnitřní smyčce bez počítání.
+    #
+    def executeLimited(self, instructions):
+        limits = self.limits
+        end = len(instructions)
+        executed = 0
+        checkpoint = limits.start()
+        try:
+            while self.instructionIndex < end:
+                if(executed >= checkpoint):
+                    checkpoint = limits.check(executed, self.instructionIndex)
 
-        # v případě existujícího input souboru se ho pokusíme zavřít
-        if(opts.input != None):
+                for _ in itertools.repeat(None, checkpoint - executed):
+                    if(self.instructionIndex >= end):
+                        break
+                    instruction = instructions[self.instructionIndex]
+                    self.instructionIndex += 1
+
+                    self.executeInstruction(instruction)
+                executed = checkpoint
+        except MemoryError:
+            limits.exceeded('Nedostatek paměti', self.instructionIndex - 1)
+
+    #
+    # Funkce vykoná program s profilováním (--profile), profil se uloží i při ukončení programu instrukcí
+    # EXIT nebo chybou. Jádro transpile se profiluje po instrukcích přes uzávěry jádra closure.
+    #
+    def executeProfiled(self):
+        profiler = Profiler(self, self.instructions)
+        try:
+            if(self.engine == None):
+                profiler.execute(self.instructions)
+            else:
+                profiler.run(self.engine.steps)
+        finally:
+            profiler.finish()
+            self.saveProfile(profiler, self.profile, self.profileFolded)
+
+    #
+    # Funkce uloží výsledky profilování do souboru JSON, případně cesty zásobníkem volání ve formátu folded stacks
+    #
+    def saveProfile(self, profiler, path, foldedPath):
+        try:
+            with open(path, "w") as f:
+                json.dump(profiler.getReport(), f, indent=2)
+        except:
+            self.error('Nepodařilo se otevřít soubor pro zápis profilu: ' + path, 12)
+
+        if(foldedPath != None):
             try:
-                self.inputFile.close()
+                with open(foldedPath, "w") as f:
+                    f.write(''.join(line + '\n' for line in profiler.getFolded()))
             except:
-                self.error('Nepodařilo se zavřít soubor pro čtení vstupu: ' + opts.input,11)
+                self.error('Nepodařilo se otevřít soubor pro zápis profilu: ' + foldedPath, 12)
+
+    #
+    # Funkce čte XML reprezentaci programu proudově (iterparse), každý element instruction dekóduje
+    # hned po jeho přečtení a poté ho zahodí, v paměti tak zůstává jen pole dekódovaných instrukcí,
+    # nad kterým už běží samotná interpretace.
+    #
+    def loadProgram(self, source):
+
+        self.globalSlots = {}
+        self.localSlots = {}
+
+        instructions = []
+        depth = 0
+        try:
+            for event, element in ET.iterparse(source, events=('start', 'end')):
+                if(event == 'start'):
+
+                    # atributy kořenového elementu jsou známé už na jeho začátku
+                    if(depth == 0):
+                        root = element
+                        self.checkProgramElement(root)
+                    depth += 1
+                    continue
+
+                depth -= 1
+
+                # element instruction je načtený včetně argumentů
+                if(depth == 1):
+                    instructions.append(self.loadInstruction(element, len(instructions) + 1))
+
+                    # zahození zpracovaného elementu
+                    root.clear()
+        except ET.ParseError:
+            self.error("Nevalidní formát vstupního XML", 52)
+        except IOError:
+            self.error('Nepodařilo se otevřít soubor se zdrojovým kódem: ' + str(source), 11)
+
+        return instructions
+
+    #
+    # Funkce zkontroluje kořenový element program (název a atributy).
+    #
+    def checkProgramElement(self, root):
+
+        # zkontrolování názvu root elementu
+        if(root.tag != 'program'):
+            self.error('Instrukce musí být ohraničeny tagem program', 31)
+
+        if(root.get('language') != self.language):
+            self.error('Instrukce program musí obsahovat atribut language s hodnout: ' + self.language, 31)
+
+        # interpret navíc oproti sekci 3.1 podporuje existenci volitelných dokumentačních textových atributů name a description v kořenovém elementu program
+        for arg in root.keys():
+            if(arg != 'language' and arg != 'name' and arg != 'description'):
+                self.error('Zakázané použití atributu: ' + arg + '. Instrukce program může obsahovat kromě povinného atributu language s hodnotou: ' +
+                self.language + ' i atributy name a description bez omezení hodnot', 31)
+
+    #
+    # Funkce zkontroluje jeden element instruction a vrátí odpovídající dekódovanou instrukci.
+    #
+    def loadInstruction(self, child, instructionOrder):
+
+        if(child.tag != 'instruction'):
+            self.error('Tag pro každou instrukci v tagu program musí být pojmenovaný instruction', 31)
+        try:
+            order = int(child.get('order'))
+        except (TypeError, ValueError):
+            self.error('Tag pro každou instrukci v tagu program musí obsahovat celočíselný atribut order', 31)
+        if(order != instructionOrder):
+            self.error('Číslování instrukcí není inkrementální po 1, číslo instrukce: ' + child.get('order') + ' by mělo být: ' + str(instructionOrder), 31)
+        if(child.get('opcode') == None):
+            self.error('Tag pro každou instrukci v tagu program musí obsahovat opcode u kterého nezáleží na velikosti písmen', 31)
+
+        # neznámý operační kód
+        opcode = self.OPCODES.get(child.get('opcode').upper())
+        if(opcode == None):
+            self.error('Instrukce: ' + child.get('opcode').upper() + ' neexistuje', 32)
+
+        # procházení všech argumentů (kvůli číslování)
+        args = []
+        argumentOrder = 1
+        for childd in child:
+            match = re.match(r"arg([0-9]+)$", childd.tag, re.I)
+            if match:
+                items = match.groups()
+                if(int(items[0]) != argumentOrder):
+                    self.error('Tag pro každý operand instrukce musí obsahovat arg + číslo pořadí argumentu inkrementující se o 1, začínající na 1. Argument číslo: ' + str(argumentOrder) + ' má číslo: ' + items[0], 31)
+            else:
+                self.error('Tag pro každý operand instrukce musí obsahovat arg + číslo pořadí argumentu inkrementující se o 1, začínající na 1', 31)
+            args.append(self.loadOperand(childd))
+            argumentOrder += 1
 
-        sys.exit(0)
+        # ověření počtu a druhu argumentů podle signatury instrukce
+        self.checkInstructionOperands(child.get('opcode'), args, self.INSTRUCTIONS[opcode][2])
+
+        # opakující se řetězce (jména instrukcí a proměnných) se ukládají jen jednou
+        return Instruction(opcode, sys.intern(child.get('opcode')), args, order)
+
+    #
+    # Funkce dekóduje jeden element argN na popis operandu, formálně nevalidní operand má druh None
+    # a chybu ohlásí kontrola argumentů instrukce hned po jejím načtení.
+    #
+    def loadOperand(self, arg):
+        type = arg.get('type')
+        text = arg.text
+
+        # proměnná
+        if(type == self.TYPE_VAR):
+            match = self.VARIABLE_REGEX.match(text or '')
+            if(match == None):
+                return Operand(None)
+            frame, name = map(sys.intern, match.groups())
+
+            # přidělení slotu jménu proměnné
+            slots = self.globalSlots if frame == self.FRAME_GLOBAL else self.localSlots
+            slot = slots.setdefault(name, len(slots))
+
+            return Operand(self.TYPE_VAR, frame = frame, name = name, slot = slot)
+
+        # návěští
+        elif(type == self.TYPE_LABEL):
+            if(self.LABEL_REGEX.match(text or '') == None):
+                return Operand(None)
+            return Operand(self.TYPE_LABEL, name = text)
+
+        # typ
+        elif(type == self.TYPE_TYPE):
+            if(self.TYPE_REGEX.match(text or '') == None):
+                return Operand(None)
+            return Operand(self.TYPE_TYPE, value = text)
+
+        # konstanta
+        if(not self.isValidConstant(type, text)):
+            return Operand(None)
+        value = self.getConstantValue(text)
+
+        # escape sekvence řetězce se nahradí jednou při načítání
+        if(type == self.TYPE_STRING):
+            value = self.replaceEscapeDecadicSequences(value)
+
+        return Operand(self.TYPE_CONST, value = self.getValueByType(value, type), type = type)
 
     #
     # Funkce slouží pro validování názvu pro návěští.
     #
     def isValidLabel(self, arg):
-        if(arg.get("type") != self.TYPE_LABEL):
-            return False
-        if(re.match('[a-zA-Z0-9_\-$&%*]+$', arg.text) == None):
-            return False
-        return True
+        return arg.kind == self.TYPE_LABEL
 
     def getLabelValue(self, arg):
-        return arg.text
+        return arg.name
 
     #
     # Funkce slouží pro kontrolu názvu proměnné předané v arg
@@ -233,11 +1491,7 @@ class interpret:
     # uloženou v globálním rámci.
     #
     def isValidVariable(self, object):
-        if(object.get("type") != self.TYPE_VAR):
-            return False
-        if(re.match('^(' + self.FRAME_LOCAL + '|' + self.FRAME_TEMPORARY + '|' + self.FRAME_GLOBAL + '){1}@[a-zA-Z_\-$&%*]{1}[a-zA-Z0-9_\-$&%*]*$', object.text) == None):
-            return False
-        return True
+        return object.kind == self.TYPE_VAR
 
     def isValidBoolean(self, value):
         if(re.match('^(' + self.TYPE_BOOLEAN_TRUE + '|' + self.TYPE_BOOLEAN_FALSE + ')$', str(value)) != None):
@@ -275,42 +1529,42 @@ class interpret:
         return True
 
     #
-    # Funkce slouží pro kontrolu hodnoty konstanty předané parametrem arg dle jejího typu
+    # Funkce slouží pro kontrolu hodnoty konstanty dle jejího typu (při načítání programu)
+    #
+    # Vstup: <arg1 type="int">5</arg1> (type = "int", text = "5")
     #
-    def isValidConstant(self, object):
+    def isValidConstant(self, type, text):
 
         # bool
-        if(object.get("type") == self.TYPE_BOOLEAN and self.isValidBoolean(object.text)):
+        if(type == self.TYPE_BOOLEAN and self.isValidBoolean(text)):
             return True
 
-        # integer
-        elif(object.get("type") == self.TYPE_INTEGER and self.isValidInteger(object.text)):
+        # integer (samotné znaménko nebo prázdný text nejsou číslo)
+        elif(type == self.TYPE_INTEGER and self.isValidInteger(text) and re.search('[0-9]', str(text)) != None):
             return True
 
         # string 
-        elif(object.get("type") == self.TYPE_STRING and self.isValidString(object.text)):
+        elif(type == self.TYPE_STRING and self.isValidString(text)):
             return True
 
         # float
-        elif(object.get("type") == self.TYPE_FLOAT and self.isValidFloat(object.text)):
+        elif(type == self.TYPE_FLOAT and self.isValidFloat(text)):
             return True
 
         # nil
-        elif(object.get("type") == self.TYPE_NIL and self.isValidNil(object)):
+        elif(type == self.TYPE_NIL and self.isValidNil(text)):
             return True
 
         return False
 
     def isValidType(self, object):
-        if(re.match('^(' + self.TYPE_STRING + '|' + self.TYPE_INTEGER + '|' + self.TYPE_BOOLEAN + '|' + self.TYPE_FLOAT + '|' + self.TYPE_NIL + '){1}$', object.text) != None):
-            return True
-        return False
+        return object.kind == self.TYPE_TYPE
 
     #
     # Funkce slouží pro kontrolu symbolu předaného parametrem arg, symbol se může skládat buď z proměnné nebo konstanty
     #
     def isValidSymbol(self, object):
-        return self.isValidVariable(object) or self.isValidConstant(object)
+        return object.kind == self.TYPE_VAR or object.kind == self.TYPE_CONST
 
     #
     # Nahradí escape sequence označené dekadickým kódem.
@@ -323,65 +1577,81 @@ class interpret:
         def replace(match):
             return chr(int(match.group(1)))
 
-        aux = str(value)
-        regex = re.compile(r"\\(\d{1,3})")
-        result = regex.sub(replace, aux)
-
-        return result
+        return self.ESCAPE_REGEX.sub(replace, str(value))
 
     #
     # Instruction WRITE
     #
     def writeIns(self, opCode, args):
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_SYMB])
-
-        # získání hodnoty
-        value = self.getSymbolValue(args[0])
-
-        # nahrazení eskape sekvencí
-        if self.getSymbolType(args[0]) == self.TYPE_STRING:
-            value = self.replaceEscapeDecadicSequences(value)
-
-        # tisknutí hodnoty
-        print(value, end="")
+        # tisknutí hodnoty (escape sekvence řetězců jsou nahrazené už při načítání)
+        self.output.write(self.formatValue(self.getSymbolValue(args[0])))
 
     #
     # Instruction EXIT
     #
     def exitIns(self, opCode, args):
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_SYMB], [self.TYPE_INTEGER])
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_INTEGER])
 
-        try:
-            value = self.getSymbolValue(args[0])
-            if value < 0 or value > 49:
-                raise ValueError
-            sys.exit(value)
-        except ValueError:
+        # návratový kód musí být v intervalu 0 až 49
+        value = self.getSymbolValue(args[0])
+        if value < 0 or value > 49:
             self.error('Symbol není celé číslo v intervalu 0 až 49 (včetně)', 57)
 
+        # ukončení programu (výstup vyprázdní interpret.run)
+        raise ProgramExit(value)
+
     #
     # Instruction BREAK
     #
-    def breakIns(self):
-        print('Global Frame: ' + str(self.GF), file=sys.stderr)
-        print('Local Frame: ' + str(self.LFStack), file=sys.stderr)
-        print('Temporary Frame: ' + str(self.TF), file=sys.stderr)
-        if((self.statsParameters.get('--insts', None) != None)):
-            print('Provedené instrukce: ' + str(self.statsParameters['--insts']), file=sys.stderr)
-        if((self.statsParameters.get('--vars', None) != None)):
-            print('Maximální počet inicializovaných proměnných ve všech rámcích: ' + str(self.statsParameters['--vars']), file=sys.stderr)
+    def breakIns(self, opCode, args):
+        self.output.flush()
+        print('Global Frame: ' + str(self.formatFrame(self.GF, self.globalSlots)), file=self.errors)
+        print('Local Frame: ' + str([self.formatFrame(LF, self.localSlots) for LF in self.LFStack]), file=self.errors)
+        print('Temporary Frame: ' + str(self.formatFrame(self.TF, self.localSlots)), file=self.errors)
+        print('Alokované rámce: ' + str(self.framePool.allocated) + ', znovu použité rámce: ' + str(self.framePool.reused), file=self.errors)
+        if((self.statsParameters.get(self.STAT_INSTS, None) != None)):
+            print('Provedené instrukce: ' + str(self.statsParameters[self.STAT_INSTS]), file=self.errors)
+        if((self.statsParameters.get(self.STAT_VARS, None) != None)):
+            print('Maximální počet inicializovaných proměnných ve všech rámcích: ' + str(self.statsParameters[self.STAT_VARS]), file=self.errors)
+
+    #
+    # Převede rámec na slovník {jméno: {'value': X, 'type': Y}} definovaných proměnných pro ladicí výpis
+    #
+    def formatFrame(self, frame, slots):
+        if(frame == None):
+            return None
+        result = {}
+        for name, slot in sorted(slots.items(), key=lambda item: item[1]):
+            if(frame[slot] != None):
+                value = frame[slot].value
+
+                # bool a nil se vypíšou stejně jako instrukcí WRITE
+                if(isinstance(value, (bool, NilValue))):
+                    value = self.formatValue(value)
+                result[name] = {'value': value, 'type': frame[slot].type}
+        return result
+
+    #
+    # Vrátí textovou podobu hodnoty pro výpis (bool jako true/false, nil jako nil). Zadání (revize
+    # 2019-02-12) výpis nil instrukcí WRITE neupřesňuje, zbytek formátu odpovídá print v Pythonu 3.
+    #
+    def formatValue(self, value):
+        if(value is True):
+            return self.TYPE_BOOLEAN_TRUE
+        if(value is False):
+            return self.TYPE_BOOLEAN_FALSE
+        return str(value)
 
     #
     # Instruction ADD
     #
     def addIns(self, opCode, args):
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB, self.TYPE_SYMB], [self.TYPE_UNSPEC, self.TYPE_INTEGER, self.TYPE_INTEGER])
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_UNSPEC, self.TYPE_INTEGER, self.TYPE_INTEGER])
 
         # získání hodnot
         value1 = self.getSymbolValue(args[1])
@@ -392,1166 +1662,3203 @@ class interpret:
 
         # uložení
         self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
+            args[0],
+            result,
+            self.TYPE_INTEGER
+        )
+
+    #
+    # Instruction MUL
+    #
+    def mulIns(self, opCode, args):
+
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_UNSPEC, self.TYPE_INTEGER, self.TYPE_INTEGER])
+
+        # získání hodnot
+        value1 = self.getSymbolValue(args[1])
+        value2 = self.getSymbolValue(args[2])
+
+        # spočítání
+        result = value1 * value2
+
+        # uložení
+        self.setVariable(
+            args[0],
+            result,
+            self.TYPE_INTEGER
+        )
+
+    #
+    # Instruction IDIV
+    #
+    def idivIns(self, opCode, args):
+
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_UNSPEC, self.TYPE_INTEGER, self.TYPE_INTEGER])
+
+        # získání hodnot
+        value1 = self.getSymbolValue(args[1])
+        value2 = self.getSymbolValue(args[2])
+
+        # dělení nulou
+        if value2 == 0:
+            self.error('Dělení nulou', 57)
+
+        # spočítání
+        result = self.divideIntegers(value1, value2)
+
+        # uložení
+        self.setVariable(
+            args[0],
+            result,
+            self.TYPE_INTEGER
+        )
+
+    #
+    # Celočíselné dělení zaokrouhlené k nule jako int(value1 / value2), ale bez převodu na float
+    # (ten u čísel nad 2^53 ztrácí přesnost)
+    #
+    def divideIntegers(self, value1, value2):
+        quotient = abs(value1) // abs(value2)
+        if((value1 < 0) != (value2 < 0)):
+            return -quotient
+        return quotient
+
+    #
+    # Instruction SUB
+    #
+    def subIns(self, opCode, args):
+
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_UNSPEC, self.TYPE_INTEGER, self.TYPE_INTEGER])
+
+        # získání hodnot
+        value1 = self.getSymbolValue(args[1])
+        value2 = self.getSymbolValue(args[2])
+
+        # spočítání
+        result = value1 - value2
+
+        # uložení
+        self.setVariable(
+            args[0],
             result,
             self.TYPE_INTEGER
         )
 
     #
-    # Instruction MUL
+    # Instruction DPRINT
+    #
+    def dprintIns(self, opCode, args):
+
+        # value
+        value = self.getSymbolValue(args[0])
+
+        # vypsání hodnoty (po vyprázdnění výstupu, aby zůstalo zachováno pořadí výpisů)
+        self.output.flush()
+        print(self.formatValue(value), file=self.errors)
+
+    #
+    # Instruction AND
+    #
+    def andIns(self, opCode, args):
+
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_UNSPEC, self.TYPE_BOOLEAN, self.TYPE_BOOLEAN])
+
+        # value1
+        value1 = self.getSymbolValue(args[1])
+
+        # value2
+        value2 = self.getSymbolValue(args[2])
+
+        # AND
+        result = value1 and value2
+
+        # uložení
+        self.setVariable(
+            args[0],
+            result,
+            self.TYPE_BOOLEAN
+        )
+
+    #
+    # Instruction OR
+    #
+    def orIns(self, opCode, args):
+
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_UNSPEC, self.TYPE_BOOLEAN, self.TYPE_BOOLEAN])
+
+        # value1
+        value1 = self.getSymbolValue(args[1])
+
+        # value2
+        value2 = self.getSymbolValue(args[2])
+
+        # OR
+        result = value1 or value2
+
+        # uložení
+        self.setVariable(
+            args[0],
+            result,
+            self.TYPE_BOOLEAN
+        )
+
+    #
+    # Vrátí index cílové instrukce návěští (vyřešený už při načítání programu)
+    #
+    def getLabel(self, labelObject):
+        return labelObject.value
+
+    def setLabel(self, labelObj, index):
+
+        # label
+        label = self.getLabelValue(labelObj)
+
+        # existuje návěští?
+        if label in self.labels:
+            self.error('Pokus o redefinici existujícího návěští', 52)
+
+        # uložení
+        self.labels[label] = index
+
+    #
+    # Vrátí operand návěští doplněný o index cílové instrukce
+    #
+    def resolveLabel(self, labelObject):
+
+        # label
+        label = self.getLabelValue(labelObject)
+
+        # existuje návěští?
+        if not label in self.labels:
+            self.error('Neexistující návěští: ' + label, 52)
+
+        return Operand(self.TYPE_LABEL, name = label, value = self.labels[label])
+
+    #
+    # Instruction JUMP
+    #
+    def jumpIns(self, opCode, args):
+
+        # nastavení skoku
+        self.instructionIndex = self.getLabel(args[0])
+
+    #
+    # Instruction JUMPIFEQ
+    #
+    def jumpifeqIns(self, opCode, args):
+
+        # type1
+        type1 = self.getSymbolType(args[1])
+
+        # type2
+        type2 = self.getSymbolType(args[2])
+
+        # porovnání typů
+        self.checkComparableTypes(opCode, type1, type2)
+
+        # value1
+        value1 = self.getSymbolValue(args[1])
+
+        # value2
+        value2 = self.getSymbolValue(args[2])
+
+        # porovnání hodnot
+        if value1 == value2:
+            self.instructionIndex = self.getLabel(args[0])
+
+    #
+    # Instruction JUMPIFNEQ
+    #
+    def jumpifneqIns(self, opCode, args):
+
+        # type1
+        type1 = self.getSymbolType(args[1])
+
+        # type2
+        type2 = self.getSymbolType(args[2])
+
+        # porovnání typů
+        self.checkComparableTypes(opCode, type1, type2)
+
+        # value1
+        value1 = self.getSymbolValue(args[1])
+
+        # value2
+        value2 = self.getSymbolValue(args[2])
+
+        # porovnání hodnot
+        if value1 != value2:
+            self.instructionIndex = self.getLabel(args[0])
+
+    #
+    # Instruction STRI2INT
+    #
+    def stri2intIns(self, opCode, args):
+
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_UNSPEC, self.TYPE_STRING, self.TYPE_INTEGER])
+
+        # získání pozice
+        position = self.getSymbolValue(args[2])
+
+        # v řetězci
+        text = self.getSymbolValue(args[1])
+
+        try:
+            # získání znaku (záporná pozice je také mimo řetězec)
+            if position < 0:
+                raise IndexError
+            char = text[position]
+
+            # uložení řetězce
+            self.setVariable(
+                args[0],
+                ord(char),
+                self.TYPE_INTEGER
+            )
+        # pozice mimo daný řetězec vede na chybu 58
+        except IndexError:
+            self.error('Indexace mimo daný řetězec', 58)
+
+    #
+    # Instruction FLOAT2INT
+    #
+    def float2intIns(self, opCode, args):
+
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_UNSPEC, self.TYPE_FLOAT])
+
+        # získání hodnoty (nekonečno a NaN nemají celočíselnou hodnotu)
+        try:
+            value = int(float(self.getSymbolValue(args[1])))
+        except (ValueError, OverflowError):
+            self.error('Hodnotu nelze převést na celé číslo', 57)
+
+        # nastavení hodnoty
+        self.setVariable(
+            args[0],
+            value,
+            self.TYPE_INTEGER
+        )
+
+    #
+    # Instruction NOT
+    #
+    def notIns(self, opCode, args):
+
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_UNSPEC, self.TYPE_BOOLEAN])
+
+        # value
+        value = self.getSymbolValue(args[1])
+
+        # NOT
+        result = not value
+
+        # nastavení hodnoty
+        self.setVariable(
+            args[0],
+            result,
+            self.TYPE_BOOLEAN
+        )
+
+    #
+    # Instruction STRLEN
+    #
+    def strlenIns(self, opCode, args):
+
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_UNSPEC, self.TYPE_STRING])
+
+        # zjištění délky
+        length = len(self.getSymbolValue(args[1]))
+
+        # uložení
+        self.setVariable(
+            args[0],
+            length,
+            self.TYPE_INTEGER
+        )
+
+    #
+    # Instruction SETCHAR
+    #
+    def setcharIns(self, opCode, args):
+
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_STRING, self.TYPE_INTEGER, self.TYPE_STRING])
+
+        # získání pozice
+        position = self.getSymbolValue(args[1])
+
+        # v řetězci
+        variable = self.getVariable(args[0])
+        text = variable.value
+
+        # nahrazující znak
+        char = self.getSymbolValue(args[2])
+
+        # pozice mimo daný řetězec nebo prázdný řetězec se znakem vede na chybu 58
+        if position < 0 or position >= len(text) or len(char) == 0:
+            self.error('Indexace mimo daný řetězec', 58)
+
+        # krátký řetězec se nahradí novým, dlouhý se mění v měnitelném bufferu proměnné
+        if(text.__class__ is not StringBuilder):
+            if(len(text) < self.STRING_BUILDER_THRESHOLD):
+                variable.value = text[:position] + char[0] + text[position + 1:]
+                return
+            text = StringBuilder(text)
+            variable.value = text
+        text.setChar(position, char[0])
+
+    #
+    # Ověří, že operandy porovnání mají stejný typ, neinicializovaná proměnná vede na chybu 56
+    #
+    def checkComparableTypes(self, opCode, type1, type2):
+        if(type1 is None or type2 is None):
+            self.operandTypeError(opCode, 1 if type1 is None else 2, None, None)
+        if type1 != type2:
+            self.error('Typy se musejí rovnat', 53)
+
+    #
+    # Instruction LT
+    #
+    def ltIns(self, opCode, args):
+
+        # type1
+        type1 = self.getSymbolType(args[1])
+
+        # type2
+        type2 = self.getSymbolType(args[2])
+
+        # porovnání typů
+        self.checkComparableTypes(opCode, type1, type2)
+
+        # dodatečná kontrola typů
+        if type1 == self.TYPE_NIL or type2 == self.TYPE_NIL:
+            self.error('S operandem typu ' + self.TYPE_NIL + ' lze porovnávat pouze instrukcí EQ', 53)
+
+        # value1
+        value1 = self.getSymbolValue(args[1])
+
+        # value2
+        value2 = self.getSymbolValue(args[2])
+
+        # porovnání hodnot
+        result = value1 < value2
+
+        # uložení výsledku
+        self.setVariable(
+            args[0],
+            result,
+            self.TYPE_BOOLEAN
+        )
+
+
+    #
+    # Instruction EQ
+    #
+    def eqIns(self, opCode, args):
+
+        # type1
+        type1 = self.getSymbolType(args[1])
+
+        # type2
+        type2 = self.getSymbolType(args[2])
+
+        # porovnání typů
+        self.checkComparableTypes(opCode, type1, type2)
+
+        # value1
+        value1 = self.getSymbolValue(args[1])
+
+        # value2
+        value2 = self.getSymbolValue(args[2])
+
+        # porovnání hodnot
+        result = value1 == value2
+
+        # uložení výsledku
+        self.setVariable(
+            args[0],
+            result,
+            self.TYPE_BOOLEAN
+        )
+
+    #
+    # Instruction GT
+    #
+    def gtIns(self, opCode, args):
+
+        # type1
+        type1 = self.getSymbolType(args[1])
+
+        # type2
+        type2 = self.getSymbolType(args[2])
+
+        # porovnání typů
+        self.checkComparableTypes(opCode, type1, type2)
+
+        # dodatečná kontrola typů
+        if type1 == self.TYPE_NIL or type2 == self.TYPE_NIL:
+            self.error('S operandem typu ' + self.TYPE_NIL + ' lze porovnávat pouze instrukcí EQ', 53)
+
+        # value1
+        value1 = self.getSymbolValue(args[1])
+
+        # value2
+        value2 = self.getSymbolValue(args[2])
+
+        # porovnání hodnot
+        result = value1 > value2
+
+        # uložení výsledku
+        self.setVariable(
+            args[0],
+            result,
+            self.TYPE_BOOLEAN
+        )
+
+    #
+    # Instruction GETCHAR
+    #
+    def getcharIns(self, opCode, args):
+
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_UNSPEC, self.TYPE_STRING, self.TYPE_INTEGER])
+
+        # získání pozice
+        position = self.getSymbolValue(args[2])
+
+        # v textu
+        text = self.getSymbolValue(args[1])
+
+        try:
+            # získání znaku (záporná pozice je také mimo řetězec)
+            if position < 0:
+                raise IndexError
+            char = text[position]
+
+            # uložení znaku
+            self.setVariable(
+                args[0],
+                char,
+                self.TYPE_STRING
+            )
+        # pozice mimo daný řetězec vede na chybu 58
+        except IndexError:
+            self.error('Indexace mimo daný řetězec', 58)
+
+    #
+    # Instruction TYPE
+    #
+    def typeIns(self, opCode, args):
+
+        # zjištění typu (neinicializovaná proměnná má prázdný řetězec)
+        type = self.getSymbolType(args[1])
+
+        # uložení typu
+        self.setVariable(
+            args[0],
+            type if type != None else '',
+            self.TYPE_STRING
+        )
+
+    #
+    # Instruction CONCAT
+    #
+    def concatIns(self, opCode, args):
+
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_UNSPEC, self.TYPE_STRING, self.TYPE_STRING])
+
+        # value1
+        value1 = self.getSymbolValue(args[1])
+
+        # value2
+        value2 = self.getSymbolValue(args[2])
+
+        # připojení na konec proměnné, která je zároveň cílem (CONCAT GF@s GF@s ...)
+        if(self.isSameVariable(args[0], args[1])):
+            self.appendString(self.getVariable(args[0]), value2)
+            return
+
+        # konkatenace
+        result = value1 + value2
+
+        # nastavení hodnoty
+        self.setVariable(
+            args[0],
+            result,
+            self.TYPE_STRING
+        )
+
+    #
+    # Ověří, zda dva operandy označují stejnou proměnnou (stejný rámec i slot)
+    #
+    def isSameVariable(self, arg1, arg2):
+        return arg1.kind == self.TYPE_VAR and arg2.kind == self.TYPE_VAR and arg1.frame == arg2.frame and arg1.slot == arg2.slot
+
+    #
+    # Připojí řetězec na konec řetězcové proměnné, dlouhý řetězec proměnné se převede na StringBuilder
+    #
+    def appendString(self, variable, piece):
+        text = variable.value
+        if(text.__class__ is not StringBuilder):
+            if(len(text) < self.STRING_BUILDER_THRESHOLD):
+                variable.value = text + piece
+                return
+            text = StringBuilder(text)
+            variable.value = text
+        text.append(piece)
+
+    #
+    # Instruction INT2CHAR
+    #
+    def int2charIns(self, opCode, args):
+
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_UNSPEC, self.TYPE_INTEGER])
+
+        try:
+            # získání znaku
+            char = chr(int(self.getSymbolValue(args[1])))
+
+            # nastavení hodnoty
+            self.setVariable(
+                args[0],
+                char,
+                self.TYPE_STRING
+            )
+        # Není-li symb validní ordinální hodnota znaku v Unicode dojde k chybě 58.
+        except (ValueError, OverflowError):
+            self.error('Není validní ordinální hodnota znaku v Unicode', 58)
+
+    #
+    # Instruction INT2FLOAT
+    #
+    def int2floatIns(self, opCode, args):
+
+        # ověření typů operandů
+        self.checkOperandTypes(opCode, args, [self.TYPE_UNSPEC, self.TYPE_INTEGER])
+
+        # získání hodnoty (celé číslo mimo rozsah float)
+        try:
+            value = float(int(self.getSymbolValue(args[1])))
+        except OverflowError:
+            self.error('Celé číslo je mimo rozsah typu float', 57)
+
+        # nastavení hodnoty
+        self.setVariable(
+            args[0],
+            value,
+            self.TYPE_FLOAT
+        )
+
+    def getTypeValue(self, typeObj):
+        return typeObj.value
+
+    #
+    # Instruction READ
+    #
+    def readIns(self, opCode, args):
+
+        # type
+        type = self.getTypeValue(args[1])
+
+        # hodnota
+        value = None
+
+        # v případě existujícího input souboru vezmeme z něj
+        if(self.inputFile != None):
+            try:
+                value = self.inputFile.readline().rstrip()
+            except:
+                self.error('Nepodařilo se číst soubor pro čtení vstupu', 11)
+        # jinak čekáme na zadání od uživatele (dosavadní výstup musí být vidět)
+        else:
+            self.output.flush()
+            value = input()
+
+        # nastavení proměnné
+        self.setVariable(
+            args[0],
+            self.getInitialVariableValueByType(value, type),
+            type
+        )
+
+    #
+    # Funkce vrací textovou hodnotu konstanty z XML (prázdný element je prázdný řetězec).
+    #
+    # Vstup: <arg1 type="string">světe</arg1>
+    #        <arg1 type="string"></arg1>
+    def getConstantValue(self, text):
+        if(text == None):
+            return ""
+        return text
+
+    #
+    # Funkce vrátí hodnotu pro symbol.
+    #
+    # Vstup: <arg1 type="var">GF@val</arg1>
+    #        <arg1 type="string">světe</arg1>
+    #
+    def getSymbolValue(self, symbObject):
+
+        # symbol je proměnná
+        if(symbObject.kind == self.TYPE_VAR):
+          return self.getVariable(symbObject).value
+
+        # symbol je konstanta (hodnota je dekódovaná už při načítání)
+        return symbObject.value
+
+    def getSymbolType(self, symbObject):
+
+        # symbol je proměnná
+        if(symbObject.kind == self.TYPE_VAR):
+          return self.getVariable(symbObject).type
+
+        # symbol je konstanta
+        return symbObject.type
+
+    #
+    # Instruction PUSHS
     #
-    def mulIns(self, opCode, args):
+    def pushsIns(self, opCode, args):
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB, self.TYPE_SYMB], [self.TYPE_UNSPEC, self.TYPE_INTEGER, self.TYPE_INTEGER])
+        # hodnota a typ symbolu se vyhodnotí už při vložení
+        value = self.getSymbolValue(args[0])
+        type = self.getSymbolType(args[0])
 
-        # získání hodnot
-        value1 = self.getSymbolValue(args[1])
-        value2 = self.getSymbolValue(args[2])
+        # neinicializovanou proměnnou nelze vložit
+        if(type is None):
+            self.operandTypeError(opCode, 0, type, None)
 
-        # spočítání
-        result = value1 * value2
+        # rozpracovaný řetězec se vloží jako neměnný str
+        if(value.__class__ is StringBuilder):
+            value = str(value)
 
-        # uložení
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            result,
-            self.TYPE_INTEGER
-        )
+        # přidání hodnoty na vrchol zásobníku
+        self.pushStack(value, type)
 
     #
-    # Instruction IDIV
+    # Instruction POPS
     #
-    def idivIns(self, opCode, args):
-
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB, self.TYPE_SYMB], [self.TYPE_UNSPEC, self.TYPE_INTEGER, self.TYPE_INTEGER])
-
-        # získání hodnot
-        value1 = self.getSymbolValue(args[1])
-        value2 = self.getSymbolValue(args[2])
+    def popsIns(self, opCode, args):
 
-        # spočítání
-        result = value1 / value2
+        # vytáhnutí hodnoty z vrcholu zásobníku
+        # zásobník nesmí být prázdný
+        try:
+            record = self.dataStack.pop()
+        except (IndexError):
+            self.error('Datový zásobník je prázdný', 56)
 
-        # uložení
+        # nastavení hodnoty do proměnné
         self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            result,
-            self.TYPE_INTEGER
+            args[0],
+            record.value,
+            record.type
         )
 
     #
-    # Instruction SUB
+    # Vloží na vrchol datového zásobníku vyhodnocenou hodnotu daného typu
     #
-    def subIns(self, opCode, args):
-
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB, self.TYPE_SYMB], [self.TYPE_UNSPEC, self.TYPE_INTEGER, self.TYPE_INTEGER])
-
-        # získání hodnot
-        value1 = self.getSymbolValue(args[1])
-        value2 = self.getSymbolValue(args[2])
+    def pushStack(self, value, type):
+        self.dataStack.append(Variable(value, type))
 
-        # spočítání
-        result = value1 - value2
+    #
+    # Vyjme z vrcholu datového zásobníku count hodnot, vrací je v pořadí operandů (poslední vložená
+    # hodnota je posledním operandem), zásobník musí obsahovat dostatek hodnot
+    #
+    def popStackOperands(self, count):
+        if(len(self.dataStack) < count):
+            self.error('Datový zásobník je prázdný', 56)
 
-        # uložení
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            result,
-            self.TYPE_INTEGER
-        )
+        records = self.dataStack[-count:]
+        del self.dataStack[-count:]
+        return records
 
     #
-    # Instruction DPRINT
+    # Ověří typy operandů zásobníkové instrukce (pozice se čísluje jako u instrukce s proměnnou var)
     #
-    def dprintIns(self, opCode, args):
+    def checkStackOperandTypes(self, opCode, records, requiredArgsType):
+        for position, record in enumerate(records):
+            if(record.type != requiredArgsType[position]):
+                self.operandTypeError(opCode, position + 1, record.type, requiredArgsType[position])
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_SYMB])
-
-        # value
-        value = self.getSymbolValue(args[0])
+    #
+    # Instruction CLEARS
+    #
+    def clearsIns(self, opCode, args):
 
-        # vypsání hodnoty
-        print(value, file=sys.stderr)
+        # vyprázdnění na místě (přeložená jádra drží odkaz na pole zásobníku)
+        del self.dataStack[:]
 
     #
-    # Instruction AND
+    # Společná část instrukcí ADDS, SUBS, MULS
     #
-    def andIns(self, opCode, args):
+    def arithmeticStack(self, opCode, operation):
+        record1, record2 = self.popStackOperands(2)
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB, self.TYPE_SYMB], [self.TYPE_UNSPEC, self.TYPE_BOOLEAN, self.TYPE_BOOLEAN])
+        # ověření typů operandů
+        self.checkStackOperandTypes(opCode, (record1, record2), [self.TYPE_INTEGER, self.TYPE_INTEGER])
 
-        # value1
-        value1 = self.getSymbolValue(args[1])
+        # spočítání a uložení
+        self.pushStack(operation(record1.value, record2.value), self.TYPE_INTEGER)
 
-        # value2
-        value2 = self.getSymbolValue(args[2])
+    #
+    # Instruction ADDS
+    #
+    def addsIns(self, opCode, args):
+        self.arithmeticStack(opCode, operator.add)
 
-        # AND
-        if value1 and value2:
-            result = self.TYPE_BOOLEAN_TRUE
-        else:
-            result = self.TYPE_BOOLEAN_FALSE
+    #
+    # Instruction SUBS
+    #
+    def subsIns(self, opCode, args):
+        self.arithmeticStack(opCode, operator.sub)
 
-        # uložení
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            result,
-            self.TYPE_BOOLEAN
-        )
+    #
+    # Instruction MULS
+    #
+    def mulsIns(self, opCode, args):
+        self.arithmeticStack(opCode, operator.mul)
 
     #
-    # Instruction OR
+    # Instruction IDIVS
     #
-    def orIns(self, opCode, args):
+    def idivsIns(self, opCode, args):
+        record1, record2 = self.popStackOperands(2)
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB, self.TYPE_SYMB], [self.TYPE_UNSPEC, self.TYPE_BOOLEAN, self.TYPE_BOOLEAN])
+        # ověření typů operandů
+        self.checkStackOperandTypes(opCode, (record1, record2), [self.TYPE_INTEGER, self.TYPE_INTEGER])
 
-        # value1
-        value1 = self.getSymbolValue(args[1])
+        # dělení nulou
+        if record2.value == 0:
+            self.error('Dělení nulou', 57)
 
-        # value2
-        value2 = self.getSymbolValue(args[2])
+        # spočítání a uložení
+        self.pushStack(self.divideIntegers(record1.value, record2.value), self.TYPE_INTEGER)
 
-        # OR
-        if value1 and value2:
-            result = self.TYPE_BOOLEAN_TRUE
-        else:
-            result = self.TYPE_BOOLEAN_FALSE
+    #
+    # Společná část instrukcí LTS, GTS, EQS
+    #
+    def relationalStack(self, opCode, operation, nilAllowed):
+        record1, record2 = self.popStackOperands(2)
 
-        # uložení
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            result,
-            self.TYPE_BOOLEAN
-        )
+        # porovnání typů
+        self.checkComparableTypes(opCode, record1.type, record2.type)
 
-    def getLabel(self, labelObject):
+        # dodatečná kontrola typů
+        if not nilAllowed and record1.type == self.TYPE_NIL:
+            self.error('S operandem typu ' + self.TYPE_NIL + ' lze porovnávat pouze instrukcí EQS', 53)
 
-        # value
-        value = self.getLabelValue(labelObject)
+        # porovnání hodnot a uložení výsledku
+        self.pushStack(operation(record1.value, record2.value), self.TYPE_BOOLEAN)
 
-        # existuje návěští?
-        if not value in self.labels:
-            self.error('Neexistující návěští', 52)
+    #
+    # Instruction LTS
+    #
+    def ltsIns(self, opCode, args):
+        self.relationalStack(opCode, operator.lt, False)
 
-        return self.labels[value]
+    #
+    # Instruction GTS
+    #
+    def gtsIns(self, opCode, args):
+        self.relationalStack(opCode, operator.gt, False)
 
-    def setLabel(self, labelObj):
+    #
+    # Instruction EQS
+    #
+    def eqsIns(self, opCode, args):
+        self.relationalStack(opCode, operator.eq, True)
 
-        # label
-        label = self.getLabelValue(labelObj)
+    #
+    # Instruction ANDS
+    #
+    def andsIns(self, opCode, args):
+        record1, record2 = self.popStackOperands(2)
 
-        # existuje návěští?
-        if label in self.labels:
-            self.error('Pokus o redefinici existujícího návěští', 52)
+        # ověření typů operandů
+        self.checkStackOperandTypes(opCode, (record1, record2), [self.TYPE_BOOLEAN, self.TYPE_BOOLEAN])
 
-        # uložení
-        self.labels[label] = self.instructionOrder
+        # AND
+        self.pushStack(record1.value and record2.value, self.TYPE_BOOLEAN)
 
     #
-    # Instruction LABEL
+    # Instruction ORS
     #
-    def labelIns(self, opCode, args):
+    def orsIns(self, opCode, args):
+        record1, record2 = self.popStackOperands(2)
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_LABEL])
+        # ověření typů operandů
+        self.checkStackOperandTypes(opCode, (record1, record2), [self.TYPE_BOOLEAN, self.TYPE_BOOLEAN])
 
-        # uložení
-        self.setLabel(args[0])
+        # OR
+        self.pushStack(record1.value or record2.value, self.TYPE_BOOLEAN)
 
     #
-    # Instruction JUMP
+    # Instruction NOTS
     #
-    def jumpIns(self, opCode, args):
+    def notsIns(self, opCode, args):
+        record, = self.popStackOperands(1)
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_LABEL])
+        # ověření typu operandu
+        self.checkStackOperandTypes(opCode, (record,), [self.TYPE_BOOLEAN])
 
-        # nastavení skoku
-        self.jumpTo = self.getLabel(args[0])
+        # NOT
+        self.pushStack(not record.value, self.TYPE_BOOLEAN)
 
     #
-    # Instruction JUMPIFEQ
+    # Instruction INT2CHARS
     #
-    def jumpifeqIns(self, opCode, args):
+    def int2charsIns(self, opCode, args):
+        record, = self.popStackOperands(1)
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_LABEL, self.TYPE_SYMB, self.TYPE_SYMB])
+        # ověření typu operandu
+        self.checkStackOperandTypes(opCode, (record,), [self.TYPE_INTEGER])
 
-        # type1
-        type1 = self.getSymbolType(args[1])
+        # Není-li hodnota validní ordinální hodnota znaku v Unicode dojde k chybě 58.
+        try:
+            char = chr(record.value)
+        except (ValueError, OverflowError):
+            self.error('Není validní ordinální hodnota znaku v Unicode', 58)
 
-        # type2
-        type2 = self.getSymbolType(args[2])
+        self.pushStack(char, self.TYPE_STRING)
 
-        # porovnání typů
-        if type1 != type2:
-            self.error('Typy se musejí rovnat', 53)
+    #
+    # Instruction STRI2INTS
+    #
+    def stri2intsIns(self, opCode, args):
+        record1, record2 = self.popStackOperands(2)
 
-        # value1
-        value1 = self.getSymbolValue(args[1])
+        # ověření typů operandů
+        self.checkStackOperandTypes(opCode, (record1, record2), [self.TYPE_STRING, self.TYPE_INTEGER])
 
-        # value2
-        value2 = self.getSymbolValue(args[2])
+        # pozice mimo daný řetězec (i záporná) vede na chybu 58
+        position = record2.value
+        if position < 0 or position >= len(record1.value):
+            self.error('Indexace mimo daný řetězec', 58)
 
-        # porovnání hodnot
-        if value1 == value2:
-            self.jumpTo = self.getLabel(args[0])
+        self.pushStack(ord(record1.value[position]), self.TYPE_INTEGER)
 
     #
-    # Instruction JUMPIFNEQ
+    # Instruction JUMPIFEQS
     #
-    def jumpifneqIns(self, opCode, args):
+    def jumpifeqsIns(self, opCode, args):
+        record1, record2 = self.popStackOperands(2)
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_LABEL, self.TYPE_SYMB, self.TYPE_SYMB])
+        # porovnání typů
+        self.checkComparableTypes(opCode, record1.type, record2.type)
 
-        # type1
-        type1 = self.getSymbolType(args[1])
+        # porovnání hodnot
+        if record1.value == record2.value:
+            self.instructionIndex = self.getLabel(args[0])
 
-        # type2
-        type2 = self.getSymbolType(args[2])
+    #
+    # Instruction JUMPIFNEQS
+    #
+    def jumpifneqsIns(self, opCode, args):
+        record1, record2 = self.popStackOperands(2)
 
         # porovnání typů
-        if type1 != type2:
-            self.error('Typy se musejí rovnat', 53)
+        self.checkComparableTypes(opCode, record1.type, record2.type)
 
-        # value1
-        value1 = self.getSymbolValue(args[1])
+        # porovnání hodnot
+        if record1.value != record2.value:
+            self.instructionIndex = self.getLabel(args[0])
 
-        # value2
-        value2 = self.getSymbolValue(args[2])
+    #
+    # V případě chybného vstupu bude do proměnné uložena implicitní hodnota (dle typu 0, prázdný řetězec nebo false).
+    #
+    def getInitialVariableValueByType(self, value, type):
+        if type == self.TYPE_STRING:
+            try:
+                return str(value)
+            except (ValueError, TypeError):
+                return ""
+        if type == self.TYPE_INTEGER:
+            try:
+                return int(value)
+            except (ValueError, TypeError):
+                return 0
+        if type == self.TYPE_FLOAT:
+            floatValue = self.getFloatValueFromString(value)
+            if floatValue != None:
+                return floatValue
+            else:
+                return 0
+        if type == self.TYPE_BOOLEAN:
+            return value.upper() == self.TYPE_BOOLEAN_TRUE.upper()
+        if type == self.TYPE_NIL:
+            return Nil
 
-        # porovnání hodnot
-        if value1 != value2:
-            self.jumpTo = self.getLabel(args[0])
+        return value
 
     #
-    # Instruction STRI2INT
+    # Převede validní text konstanty na nativní hodnotu daného typu (bool na True/False, nil na Nil).
     #
-    def stri2intIns(self, opCode, args):
+    def getValueByType(self, value, type):
+        if type == self.TYPE_STRING:
+            return str(value)
+        elif type == self.TYPE_INTEGER:
+            return int(value)
+        elif type == self.TYPE_BOOLEAN:
+            return value == self.TYPE_BOOLEAN_TRUE
+        elif type == self.TYPE_NIL:
+            return Nil
+        elif type == self.TYPE_FLOAT:
+            return self.getFloatValueFromString(value)
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB, self.TYPE_SYMB], [self.TYPE_UNSPEC, self.TYPE_STRING, self.TYPE_INTEGER])
+        return value
 
-        # získání pozice
-        position = self.getSymbolValue(args[2])
+    #
+    # Funkce kontroluje formální stránku argumentů instrukce (počet a druh operandů), volá se jednou
+    # při načítání programu podle signatury instrukce v tabulce INSTRUCTIONS.
+    #
+    def checkInstructionOperands(self, opCode, argsObject, requiredArgs):
+        if(len(requiredArgs) != len(argsObject)):
+            self.error('U instrukce ' + opCode + ' musí být počet argumentů roven ' + str(len(requiredArgs)), 52)
 
-        # v řetězci
-        text = self.getSymbolValue(args[1])
+        requiredArgsCounter = 0
+        for requiredArg in requiredArgs:
+             if(requiredArg == self.TYPE_VAR):
+                if(not self.isValidVariable(argsObject[requiredArgsCounter])):
+                    self.error('Vyžadovaný argument ve funkci ' + opCode + ' na pozici ' + str(requiredArgsCounter) + ' typu proměnná (var) není validní', 53)
+             elif(requiredArg == self.TYPE_SYMB):
+                if(not self.isValidSymbol(argsObject[requiredArgsCounter])):
+                    self.error('Vyžadovaný argument ve funkci ' + opCode + ' na pozici ' + str(requiredArgsCounter) + ' typu symbol (var, const) není validní', 53)
+             elif(requiredArg == self.TYPE_LABEL):
+                if(not self.isValidLabel(argsObject[requiredArgsCounter])):
+                    self.error('Vyžadovaný argument ve funkci ' + opCode + ' na pozici ' + str(requiredArgsCounter) + ' typu návěští (label) není validní', 53)
+             elif(requiredArg == self.TYPE_TYPE):
+                if(not self.isValidType(argsObject[requiredArgsCounter])):
+                    self.error('Vyžadovaný argument ve funkci ' + opCode + ' na pozici ' + str(requiredArgsCounter) + ' typu typ (type) není validní', 53)
 
-        try:
-            # získání znaku
-            char = text[position]
+             requiredArgsCounter+=1
 
-            # uložení řetězce
-            self.setVariable(
-                self.getVariableFrame(args[0]),
-                self.getVariableName(args[0]),
-                ord(char),
-                self.TYPE_INTEGER
-            )
-        # pozice mimo daný řetězec vede na chybu 58
-        except IndexError:
-            self.error('Indexace mimo daný řetězec', 58)
+    #
+    # Funkce kontroluje za běhu typy hodnot operandů, druh operandů už ověřilo načítání programu.
+    #
+    def checkOperandTypes(self, opCode, argsObject, requiredArgsType):
+        requiredArgsTypeCounter = 0
+        for requiredArgType in requiredArgsType:
+            if(requiredArgType != self.TYPE_UNSPEC):
+                type = self.getSymbolType(argsObject[requiredArgsTypeCounter])
+                if(type != requiredArgType):
+                    self.operandTypeError(opCode, requiredArgsTypeCounter, type, requiredArgType)
+
+            requiredArgsTypeCounter+=1
 
     #
-    # Instruction FLOAT2INT
+    # Chyba operandu nevyhovujícího typu, neinicializovaná proměnná (bez typu) vede na chybu 56
     #
-    def float2intIns(self, opCode, args):
+    def operandTypeError(self, opCode, position, type, requiredType):
+        if(type is None):
+            self.error('Čtení neinicializované proměnné ve funkci ' + opCode + ' na pozici ' + str(position), 56)
+        self.error('Vyžadovaný argument ve funkci ' + opCode + ' na pozici ' + str(position) + ' typu ' + requiredType + ' není validní', 53)
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB], [self.TYPE_UNSPEC, self.TYPE_FLOAT])
+    #
+    # Instruction CREATEFRAME
+    #
+    def createFrameIns(self, opCode, args):
 
-        # získání hodnoty
-        value = int(float(self.getSymbolValue(args[1])))
+        # vytvoří nový dočasný rámec a zahodí případný obsah původního dočasného rámce
+        self.discardFrame(self.TF)
+        self.TF = self.newFrame()
 
-        # nastavení hodnoty
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            value,
-            self.TYPE_INTEGER
-        )
+    #
+    # Vrátí nový prázdný lokální rámec se slotem pro každé jméno lokální proměnné programu
+    # (přednostně dříve zahozený rámec ze zásobárny)
+    #
+    def newFrame(self):
+        return self.framePool.acquire()
 
     #
-    # Instruction NOT
+    # Instruction PUSHFRAME
     #
-    def notIns(self, opCode, args):
+    def pushFrameIns(self, opCode, args):
+
+        # dočasný rámec k přesunutí musí existovat
+        if(self.TF is None):
+            self.error('Pokus o přístup k nedefinovanému dočasnému rámci', 55)
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB], [self.TYPE_UNSPEC, self.TYPE_BOOLEAN])
+        # přesun TF na zásobník rámců
+        self.LFStack.append(self.TF)
 
-        # value
-        value = self.getSymbolValue(args[1])
+        # dočasný rámec je po přesunutí nedefinován
+        self.TF = None
+
+    #
+    # Instruction POPFRAME
+    #
+    def popFrameIns(self, opCode, args):
 
-        # NOT
-        if value:
-            result = self.TYPE_BOOLEAN_FALSE
-        else:
-            result = self.TYPE_BOOLEAN_TRUE
+        # zásobník rámců musí obsahovat alespoň 1 lokální rámec
+        if(len(self.LFStack) == 0):
+            self.error('Zásobník rámců je prázdný, žádný lokální rámec není v aktuální chvíli definovaný', 55)
 
-        # nastavení hodnoty
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            result,
-            self.TYPE_BOOLEAN
-        )
+        # přesun vrcholového rámce do TF (bez kopírování), původní dočasný rámec se zahodí
+        self.discardFrame(self.TF)
+        self.TF = self.LFStack.pop()
 
     #
-    # Instruction STRLEN
+    # Instruction MOVE
     #
-    def strlenIns(self, opCode, args):
+    def moveIns(self, opCode, args):
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB], [self.TYPE_UNSPEC, self.TYPE_STRING])
+        # hodnota symb (rozpracovaný řetězec se předá jako neměnný str)
+        value = self.getSymbolValue(args[1])
+        type = self.getSymbolType(args[1])
+        if(value.__class__ is StringBuilder):
+            value = str(value)
 
-        # zjištění délky
-        length = len(self.getSymbolValue(args[1]))
+        # neinicializovanou proměnnou nelze přečíst
+        if(type is None):
+            self.operandTypeError(opCode, 1, type, None)
 
-        # uložení
+        # zkopíruje hodnotu symb do var
         self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            length,
-            self.TYPE_INTEGER
+            args[0],
+            value,
+            type
         )
 
     #
-    # Instruction SETCHAR
+    # Vrací rámec (pole slotů proměnných) pro označení rámce GF, LF nebo TF.
     #
-    def setcharIns(self, opCode, args):
+    def getFrame(self, varFrame):
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB, self.TYPE_SYMB], [self.TYPE_STRING, self.TYPE_INTEGER, self.TYPE_STRING])
+        # globální rámec je automaticky inicializován na začátku interpretace
+        if(varFrame == self.FRAME_GLOBAL):
+            return self.GF
 
-        # získání pozice
-        position = self.getSymbolValue(args[1])
+        # lokální rámec
+        elif(varFrame == self.FRAME_LOCAL):
 
-        # v řetězci
-        text = self.getVariable(self.getVariableFrame(args[0]), self.getVariableName(args[0])).get('value')
+            # zásobník rámců musí obsahovat alespoň 1 lokální rámec
+            if(len(self.LFStack) == 0):
+                self.error('Zásobník rámců je prázdný, žádný lokální rámec není v aktuální chvíli definovaný', 55)
 
-        # získání prvního znaku
-        char = self.getSymbolValue(args[2])[0]
+            return self.LFStack[-1]
 
-        try:
-            # nahrazení znaku
-            text[position] = char
+        # dočasný rámec musí existovat
+        if(self.TF == None):
+            self.error('Dočasný rámec je nedefinovaný', 55)
 
-            # uložení řetězce
-            self.setVariable(
-                self.getVariableFrame(args[0]),
-                self.getVariableName(args[0]),
-                text,
-                self.TYPE_STRING
-            )
-        # pozice mimo daný řetězec vede na chybu 58
-        except IndexError:
-            self.error('Indexace mimo daný řetězec', 58)
+        return self.TF
 
     #
-    # Instruction LT
+    # Definuje proměnnou popsanou operandem var (rámec a slot) bez hodnoty a typu.
     #
-    def ltIns(self, opCode, args):
-
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB, self.TYPE_SYMB], [self.TYPE_BOOLEAN, self.TYPE_UNSPEC, self.TYPE_UNSPEC])
-
-        # type1
-        type1 = self.getSymbolType(args[1])
+    def defineVariable(self, var):
+        frame = self.getFrame(var.frame)
 
-        # type2
-        type2 = self.getSymbolType(args[2])
-
-        # porovnání typů
-        if type1 != type2:
-            self.error('Typy se musejí rovnat', 53)
+        # redefinice inicializované proměnné
+        if(self.trackVariables and frame[var.slot] != None):
+            self.updateInitializedVariables(frame[var.slot].value, None)
 
-        # dodatečná kontrola typů
-        if type1 == self.TYPE_NIL or type2 == self.TYPE_NIL:
-            self.error('S operandem typu ' + self.TYPE_NIL + ' lze porovnávat pouze instrukcí EQ', 53)
+        frame[var.slot] = Variable()
 
-        # value1
-        value1 = self.getSymbolValue(args[1])
+    #
+    # Nastavuje hodnotu a typ proměnné popsané operandem var (rámec a slot), záznam proměnné se mění na místě.
+    #
+    def setVariable(self, var, varValue, varType):
 
-        # value2
-        value2 = self.getSymbolValue(args[2])
+        # nastav (hodnota je už nativní hodnotou daného typu)
+        variable = self.getVariable(var)
+        if(self.trackVariables):
+            self.updateInitializedVariables(variable.value, varValue)
+        variable.value = varValue
+        variable.type = varType
 
-        # porovnání hodnot
-        if str(value1) < str(value2):
-            result = self.TYPE_BOOLEAN_TRUE
-        else:
-            result = self.TYPE_BOOLEAN_FALSE
+    #
+    # Vrací záznam proměnné popsané operandem var (rámec a slot).
+    #
+    # Výstup: Variable (value, type)
+    #
+    def getVariable(self, var):
+        variable = self.getFrame(var.frame)[var.slot]
 
-        # uložení výsledku
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            result,
-            self.TYPE_BOOLEAN
-        )
+        # neexistuje proměnná
+        if(variable == None):
+            self.error('Proměnná:' + var.name + ' na ' + var.frame + ' neexistuje', 54)
 
+        return variable
 
     #
-    # Instruction EQ
+    # Instruction DEFVAR
     #
-    def eqIns(self, opCode, args):
+    def defVarIns(self, opCode, args):
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB, self.TYPE_SYMB], [self.TYPE_BOOLEAN, self.TYPE_UNSPEC, self.TYPE_UNSPEC])
+        # nastav (bez určení typu a hodnoty)
+        self.defineVariable(args[0])
 
-        # type1
-        type1 = self.getSymbolType(args[1])
+    #
+    # Instruction CALL
+    #
+    def callIns(self, opCode, args):
 
-        # type2
-        type2 = self.getSymbolType(args[2])
+        # uloží pozici následující instrukce z interního čítače instrukcí do zásobníku volání
+        self.callStack.append(self.instructionIndex)
 
-        # porovnání typů
-        if type1 != type2:
-            self.error('Typy se musejí rovnat', 53)
+        # provede skok na zadané návěští
+        self.instructionIndex = self.getLabel(args[0])
 
-        # value1
-        value1 = self.getSymbolValue(args[1])
+    #
+    # Instruction RETURN
+    #
+    def returnIns(self, opCode, args):
 
-        # value2
-        value2 = self.getSymbolValue(args[2])
+        # vyjme pozici ze zásobníku volání, zásobník nesmí být prázdný
+        try:
+            value = self.callStack.pop()
+        except IndexError:
+            self.error('Zásobník volání je prázdný', 56)
 
-        # porovnání hodnot
-        if str(value1) == str(value2):
-            result = self.TYPE_BOOLEAN_TRUE
-        else:
-            result = self.TYPE_BOOLEAN_FALSE
+        # skočí na tuto pozici nastavením interního čítače instrukcí
+        self.instructionIndex = value
 
-        # uložení výsledku
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            result,
-            self.TYPE_BOOLEAN
-        )
+    #
+    # Instruction LABEL (návěští jsou zaregistrována a vyřešena již při načítání, viz prepareProgram)
+    #
+    def noopIns(self, opCode, args):
+        pass
 
     #
-    # Instruction GT
+    # Funkce obstarává zavolání pro každou instrukci zvlášť, obslužná funkce se vybírá podle číselného
+    # identifikátoru operačního kódu přiřazeného při načítání programu (neznámé kódy odmítne už načítání).
+    # Parametry: dekódovaná instrukce.
     #
-    def gtIns(self, opCode, args):
+    def executeInstruction(self, instruction):
+        self.handlers[instruction.opcode](instruction.name, instruction.args)
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB, self.TYPE_SYMB], [self.TYPE_BOOLEAN, self.TYPE_UNSPEC, self.TYPE_UNSPEC])
+        # aktualizace statistik
+        self.updateStats()
 
-        # type1
-        type1 = self.getSymbolType(args[1])
+    #
+    # Funkce aktualizuje statistiky po úspěšném provedení jedné instrukce.
+    #
+    def updateStats(self):
 
-        # type2
-        type2 = self.getSymbolType(args[2])
+        # instrukci se podařilo provést bez erroru, inkrementujeme provedené instrukce
+        if(self.statsParameters.get(self.STAT_INSTS, None) != None):
+            self.statsParameters[self.STAT_INSTS] += 1
 
-        # porovnání typů
-        if type1 != type2:
-            self.error('Typy se musejí rovnat', 53)
+    #
+    # Funkce aktualizuje počet inicializovaných proměnných při zápisu hodnoty newValue do proměnné
+    # s hodnotou oldValue (None je neinicializovaná proměnná) a udržuje jeho maximum pro --vars.
+    #
+    def updateInitializedVariables(self, oldValue, newValue):
+        if(oldValue == None):
+            if(newValue != None):
+                self.initializedVariables += 1
 
-        # dodatečná kontrola typů
-        if type1 == self.TYPE_NIL or type2 == self.TYPE_NIL:
-            self.error('S operandem typu ' + self.TYPE_NIL + ' lze porovnávat pouze instrukcí EQ', 53)
+                # pokud je to víc než je zatím uloženo, přepíše hodnotu
+                if(self.initializedVariables > self.statsParameters[self.STAT_VARS]):
+                    self.statsParameters[self.STAT_VARS] = self.initializedVariables
+        elif(newValue == None):
+            self.initializedVariables -= 1
 
-        # value1
-        value1 = self.getSymbolValue(args[1])
+    #
+    # Funkce zahodí rámec (vrátí ho do zásobárny rámců) a odečte jeho inicializované proměnné od počtu pro --vars.
+    #
+    def discardFrame(self, frame):
+        if(frame is None):
+            return
 
-        # value2
-        value2 = self.getSymbolValue(args[2])
+        if(self.trackVariables):
+            for variable in frame:
+                if(variable != None and variable.value != None):
+                    self.initializedVariables -= 1
 
-        # porovnání hodnot
-        if str(value1) > str(value2):
-            result = self.TYPE_BOOLEAN_TRUE
-        else:
-            result = self.TYPE_BOOLEAN_FALSE
+        self.framePool.release(frame)
 
-        # uložení výsledku
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            result,
-            self.TYPE_BOOLEAN
-        )
+    #
+    # Převede velikost zadanou na příkazové řádce (např. 512, 64K, 1M) na počet bajtů
+    #
+    def parseSize(self, text):
+        match = self.SIZE_REGEX.match(text)
+        if(match == None):
+            self.error('Nevalidní velikost: ' + text, 10)
+        number, unit = match.groups()
+        return int(number) * {'': 1, 'K': 1024, 'M': 1024 * 1024, 'G': 1024 * 1024 * 1024}[unit.upper()]
 
     #
-    # Instruction GETCHAR
+    # Vyvolá výjimku InterpretError (podtřídu podle kódu) se zprávou a specifikovaným návratovým kódem
+    # (dosavadní výstup programu se nejprve vyprázdní)
     #
-    def getcharIns(self, opCode, args):
+    def error(self, message, code = -1):
+        if(self.output != None):
+            self.output.flush()
+        raise self.ERROR_TYPES.get(code, InterpretError)(message, code)
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB, self.TYPE_SYMB], [self.TYPE_UNSPEC, self.TYPE_STRING, self.TYPE_INTEGER])
+#
+# Interpretační jádro s předkompilovanými uzávěry (--engine=closure)
+#
+# Každá instrukce je před spuštěním přeložena na uzávěr s již navázanými funkcemi pro čtení operandů
+# a zápis výsledku. Vykonání instrukce je pak jediné volání uzávěru, který vrátí index následující
+# instrukce; operandy se za běhu znovu nevalidují regulárními výrazy ani nerozdělují podle @.
+# Sémantika instrukcí odpovídá obslužným funkcím *Ins třídy interpret, instrukce, které nemají vlastní
+# překlad (a instrukce s formálně chybnými operandy), se vykonají přímo jejich obslužnou funkcí.
+#
+class ClosureEngine:
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+
+        # překladové funkce podle operačního kódu
+        self.compilers = {
+            'MOVE': self.compileMove,
+            'DEFVAR': self.compileDefVar,
+            'CALL': self.compileCall,
+            'RETURN': self.compileReturn,
+            'ADD': self.compileArithmetic,
+            'SUB': self.compileArithmetic,
+            'MUL': self.compileArithmetic,
+            'IDIV': self.compileArithmetic,
+            'LT': self.compileRelational,
+            'GT': self.compileRelational,
+            'EQ': self.compileRelational,
+            'AND': self.compileLogical,
+            'OR': self.compileLogical,
+            'NOT': self.compileNot,
+            'INT2CHAR': self.compileInt2Char,
+            'STRI2INT': self.compileStringIndex,
+            'INT2FLOAT': self.compileConversion,
+            'FLOAT2INT': self.compileConversion,
+            'WRITE': self.compileWrite,
+            'CONCAT': self.compileConcat,
+            'STRLEN': self.compileStrlen,
+            'GETCHAR': self.compileStringIndex,
+            'LABEL': self.compileLabel,
+            'JUMP': self.compileJump,
+            'JUMPIFEQ': self.compileConditionalJump,
+            'JUMPIFNEQ': self.compileConditionalJump,
+            'PUSHS': self.compilePushs,
+            'POPS': self.compilePops,
+            'ADDS': self.compileStackArithmetic,
+            'SUBS': self.compileStackArithmetic,
+            'MULS': self.compileStackArithmetic,
+            'IDIVS': self.compileStackArithmetic,
+            'LTS': self.compileStackRelational,
+            'GTS': self.compileStackRelational,
+            'EQS': self.compileStackRelational,
+            'ANDS': self.compileStackLogical,
+            'ORS': self.compileStackLogical,
+            'NOTS': self.compileStackNot,
+            'JUMPIFEQS': self.compileStackConditionalJump,
+            'JUMPIFNEQS': self.compileStackConditionalJump,
+        }
+
+    #
+    # Přeloží program na uzávěry (jednou pro všechna spuštění).
+    #
+    def prepare(self, instructions):
+        self.steps = self.compile(instructions)
+
+    #
+    # Vykoná přeložený program.
+    #
+    def run(self):
+        steps = self.steps
+        interpreter = self.interpreter
+
+        index = 0
+        end = len(steps)
+
+        # s limity vykonávání běží samostatná smyčka
+        if(interpreter.limits != None):
+            self.runLimited(interpreter.limits)
+            return
+
+        # bez statistik běží pouze volání uzávěrů
+        if(not interpreter.statsParameters):
+            while index < end:
+                index = steps[index]()
+            return
+
+        while index < end:
+            index = steps[index]()
+            interpreter.updateStats()
+
+    #
+    # Vykoná přeložený program s kontrolou limitů vykonávání. Uzávěry mezi kontrolními body se volají
+    # ve vnitřní smyčce bez počítání, za koncem programu je uzávěr, který na konci zůstává.
+    #
+    def runLimited(self, limits):
+        interpreter = self.interpreter
+
+        index = 0
+        end = len(self.steps)
+        steps = self.steps + [lambda: end]
+        executed = 0
+        checkpoint = limits.start()
+        try:
+            while index < end:
+                if(executed >= checkpoint):
+                    checkpoint = limits.check(executed, index)
+
+                # se statistikami se nesmí započítat uzávěr za koncem programu
+                if(interpreter.statsParameters):
+                    for _ in itertools.repeat(None, checkpoint - executed):
+                        if(index >= end):
+                            break
+                        index = steps[index]()
+                        interpreter.updateStats()
+                else:
+                    for _ in itertools.repeat(None, checkpoint - executed):
+                        index = steps[index]()
+                executed = checkpoint
+        except MemoryError:
+            limits.exceeded('Nedostatek paměti', index)
+
+    #
+    # Vrátí pole uzávěrů, index v poli odpovídá indexu instrukce v dekódovaném programu.
+    #
+    def compile(self, instructions):
+        steps = []
+        for index, instruction in enumerate(instructions):
+            name = interpret.INSTRUCTIONS[instruction.opcode][0]
+            compiler = self.compilers.get(name, self.compileHandler)
+            steps.append(compiler(instruction, index))
+        return steps
+
+    #
+    # Instrukce bez vlastního překladu se vykoná obslužnou funkcí (včetně kontroly operandů a chyb).
+    #
+    def compileHandler(self, instruction, index):
+        handler = self.interpreter.handlers[instruction.opcode]
+        name = instruction.name
+        args = instruction.args
+        nextIndex = index + 1
+
+        def step():
+            handler(name, args)
+            return nextIndex
+        return step
+
+    #
+    # Vrátí funkci, která vrátí záznam proměnné (Variable) z jejího rámce.
+    #
+    def compileVariable(self, arg):
+        interpreter = self.interpreter
+        error = interpreter.error
+        name = arg.name
+        slot = arg.slot
+
+        if(arg.frame == interpret.FRAME_GLOBAL):
+            GF = interpreter.GF
+            def variable():
+                record = GF[slot]
+                if(record is None):
+                    error('Proměnná:' + name + ' na GF neexistuje', 54)
+                return record
+
+        elif(arg.frame == interpret.FRAME_LOCAL):
+            LFStack = interpreter.LFStack
+            def variable():
+                if(not LFStack):
+                    error('Zásobník rámců je prázdný, žádný lokální rámec není v aktuální chvíli definovaný', 55)
+                record = LFStack[-1][slot]
+                if(record is None):
+                    error('Proměnná:' + name + ' na LF neexistuje', 54)
+                return record
 
-        # získání pozice
-        position = self.getSymbolValue(args[2])
+        else:
+            def variable():
+                TF = interpreter.TF
+                if(TF is None):
+                    error('Dočasný rámec je nedefinovaný', 55)
+                record = TF[slot]
+                if(record is None):
+                    error('Proměnná:' + name + ' na TF neexistuje', 54)
+                return record
 
-        # v textu
-        text = self.getSymbolValue(args[1])
+        return variable
 
-        try:
-            # získání znaku
-            char = text[position]
+    #
+    # Vrátí funkci, která vrátí záznam (Variable) pro symbol (proměnnou nebo konstantu).
+    #
+    def compileSymbol(self, arg):
+        if(arg.kind == interpret.TYPE_VAR):
+            return self.compileVariable(arg)
 
-            # uložení znaku
-            self.setVariable(
-                self.getVariableFrame(args[0]),
-                self.getVariableName(args[0]),
-                char,
-                self.TYPE_STRING
-            )
-        # pozice mimo daný řetězec vede na chybu 58
-        except IndexError:
-            self.error('Indexace mimo daný řetězec', 58)
+        record = Variable(arg.value, arg.type)
+        def constant():
+            return record
+        return constant
 
     #
-    # Instruction TYPE
+    # Vrátí funkci, která do proměnné uloží hodnotu a typ.
     #
-    def typeIns(self, opCode, args):
+    def compileSetter(self, arg):
+        variable = self.compileVariable(arg)
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB])
+        # se statistikou --vars se sleduje inicializace proměnných
+        if(self.interpreter.trackVariables):
+            updateInitializedVariables = self.interpreter.updateInitializedVariables
+            def setter(value, type):
+                record = variable()
+                updateInitializedVariables(record.value, value)
+                record.value = value
+                record.type = type
+            return setter
 
-        # zjištění typu
-        type = self.getSymbolType(args[1])
+        def setter(value, type):
+            record = variable()
+            record.value = value
+            record.type = type
 
-        # uložení typu
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            type,
-            self.TYPE_STRING
-        )
+        return setter
 
     #
-    # Instruction CONCAT
+    # Chyba operandu nevyhovujícího typu, neinicializovaná proměnná vede na chybu 56
     #
-    def concatIns(self, opCode, args):
-
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB, self.TYPE_SYMB], [self.TYPE_UNSPEC, self.TYPE_STRING, self.TYPE_STRING])
-
-        # value1
-        value1 = self.getSymbolValue(args[1])
+    def operandError(self, opCode, position, record, requiredType):
+        self.interpreter.operandTypeError(opCode, position, record.type, requiredType)
 
-        # value2
-        value2 = self.getSymbolValue(args[2])
+    #
+    # Instruction MOVE
+    #
+    def compileMove(self, instruction, index):
+        setter = self.compileSetter(instruction.args[0])
+        symbol = self.compileSymbol(instruction.args[1])
+        nextIndex = index + 1
+
+        # konstanta nemůže být rozpracovaným řetězcem
+        if(instruction.args[1].kind != interpret.TYPE_VAR):
+            def step():
+                record = symbol()
+                setter(record.value, record.type)
+                return nextIndex
+            return step
+
+        operandError = self.operandError
+        opCode = instruction.name
+
+        def step():
+            record = symbol()
+            if(record.type is None):
+                operandError(opCode, 1, record, None)
+            value = record.value
+            if(value.__class__ is StringBuilder):
+                value = str(value)
+            setter(value, record.type)
+            return nextIndex
+        return step
 
-        # konkatenace
-        result = value1 + value2
+    #
+    # Instruction DEFVAR
+    #
+    def compileDefVar(self, instruction, index):
+        var = instruction.args[0]
+        defineVariable = self.interpreter.defineVariable
+        nextIndex = index + 1
 
-        # nastavení hodnoty
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            result,
-            self.TYPE_STRING
-        )
+        def step():
+            defineVariable(var)
+            return nextIndex
+        return step
 
     #
-    # Instruction INT2CHAR
+    # Instruction CALL
     #
-    def int2charIns(self, opCode, args):
-
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB])
+    def compileCall(self, instruction, index):
+        callStack = self.interpreter.callStack
+        target = self.interpreter.getLabel(instruction.args[0])
+        nextIndex = index + 1
 
-        try:
-            # získání znaku
-            char = chr(int(self.getSymbolValue(args[1])))
+        def step():
+            callStack.append(nextIndex)
+            return target
+        return step
 
-            # nastavení hodnoty
-            self.setVariable(
-                self.getVariableFrame(args[0]),
-                self.getVariableName(args[0]),
-                char,
-                self.TYPE_STRING
-            )
-        # Není-li symb validní ordinální hodnota znaku v Unicode dojde k chybě 58.
-        except (ValueError):
-            self.error('Není validní ordinální hodnota znaku v Unicode', 58)
+    #
+    # Instruction RETURN
+    #
+    def compileReturn(self, instruction, index):
+        callStack = self.interpreter.callStack
+        error = self.interpreter.error
+
+        def step():
+            if(not callStack):
+                error('Zásobník volání je prázdný', 56)
+            return callStack.pop()
+        return step
+
+    #
+    # Vrátí funkci aritmetické operace ADD, SUB, MUL nebo IDIV (i zásobníkové varianty)
+    #
+    def arithmeticOperation(self, name):
+        error = self.interpreter.error
+        divideIntegers = self.interpreter.divideIntegers
+
+        def idiv(value1, value2):
+            if value2 == 0:
+                error('Dělení nulou', 57)
+            return divideIntegers(value1, value2)
+
+        return {
+            'ADD': operator.add,
+            'SUB': operator.sub,
+            'MUL': operator.mul,
+            'IDIV': idiv,
+        }[name]
+
+    #
+    # Instructions ADD, SUB, MUL, IDIV
+    #
+    def compileArithmetic(self, instruction, index):
+        error = self.interpreter.error
+        operandError = self.operandError
+        opCode = instruction.name
+        setter = self.compileSetter(instruction.args[0])
+        symbol1 = self.compileSymbol(instruction.args[1])
+        symbol2 = self.compileSymbol(instruction.args[2])
+        TYPE_INTEGER = interpret.TYPE_INTEGER
+        nextIndex = index + 1
+        operation = self.arithmeticOperation(interpret.INSTRUCTIONS[instruction.opcode][0])
+
+        def step():
+            record1 = symbol1()
+            record2 = symbol2()
+            if(record1.type != TYPE_INTEGER):
+                operandError(opCode, 1, record1, TYPE_INTEGER)
+            if(record2.type != TYPE_INTEGER):
+                operandError(opCode, 2, record2, TYPE_INTEGER)
+            setter(operation(record1.value, record2.value), TYPE_INTEGER)
+            return nextIndex
+        return step
+
+    #
+    # Instructions LT, GT, EQ
+    #
+    def compileRelational(self, instruction, index):
+        error = self.interpreter.error
+        checkComparableTypes = self.interpreter.checkComparableTypes
+        opCode = instruction.name
+        setter = self.compileSetter(instruction.args[0])
+        symbol1 = self.compileSymbol(instruction.args[1])
+        symbol2 = self.compileSymbol(instruction.args[2])
+        name = interpret.INSTRUCTIONS[instruction.opcode][0]
+        operation = {'LT': operator.lt, 'GT': operator.gt, 'EQ': operator.eq}[name]
+        nilAllowed = name == 'EQ'
+        TYPE_NIL = interpret.TYPE_NIL
+        TYPE_BOOLEAN = interpret.TYPE_BOOLEAN
+        nextIndex = index + 1
+
+        def step():
+            record1 = symbol1()
+            record2 = symbol2()
+            if(record1.type != record2.type or record1.type is None):
+                checkComparableTypes(opCode, record1.type, record2.type)
+            if(not nilAllowed and record1.type == TYPE_NIL):
+                error('S operandem typu ' + TYPE_NIL + ' lze porovnávat pouze instrukcí EQ', 53)
+            setter(operation(record1.value, record2.value), TYPE_BOOLEAN)
+            return nextIndex
+        return step
+
+    #
+    # Instructions AND, OR
+    #
+    def compileLogical(self, instruction, index):
+        operandError = self.operandError
+        opCode = instruction.name
+        setter = self.compileSetter(instruction.args[0])
+        symbol1 = self.compileSymbol(instruction.args[1])
+        symbol2 = self.compileSymbol(instruction.args[2])
+        conjunction = interpret.INSTRUCTIONS[instruction.opcode][0] == 'AND'
+        TYPE_BOOLEAN = interpret.TYPE_BOOLEAN
+        nextIndex = index + 1
+
+        def step():
+            record1 = symbol1()
+            record2 = symbol2()
+            if(record1.type != TYPE_BOOLEAN):
+                operandError(opCode, 1, record1, TYPE_BOOLEAN)
+            if(record2.type != TYPE_BOOLEAN):
+                operandError(opCode, 2, record2, TYPE_BOOLEAN)
+            if(conjunction):
+                setter(record1.value and record2.value, TYPE_BOOLEAN)
+            else:
+                setter(record1.value or record2.value, TYPE_BOOLEAN)
+            return nextIndex
+        return step
 
     #
-    # Instruction INT2FLOAT
+    # Instruction NOT
     #
-    def int2floatIns(self, opCode, args):
+    def compileNot(self, instruction, index):
+        operandError = self.operandError
+        opCode = instruction.name
+        setter = self.compileSetter(instruction.args[0])
+        symbol = self.compileSymbol(instruction.args[1])
+        TYPE_BOOLEAN = interpret.TYPE_BOOLEAN
+        nextIndex = index + 1
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB], [self.TYPE_UNSPEC, self.TYPE_INTEGER])
+        def step():
+            record = symbol()
+            if(record.type != TYPE_BOOLEAN):
+                operandError(opCode, 1, record, TYPE_BOOLEAN)
+            setter(not record.value, TYPE_BOOLEAN)
+            return nextIndex
+        return step
 
-        # získání hodnoty
-        value = float(int(self.getSymbolValue(args[1])))
+    #
+    # Instruction INT2CHAR
+    #
+    def compileInt2Char(self, instruction, index):
+        error = self.interpreter.error
+        operandError = self.operandError
+        opCode = instruction.name
+        setter = self.compileSetter(instruction.args[0])
+        symbol = self.compileSymbol(instruction.args[1])
+        TYPE_STRING = interpret.TYPE_STRING
+        TYPE_INTEGER = interpret.TYPE_INTEGER
+        nextIndex = index + 1
+
+        def step():
+            record = symbol()
+            if(record.type != TYPE_INTEGER):
+                operandError(opCode, 1, record, TYPE_INTEGER)
+            try:
+                char = chr(record.value)
+            except (ValueError, OverflowError):
+                error('Není validní ordinální hodnota znaku v Unicode', 58)
+            setter(char, TYPE_STRING)
+            return nextIndex
+        return step
+
+    #
+    # Instructions STRI2INT, GETCHAR
+    #
+    def compileStringIndex(self, instruction, index):
+        error = self.interpreter.error
+        operandError = self.operandError
+        opCode = instruction.name
+        setter = self.compileSetter(instruction.args[0])
+        symbol1 = self.compileSymbol(instruction.args[1])
+        symbol2 = self.compileSymbol(instruction.args[2])
+        ordinal = interpret.INSTRUCTIONS[instruction.opcode][0] == 'STRI2INT'
+        resultType = interpret.TYPE_INTEGER if ordinal else interpret.TYPE_STRING
+        TYPE_STRING = interpret.TYPE_STRING
+        TYPE_INTEGER = interpret.TYPE_INTEGER
+        nextIndex = index + 1
+
+        def step():
+            record1 = symbol1()
+            record2 = symbol2()
+            if(record1.type != TYPE_STRING):
+                operandError(opCode, 1, record1, TYPE_STRING)
+            if(record2.type != TYPE_INTEGER):
+                operandError(opCode, 2, record2, TYPE_INTEGER)
+            text = record1.value
+            position = record2.value
+            if(position < 0 or position >= len(text)):
+                error('Indexace mimo daný řetězec', 58)
+            setter(ord(text[position]) if ordinal else text[position], resultType)
+            return nextIndex
+        return step
+
+    #
+    # Instructions INT2FLOAT, FLOAT2INT
+    #
+    def compileConversion(self, instruction, index):
+        operandError = self.operandError
+        opCode = instruction.name
+        setter = self.compileSetter(instruction.args[0])
+        symbol = self.compileSymbol(instruction.args[1])
+        error = self.interpreter.error
+        if(interpret.INSTRUCTIONS[instruction.opcode][0] == 'INT2FLOAT'):
+            requiredType, resultType, conversion = interpret.TYPE_INTEGER, interpret.TYPE_FLOAT, float
+            message = 'Celé číslo je mimo rozsah typu float'
+        else:
+            requiredType, resultType, conversion = interpret.TYPE_FLOAT, interpret.TYPE_INTEGER, int
+            message = 'Hodnotu nelze převést na celé číslo'
+        nextIndex = index + 1
 
-        # nastavení hodnoty
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            value,
-            self.TYPE_FLOAT
-        )
+        def step():
+            record = symbol()
+            if(record.type != requiredType):
+                operandError(opCode, 1, record, requiredType)
 
-    def getTypeValue(self, typeObj):
-        return typeObj.text
+            # nekonečno a NaN nemají celočíselnou hodnotu, celé číslo může být mimo rozsah float
+            try:
+                value = conversion(record.value)
+            except (ValueError, OverflowError):
+                error(message, 57)
+            setter(value, resultType)
+            return nextIndex
+        return step
 
     #
-    # Instruction READ
+    # Instruction WRITE
     #
-    def readIns(self, opCode, args):
+    def compileWrite(self, instruction, index):
+        write = self.interpreter.output.write
+        formatValue = self.interpreter.formatValue
+        arg = instruction.args[0]
+        nextIndex = index + 1
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_TYPE])
+        # konstanta se převede na výstupní text už při překladu
+        if(arg.kind != interpret.TYPE_VAR):
+            text = formatValue(arg.value)
+            def step():
+                write(text)
+                return nextIndex
+            return step
 
-        # type
-        type = self.getTypeValue(args[1])
-
-        # hodnota
-        value = None
+        variable = self.compileVariable(arg)
+        def step():
+            write(formatValue(variable().value))
+            return nextIndex
+        return step
 
-        # v případě existujícího input souboru vezmeme z něj
-        if(self.inputFile != None):
-            try:
-                value = self.inputFile.readline().rstrip()
-            except:
-                self.error('Nepodařilo se číst soubor pro čtení vstupu', 11)
-        # jinak čekáme na zadání od uživatele
-        else:
-            value = input()
+    #
+    # Instruction CONCAT
+    #
+    def compileConcat(self, instruction, index):
+        operandError = self.operandError
+        opCode = instruction.name
+        setter = self.compileSetter(instruction.args[0])
+        symbol1 = self.compileSymbol(instruction.args[1])
+        symbol2 = self.compileSymbol(instruction.args[2])
+        TYPE_STRING = interpret.TYPE_STRING
+        nextIndex = index + 1
+
+        # připojení na konec proměnné, která je zároveň cílem
+        if(self.interpreter.isSameVariable(instruction.args[0], instruction.args[1])):
+            appendString = self.interpreter.appendString
+            def step():
+                record1 = symbol1()
+                record2 = symbol2()
+                if(record1.type != TYPE_STRING):
+                    operandError(opCode, 1, record1, TYPE_STRING)
+                if(record2.type != TYPE_STRING):
+                    operandError(opCode, 2, record2, TYPE_STRING)
+                appendString(record1, record2.value)
+                return nextIndex
+            return step
+
+        def step():
+            record1 = symbol1()
+            record2 = symbol2()
+            if(record1.type != TYPE_STRING):
+                operandError(opCode, 1, record1, TYPE_STRING)
+            if(record2.type != TYPE_STRING):
+                operandError(opCode, 2, record2, TYPE_STRING)
+            setter(record1.value + record2.value, TYPE_STRING)
+            return nextIndex
+        return step
 
-        # nastavení proměnné
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]),
-            self.getInitialVariableValueByType(value, type),
-            type
-        )
+    #
+    # Instruction STRLEN
+    #
+    def compileStrlen(self, instruction, index):
+        operandError = self.operandError
+        opCode = instruction.name
+        setter = self.compileSetter(instruction.args[0])
+        symbol = self.compileSymbol(instruction.args[1])
+        TYPE_STRING = interpret.TYPE_STRING
+        TYPE_INTEGER = interpret.TYPE_INTEGER
+        nextIndex = index + 1
+
+        def step():
+            record = symbol()
+            if(record.type != TYPE_STRING):
+                operandError(opCode, 1, record, TYPE_STRING)
+            setter(len(record.value), TYPE_INTEGER)
+            return nextIndex
+        return step
 
     #
-    # Funkce vrací hodnotu pro konstantu.
+    # Instruction LABEL
     #
-    # Vstup: <arg1 type="string">světe</arg1>
-    #        <arg1 type="string"></arg1>
-    def getConstantValue(self, constObject):
-        if(constObject.text == None):
-            return ""
-        return constObject.text
-    def getConstantType(self, constObject):
-        return constObject.get('type')
+    def compileLabel(self, instruction, index):
+        nextIndex = index + 1
+        def step():
+            return nextIndex
+        return step
 
     #
-    # Funkce vrátí hodnotu pro symbol.
+    # Instruction JUMP
     #
-    # Vstup: <arg1 type="var">GF@val</arg1>
-    #        <arg1 type="string">světe</arg1>
+    def compileJump(self, instruction, index):
+        target = self.interpreter.getLabel(instruction.args[0])
+
+        def step():
+            return target
+        return step
+
     #
-    def getSymbolValue(self, symbObject):
+    # Instructions JUMPIFEQ, JUMPIFNEQ
+    #
+    def compileConditionalJump(self, instruction, index):
+        checkComparableTypes = self.interpreter.checkComparableTypes
+        opCode = instruction.name
+        target = self.interpreter.getLabel(instruction.args[0])
+        symbol1 = self.compileSymbol(instruction.args[1])
+        symbol2 = self.compileSymbol(instruction.args[2])
+        jumpIfEqual = interpret.INSTRUCTIONS[instruction.opcode][0] == 'JUMPIFEQ'
+        nextIndex = index + 1
 
-        # symbol je proměnná
-        if(self.isValidVariable(symbObject)):
-          return self.getVariable(
-              self.getVariableFrame(symbObject),
-              self.getVariableName(symbObject)
-          ).get('value')
+        def step():
+            record1 = symbol1()
+            record2 = symbol2()
+            if(record1.type != record2.type or record1.type is None):
+                checkComparableTypes(opCode, record1.type, record2.type)
+            if((record1.value == record2.value) == jumpIfEqual):
+                return target
+            return nextIndex
+        return step
 
-        # symbol je konstanta
-        elif(self.isValidConstant(symbObject)):
-          return self.getValueByType(self.getConstantValue(symbObject), self.getConstantType(symbObject))
+    #
+    # Instruction PUSHS
+    #
+    def compilePushs(self, instruction, index):
+        append = self.interpreter.dataStack.append
+        arg = instruction.args[0]
+        nextIndex = index + 1
+
+        # záznamy na zásobníku se nemění, konstanta tak vkládá stále stejný záznam
+        if(arg.kind != interpret.TYPE_VAR):
+            record = Variable(arg.value, arg.type)
+            def step():
+                append(record)
+                return nextIndex
+            return step
+
+        operandError = self.operandError
+        opCode = instruction.name
+        variable = self.compileVariable(arg)
+
+        def step():
+            record = variable()
+            if(record.type is None):
+                operandError(opCode, 0, record, None)
+            value = record.value
+            if(value.__class__ is StringBuilder):
+                value = str(value)
+            append(Variable(value, record.type))
+            return nextIndex
+        return step
 
-    def getSymbolType(self, symbObject):
+    #
+    # Instruction POPS
+    #
+    def compilePops(self, instruction, index):
+        error = self.interpreter.error
+        dataStack = self.interpreter.dataStack
+        setter = self.compileSetter(instruction.args[0])
+        nextIndex = index + 1
+
+        def step():
+            if(not dataStack):
+                error('Datový zásobník je prázdný', 56)
+            record = dataStack.pop()
+            setter(record.value, record.type)
+            return nextIndex
+        return step
+
+    #
+    # Instructions ADDS, SUBS, MULS, IDIVS
+    #
+    def compileStackArithmetic(self, instruction, index):
+        error = self.interpreter.error
+        operandError = self.operandError
+        opCode = instruction.name
+        dataStack = self.interpreter.dataStack
+        TYPE_INTEGER = interpret.TYPE_INTEGER
+        nextIndex = index + 1
+        operation = self.arithmeticOperation(interpret.INSTRUCTIONS[instruction.opcode][0][:-1])
+
+        def step():
+            if(len(dataStack) < 2):
+                error('Datový zásobník je prázdný', 56)
+            record2 = dataStack.pop()
+            record1 = dataStack.pop()
+            if(record1.type != TYPE_INTEGER):
+                operandError(opCode, 1, record1, TYPE_INTEGER)
+            if(record2.type != TYPE_INTEGER):
+                operandError(opCode, 2, record2, TYPE_INTEGER)
+            dataStack.append(Variable(operation(record1.value, record2.value), TYPE_INTEGER))
+            return nextIndex
+        return step
+
+    #
+    # Instructions LTS, GTS, EQS
+    #
+    def compileStackRelational(self, instruction, index):
+        error = self.interpreter.error
+        checkComparableTypes = self.interpreter.checkComparableTypes
+        opCode = instruction.name
+        dataStack = self.interpreter.dataStack
+        name = interpret.INSTRUCTIONS[instruction.opcode][0]
+        operation = {'LTS': operator.lt, 'GTS': operator.gt, 'EQS': operator.eq}[name]
+        nilAllowed = name == 'EQS'
+        TYPE_NIL = interpret.TYPE_NIL
+        TYPE_BOOLEAN = interpret.TYPE_BOOLEAN
+        nextIndex = index + 1
+
+        def step():
+            if(len(dataStack) < 2):
+                error('Datový zásobník je prázdný', 56)
+            record2 = dataStack.pop()
+            record1 = dataStack.pop()
+            if(record1.type != record2.type):
+                checkComparableTypes(opCode, record1.type, record2.type)
+            if(not nilAllowed and record1.type == TYPE_NIL):
+                error('S operandem typu ' + TYPE_NIL + ' lze porovnávat pouze instrukcí EQS', 53)
+            dataStack.append(Variable(operation(record1.value, record2.value), TYPE_BOOLEAN))
+            return nextIndex
+        return step
+
+    #
+    # Instructions ANDS, ORS
+    #
+    def compileStackLogical(self, instruction, index):
+        error = self.interpreter.error
+        operandError = self.operandError
+        opCode = instruction.name
+        dataStack = self.interpreter.dataStack
+        conjunction = interpret.INSTRUCTIONS[instruction.opcode][0] == 'ANDS'
+        TYPE_BOOLEAN = interpret.TYPE_BOOLEAN
+        nextIndex = index + 1
+
+        def step():
+            if(len(dataStack) < 2):
+                error('Datový zásobník je prázdný', 56)
+            record2 = dataStack.pop()
+            record1 = dataStack.pop()
+            if(record1.type != TYPE_BOOLEAN):
+                operandError(opCode, 1, record1, TYPE_BOOLEAN)
+            if(record2.type != TYPE_BOOLEAN):
+                operandError(opCode, 2, record2, TYPE_BOOLEAN)
+            if(conjunction):
+                dataStack.append(Variable(record1.value and record2.value, TYPE_BOOLEAN))
+            else:
+                dataStack.append(Variable(record1.value or record2.value, TYPE_BOOLEAN))
+            return nextIndex
+        return step
+
+    #
+    # Instruction NOTS
+    #
+    def compileStackNot(self, instruction, index):
+        error = self.interpreter.error
+        operandError = self.operandError
+        opCode = instruction.name
+        dataStack = self.interpreter.dataStack
+        TYPE_BOOLEAN = interpret.TYPE_BOOLEAN
+        nextIndex = index + 1
+
+        def step():
+            if(not dataStack):
+                error('Datový zásobník je prázdný', 56)
+            record = dataStack.pop()
+            if(record.type != TYPE_BOOLEAN):
+                operandError(opCode, 1, record, TYPE_BOOLEAN)
+            dataStack.append(Variable(not record.value, TYPE_BOOLEAN))
+            return nextIndex
+        return step
+
+    #
+    # Instructions JUMPIFEQS, JUMPIFNEQS
+    #
+    def compileStackConditionalJump(self, instruction, index):
+        error = self.interpreter.error
+        checkComparableTypes = self.interpreter.checkComparableTypes
+        opCode = instruction.name
+        dataStack = self.interpreter.dataStack
+        target = self.interpreter.getLabel(instruction.args[0])
+        jumpIfEqual = interpret.INSTRUCTIONS[instruction.opcode][0] == 'JUMPIFEQS'
+        nextIndex = index + 1
+
+        def step():
+            if(len(dataStack) < 2):
+                error('Datový zásobník je prázdný', 56)
+            record2 = dataStack.pop()
+            record1 = dataStack.pop()
+            if(record1.type != record2.type):
+                checkComparableTypes(opCode, record1.type, record2.type)
+            if((record1.value == record2.value) == jumpIfEqual):
+                return target
+            return nextIndex
+        return step
 
-        # symbol je proměnná
-        if(self.isValidVariable(symbObject)):
-          return self.getVariable(
-              self.getVariableFrame(symbObject),
-              self.getVariableName(symbObject)
-          ).get('type')
+#
+# Interpretační jádro překládající základní bloky programu do Pythonu (--engine=transpile)
+#
+# Program se rozdělí na základní bloky (začátek programu, cíle skoků za návěštím LABEL a instrukce
+# za JUMP*, CALL, RETURN a EXIT). Pro každý blok se vygeneruje zdrojový kód funkce v Pythonu, celý
+# modul se jednou přeloží funkcí compile() a program pak běží jako trampolína, kde každá funkce bloku
+# vrátí index instrukce, kterou začíná následující blok. Instrukce MOVE, ADD, SUB, MUL, CONCAT,
+# WRITE, LABEL, JUMP, JUMPIFEQ a JUMPIFNEQ se překládají přímo do kódu v Pythonu, ostatní volají
+# uzávěr z ClosureEngine.
+#
+class TranspileEngine:
 
-        # symbol je konstanta
-        elif(self.isValidConstant(symbObject)):
-          return self.getConstantType(symbObject)
+    # instrukce, za kterými končí základní blok
+    BLOCK_END = ('JUMP', 'JUMPIFEQ', 'JUMPIFNEQ', 'JUMPIFEQS', 'JUMPIFNEQS', 'CALL', 'RETURN', 'EXIT')
+
+    def __init__(self, interpreter, dump = None):
+        self.interpreter = interpreter
+        self.closures = ClosureEngine(interpreter)
+        self.dump = dump
+
+        # překladové funkce podle operačního kódu
+        self.emitters = {
+            'MOVE': self.emitMove,
+            'ADD': self.emitArithmetic,
+            'SUB': self.emitArithmetic,
+            'MUL': self.emitArithmetic,
+            'CONCAT': self.emitConcat,
+            'WRITE': self.emitWrite,
+            'LABEL': self.emitLabel,
+            'JUMP': self.emitJump,
+            'JUMPIFEQ': self.emitConditionalJump,
+            'JUMPIFNEQ': self.emitConditionalJump,
+        }
 
     #
-    # Instruction PUSHS
+    # Přeloží program (jednou pro všechna spuštění), případně vygenerovaný zdrojový kód uloží do souboru dump.
     #
-    def pushsIns(self, opCode, args):
+    def prepare(self, instructions):
+        source, starts = self.transpile(instructions)
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_SYMB])
+        if(self.dump != None):
+            try:
+                with open(self.dump, "w") as f:
+                    f.write(source)
+            except:
+                self.interpreter.error('Nepodařilo se otevřít soubor pro zápis vygenerovaného kódu: ' + self.dump, 12)
 
-        # přidání hodnoty na vrchol zásobníku
-        self.dataStack.append(args[0])
+        self.blocks = self.load(source, starts, instructions)
+
+        # počet instrukcí základního bloku podle indexu jeho první instrukce (0 uvnitř bloku)
+        self.sizes = [0] * len(instructions)
+        for number, start in enumerate(starts):
+            self.sizes[start] = (starts[number + 1] if number + 1 < len(starts) else len(instructions)) - start
 
     #
-    # Instruction POPS
+    # Vykoná přeložený program.
     #
-    def popsIns(self, opCode, args):
+    def run(self):
+        if(self.interpreter.limits != None):
+            self.runLimited(self.interpreter.limits)
+            return
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR])
+        blocks = self.blocks
+        index = 0
+        end = len(blocks)
+        while index < end:
+            index = blocks[index]()
 
-        # vytáhnutí hodnoty z vrcholu zásobníku
-        # zásobník nesmí být prázdný
+    #
+    # Vykoná přeložený program s kontrolou limitů vykonávání. Bloky se vykonávají celé, dokud se vejdou
+    # před kontrolní bod, jinak se vykonávají po instrukcích uzávěry (limit počtu instrukcí je tak přesný).
+    #
+    def runLimited(self, limits):
+        blocks = self.blocks
+        steps = self.steps
+        sizes = self.sizes
+        interpreter = self.interpreter
+        stats = bool(interpreter.statsParameters)
+
+        index = 0
+        end = len(blocks)
+        executed = 0
+        checkpoint = limits.start()
         try:
-            symbObject = self.dataStack.pop()
+            while index < end:
+                size = sizes[index]
+                if(size and executed + size <= checkpoint):
+                    executed += size
+                    index = blocks[index]()
+                    continue
 
-            # nastavení hodnoty do proměnné
-            self.setVariable(
-                self.getVariableFrame(args[0]),
-                self.getVariableName(args[0]),
-                self.getSymbolValue(symbObject),
-                self.getSymbolType(symbObject)
-            )
-        except (IndexError):
-            self.error('Datový zásobník je prázdný', 56)
+                if(executed >= checkpoint):
+                    checkpoint = limits.check(executed, index)
+                executed += 1
+                index = steps[index]()
+                if(stats):
+                    interpreter.updateStats()
+        except MemoryError:
+            limits.exceeded('Nedostatek paměti', index)
+
+    #
+    # Vrátí indexy instrukcí, kterými začínají základní bloky.
+    #
+    def getBlockStarts(self, instructions):
+        starts = set([0])
+        starts.update(self.interpreter.labels.values())
+        for index, instruction in enumerate(instructions):
+            if(interpret.INSTRUCTIONS[instruction.opcode][0] in self.BLOCK_END):
+                starts.add(index + 1)
+        return sorted(start for start in starts if start < len(instructions))
+
+    #
+    # Vygeneruje zdrojový kód modulu s funkcí pro každý základní blok.
+    #
+    def transpile(self, instructions):
+        starts = self.getBlockStarts(instructions)
+        self.stats = bool(self.interpreter.statsParameters)
+        self.constants = []
+
+        lines = [
+            '#',
+            '# ' + interpret.language + ' přeložený do Pythonu, každá funkce odpovídá jednomu základnímu bloku',
+            '# a vrací index instrukce, kterou začíná následující blok.',
+            '#',
+        ]
+        for number, start in enumerate(starts):
+            end = starts[number + 1] if number + 1 < len(starts) else len(instructions)
+
+            lines.append('')
+            lines.append('def block_' + str(start) + '():')
+            for index in range(start, end):
+                instruction = instructions[index]
+                lines.append('    # ' + str(instruction.order) + ': ' + self.formatInstruction(instruction))
+                lines.extend('    ' + line for line in self.emit(instruction, index))
+
+            # blok, který neskončil skokem, pokračuje následujícím blokem
+            if(not lines[-1].startswith('    return ')):
+                lines.append('    return ' + str(end))
+
+        return '\n'.join(lines) + '\n', starts
+
+    #
+    # Přeloží vygenerovaný zdrojový kód a vrátí pole funkcí bloků indexované indexem první instrukce bloku.
+    #
+    def load(self, source, starts, instructions):
+        interpreter = self.interpreter
+        closures = self.closures
+
+        def frameLF():
+            if(not interpreter.LFStack):
+                interpreter.error('Zásobník rámců je prázdný, žádný lokální rámec není v aktuální chvíli definovaný', 55)
+            return interpreter.LFStack[-1]
+
+        def frameTF():
+            if(interpreter.TF is None):
+                interpreter.error('Dočasný rámec je nedefinovaný', 55)
+            return interpreter.TF
+
+        def undefinedVariable(frame, name):
+            interpreter.error('Proměnná:' + name + ' na ' + frame + ' neexistuje', 54)
+
+        # uzávěry instrukcí bez vlastního překladu (a pro profilování po instrukcích)
+        self.steps = closures.compile(instructions)
+
+        namespace = {
+            'GF': interpreter.GF,
+            'LF': frameLF,
+            'TF': frameTF,
+            'S': self.steps,
+            'C': self.constants,
+            'error': interpreter.error,
+            'operandError': closures.operandError,
+            'undefinedVariable': undefinedVariable,
+            'Variable': Variable,
+            'write': interpreter.output.write,
+            'formatValue': interpreter.formatValue,
+            'checkComparableTypes': interpreter.checkComparableTypes,
+            'Nil': Nil,
+            'StringBuilder': StringBuilder,
+            'appendString': interpreter.appendString,
+            'updateStats': interpreter.updateStats,
+            'updateInitializedVariables': interpreter.updateInitializedVariables,
+        }
+        exec(compile(source, '<' + interpret.language + '>', 'exec'), namespace)
+
+        blocks = [None] * len(instructions)
+        for start in starts:
+            blocks[start] = namespace['block_' + str(start)]
+        return blocks
+
+    #
+    # Textová podoba instrukce do komentáře ve vygenerovaném kódu.
+    #
+    def formatInstruction(self, instruction):
+        operands = []
+        for arg in instruction.args:
+            if(arg.kind == interpret.TYPE_VAR):
+                operands.append(arg.frame + '@' + arg.name)
+            elif(arg.kind == interpret.TYPE_LABEL):
+                operands.append(arg.name)
+            elif(arg.kind == interpret.TYPE_TYPE):
+                operands.append(arg.value)
+            elif(arg.kind == interpret.TYPE_CONST):
+                operands.append(arg.type + '@' + str(arg.value))
+            else:
+                operands.append('?')
+        return ' '.join([instruction.name.upper()] + operands).replace('\n', '\\n')
 
     #
-    # V případě chybného vstupu bude do proměnné uložena implicitní hodnota (dle typu 0, prázdný řetězec nebo false).
+    # Vrátí řádky kódu pro jednu instrukci.
     #
-    def getInitialVariableValueByType(self, value, type):
-        if type == self.TYPE_STRING:
-            try:
-                return str(value)
-            except (ValueError, TypeError):
-                return ""
-        if type == self.TYPE_INTEGER:
-            try:
-                return int(value)
-            except (ValueError, TypeError):
-                return 0
-        if type == self.TYPE_FLOAT:
-            floatValue = self.getFloatValueFromString(value)
-            if floatValue != None:
-                return floatValue
+    def emit(self, instruction, index):
+        name = interpret.INSTRUCTIONS[instruction.opcode][0]
+        emitter = self.emitters.get(name)
+        lines = None
+        if(emitter != None):
+            lines = emitter(instruction, index)
+
+        # instrukce bez vlastního překladu volá svůj uzávěr
+        if(lines == None):
+            if(name in self.BLOCK_END):
+                lines = ['index = S[' + str(index) + ']()', 'return index']
             else:
-                return 0
-        if type == self.TYPE_BOOLEAN:
-            if value.upper() == self.TYPE_BOOLEAN_TRUE.upper():
-                return self.TYPE_BOOLEAN_TRUE
-            elif value.upper() == self.TYPE_BOOLEAN_FALSE.upper():
-                return self.TYPE_BOOLEAN_FALSE
+                lines = ['S[' + str(index) + ']()']
+
+        if(self.stats):
+            if(lines[-1].startswith('return ')):
+                lines.insert(len(lines) - 1, 'updateStats()')
             else:
-                return self.TYPE_BOOLEAN_FALSE
+                lines.append('updateStats()')
+        return lines
 
-        return value
+    #
+    # Výraz pro rámec proměnné
+    #
+    def frameExpression(self, arg):
+        if(arg.frame == interpret.FRAME_GLOBAL):
+            return 'GF'
+        return arg.frame + '()'
 
     #
-    # V případě chybného vstupu bude do proměnné hvar i uložena implicitní hodnota (dle typu 0, prázdný řetězec
-    # nebo false).
+    # Řádky, které načtou záznam proměnné do lokální proměnné target (neexistující proměnná vede na chybu 54).
     #
-    def getValueByType(self, value, type):
-        if type == self.TYPE_STRING:
-            return str(value)
-        elif type == self.TYPE_INTEGER:
-            return int(value)
-        elif type == self.TYPE_BOOLEAN:
-            return str(value)
-        elif type == self.TYPE_NIL:
-            return str(value)
-        elif type == self.TYPE_FLOAT:
-            return self.getFloatValueFromString(value)
+    def emitVariable(self, arg, target):
+        return [
+            target + ' = ' + self.frameExpression(arg) + '[' + str(arg.slot) + ']',
+            'if ' + target + ' is None: undefinedVariable(' + repr(arg.frame) + ', ' + repr(arg.name) + ')',
+        ]
 
-        return value
+    #
+    # Vrátí (řádky, výraz hodnoty, výraz typu) pro symbol; u konstanty jsou hodnota i typ známé při překladu.
+    # Hodnota konstanty se předává přes pole C (repr u float@inf nebo float@nan nedá platný výraz).
+    #
+    def emitSymbol(self, arg, target):
+        if(arg.kind == interpret.TYPE_VAR):
+            return self.emitVariable(arg, target), target + '.value', target + '.type'
+
+        self.constants.append(arg.value)
+        return [], 'C[' + str(len(self.constants) - 1) + ']', repr(arg.type)
 
     #
-    # Funkce kontroluje argumenty instrukce.
+    # Řádky, které zkontrolují typ symbolu (u konstanty rozhodne už překlad).
     #
-    def checkInstructionArgs(self, opCode, argsObject, requiredArgs, requiredArgsType = []):
-        if(len(requiredArgs) != len(argsObject)):
-            self.error('U instrukce ' + opCode + ' musí být počet argumentů roven ' + len(requiredArgs), 52)
+    def emitTypeCheck(self, opCode, position, arg, target, typeExpression, requiredType):
+        if(arg.kind != interpret.TYPE_VAR):
+            if(typeExpression == repr(requiredType)):
+                return []
+            return ['operandError(' + repr(opCode) + ', ' + str(position) + ', Variable(None, ' + typeExpression + '), ' + repr(requiredType) + ')']
+        return ['if ' + typeExpression + ' != ' + repr(requiredType) + ': operandError(' + repr(opCode) + ', ' + str(position) + ', ' + target + ', ' + repr(requiredType) + ')']
 
-        requiredArgsCounter = 0
-        for requiredArg in requiredArgs:
-             if(requiredArg == self.TYPE_VAR):
-                if(not self.isValidVariable(argsObject[requiredArgsCounter])):
-                    self.error('Vyžadovaný argument ve funkci ' + opCode + ' na pozici ' + requiredArgsCounter + ' typu proměnná (var) není validní', 53)
-             elif(requiredArg == self.TYPE_SYMB):
-                if(not self.isValidSymbol(argsObject[requiredArgsCounter])):
-                    self.error('Vyžadovaný argument ve funkci ' + opCode + ' na pozici ' + requiredArgsCounter + ' typu symbol (var, const) není validní', 53)
-             elif(requiredArg == self.TYPE_LABEL):
-                if(not self.isValidLabel(argsObject[requiredArgsCounter])):
-                    self.error('Vyžadovaný argument ve funkci ' + opCode + ' na pozici ' + requiredArgsCounter + ' typu návěští (label) není validní', 53)
-             elif(requiredArg == self.TYPE_TYPE):
-                if(not self.isValidType(argsObject[requiredArgsCounter])):
-                    self.error('Vyžadovaný argument ve funkci ' + opCode + ' na pozici ' + requiredArgsCounter + ' typu typ (type) není validní', 53)
+    #
+    # Řádky, které uloží hodnotu a typ do proměnné (neexistující proměnná vede na chybu 54).
+    #
+    def emitStore(self, arg, valueExpression, typeExpression):
+        lines = [
+            'v = ' + self.frameExpression(arg) + '[' + str(arg.slot) + ']',
+            'if v is None: undefinedVariable(' + repr(arg.frame) + ', ' + repr(arg.name) + ')',
+        ]
 
-             requiredArgsCounter+=1
+        # se statistikou --vars se sleduje inicializace proměnných
+        if(self.interpreter.trackVariables):
+            lines.append('x = ' + valueExpression)
+            lines.append('updateInitializedVariables(v.value, x)')
+            valueExpression = 'x'
 
-        requiredArgsTypeCounter = 0
-        for requiredArgType in requiredArgsType:
+        return lines + [
+            'v.value = ' + valueExpression,
+            'v.type = ' + typeExpression,
+        ]
 
-            value = None
-            if requiredArgs[requiredArgsTypeCounter] == self.TYPE_SYMB:
-               value = self.getSymbolValue(argsObject[requiredArgsTypeCounter])
-            elif requiredArgs[requiredArgsTypeCounter] == self.TYPE_VAR:
-                value = self.getVariable(
-                    self.getVariableFrame(argsObject[requiredArgsTypeCounter]),
-                    self.getVariableName(argsObject[requiredArgsTypeCounter])
-                ).get('value')
-
-            if value != None:
-                if(requiredArgType == self.TYPE_INTEGER):
-                    if(not self.isValidInteger(value)):
-                        self.error('Vyžadovaný argument ve funkci ' + opCode + ' na pozici ' + requiredArgsCounter + ' typu ' + self.TYPE_INTEGER + ' není validní', 53)
-                elif(requiredArgType == self.TYPE_STRING):
-                    if(not self.isValidString(value)):
-                        self.error('Vyžadovaný argument ve funkci ' + opCode + ' na pozici ' + requiredArgsCounter + ' typu ' + self.TYPE_STRING + ' není validní', 53)
-                elif(requiredArgType == self.TYPE_BOOLEAN):
-                    if(not self.isValidBoolean(value)):
-                        self.error('Vyžadovaný argument ve funkci ' + opCode + ' na pozici ' + requiredArgsCounter + ' typu ' + self.TYPE_BOOLEAN + ' není validní', 53)
-                elif(requiredArgType == self.TYPE_FLOAT):
-                    if(not self.isValidFloat(value)):
-                       self.error('Vyžadovaný argument ve funkci ' + opCode + ' na pozici ' + requiredArgsCounter + ' typu ' + self.TYPE_FLOAT + ' není validní', 53)
-                elif(requiredArgType == self.TYPE_NIL):
-                    if(not self.isValidNil(value)):
-                        self.error('Vyžadovaný argument ve funkci ' + opCode + ' na pozici ' + requiredArgsCounter + ' typu ' + self.TYPE_NIL + ' není validní', 53)
+    #
+    # Instruction MOVE
+    #
+    def emitMove(self, instruction, index):
+        lines, value, type = self.emitSymbol(instruction.args[1], 'r1')
 
-            requiredArgsTypeCounter+=1
+        # neinicializovanou proměnnou nelze přečíst, rozpracovaný řetězec se předá jako neměnný str
+        if(instruction.args[1].kind == interpret.TYPE_VAR):
+            lines = lines + [
+                'if ' + type + ' is None: operandError(' + repr(instruction.name) + ', 1, r1, None)',
+                'x = ' + value,
+                'if x.__class__ is StringBuilder: x = str(x)',
+            ]
+            value = 'x'
 
-        return True
+        return lines + self.emitStore(instruction.args[0], value, type)
 
     #
-    # Instruction CREATEFRAME
+    # Instructions ADD, SUB, MUL
     #
-    def createFrameIns(self, opCode, args):
+    def emitArithmetic(self, instruction, index):
+        operator = {'ADD': ' + ', 'SUB': ' - ', 'MUL': ' * '}[interpret.INSTRUCTIONS[instruction.opcode][0]]
+        lines1, value1, type1 = self.emitSymbol(instruction.args[1], 'r1')
+        lines2, value2, type2 = self.emitSymbol(instruction.args[2], 'r2')
+        return (lines1 + lines2 +
+            self.emitTypeCheck(instruction.name, 1, instruction.args[1], 'r1', type1, interpret.TYPE_INTEGER) +
+            self.emitTypeCheck(instruction.name, 2, instruction.args[2], 'r2', type2, interpret.TYPE_INTEGER) +
+            self.emitStore(instruction.args[0], value1 + operator + value2, repr(interpret.TYPE_INTEGER)))
+
+    #
+    # Instruction CONCAT
+    #
+    def emitConcat(self, instruction, index):
+        lines1, value1, type1 = self.emitSymbol(instruction.args[1], 'r1')
+        lines2, value2, type2 = self.emitSymbol(instruction.args[2], 'r2')
+        lines = (lines1 + lines2 +
+            self.emitTypeCheck(instruction.name, 1, instruction.args[1], 'r1', type1, interpret.TYPE_STRING) +
+            self.emitTypeCheck(instruction.name, 2, instruction.args[2], 'r2', type2, interpret.TYPE_STRING))
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [])
+        # připojení na konec proměnné, která je zároveň cílem
+        if(self.interpreter.isSameVariable(instruction.args[0], instruction.args[1])):
+            return lines + [
+                'x = r1.value',
+                'if x.__class__ is str and len(x) < ' + str(interpret.STRING_BUILDER_THRESHOLD) + ': r1.value = x + ' + value2,
+                'else: appendString(r1, ' + value2 + ')',
+            ]
 
-        # vytvoří nový dočasný rámec a zahodí případný obsah původního dočasného rámce
-        self.TF = {}
+        return lines + self.emitStore(instruction.args[0], value1 + ' + ' + value2, repr(interpret.TYPE_STRING))
 
     #
-    # Instruction PUSHFRAME
+    # Instruction WRITE
     #
-    def pushFrameIns(self, opCode, args):
+    def emitWrite(self, instruction, index):
+        arg = instruction.args[0]
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [])
+        # konstanta se převede na výstupní text už při překladu
+        if(arg.kind != interpret.TYPE_VAR):
+            return ['write(' + repr(self.interpreter.formatValue(arg.value)) + ')']
 
-        # dočasný rámec k přesunutí musí existovat
-        if(self.TF is None):
-            self.error('Pokus o přístup k nedefinovanému dočasnému rámci', 53)
+        return self.emitVariable(arg, 'r1') + ['write(formatValue(r1.value))']
 
-        # přesun TF na zásobník rámců
-        self.LFStack.append(self.TF)
+    #
+    # Instruction LABEL
+    #
+    def emitLabel(self, instruction, index):
+        return ['pass']
 
-        # dočasný rámec je po přesunutí nedefinován
-        self.TF = None
+    #
+    # Instruction JUMP
+    #
+    def emitJump(self, instruction, index):
+        return ['return ' + str(self.interpreter.getLabel(instruction.args[0]))]
 
     #
-    # Instruction MOVE
+    # Instructions JUMPIFEQ, JUMPIFNEQ
     #
-    def moveIns(self, opCode, args):
+    def emitConditionalJump(self, instruction, index):
+        lines1, value1, type1 = self.emitSymbol(instruction.args[1], 'r1')
+        lines2, value2, type2 = self.emitSymbol(instruction.args[2], 'r2')
+        comparison = ' == ' if interpret.INSTRUCTIONS[instruction.opcode][0] == 'JUMPIFEQ' else ' != '
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR, self.TYPE_SYMB])
+        # kontrola typů (u dvou konstant rozhodne už překlad, u dvou proměnných i neinicializovanost)
+        check = 'checkComparableTypes(' + repr(instruction.name) + ', ' + type1 + ', ' + type2 + ')'
+        if(instruction.args[1].kind != interpret.TYPE_VAR and instruction.args[2].kind != interpret.TYPE_VAR):
+            checks = [] if type1 == type2 else [check]
+        elif(instruction.args[1].kind == interpret.TYPE_VAR and instruction.args[2].kind == interpret.TYPE_VAR):
+            checks = ['if ' + type1 + ' != ' + type2 + ' or ' + type1 + ' is None: ' + check]
+        else:
+            checks = ['if ' + type1 + ' != ' + type2 + ': ' + check]
 
-        # zkopíruje hodnotu symb do var
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0]), 
-            self.getSymbolValue(args[1]),
-            self.getSymbolType(args[1])
-        )
+        return lines1 + lines2 + checks + [
+            'index = ' + str(self.interpreter.getLabel(instruction.args[0])) + ' if ' + value1 + comparison + value2 + ' else ' + str(index + 1),
+            'return index',
+        ]
+
+#
+# Profilování interpretace (--profile)
+#
+# Pro každou instrukci programu (podle atributu order) se počítá počet vykonání a celkový čas, ze
+# kterých se sčítají statistiky operačních kódů a návěští (instrukce patří k poslednímu návěští LABEL
+# před ní). Návěští, na které se skočí instrukcí CALL, se navíc bere jako funkce: podle zásobníku
+# volání se jí měří inkluzivní čas (včetně volaných funkcí, u rekurze se počítá jen vnější volání)
+# a exkluzivní čas. Exkluzivní časy cest zásobníkem volání lze uložit ve formátu folded stacks
+# pro nástroje flame graph (jeden řádek „<main>;f;g mikrosekundy“ na cestu).
+#
+# Profilované instrukce se vykonávají ve vlastní smyčce, smyčky jader bez --profile se nemění.
+#
+class Profiler:
+
+    MAIN = '<main>'
+
+    def __init__(self, interpreter, instructions):
+        self.interpreter = interpreter
+        self.instructions = instructions
+        self.counts = [0] * len(instructions)
+        self.times = [0.0] * len(instructions)
+
+        # CALL a RETURN mění zásobník funkcí, u CALL je uloženo jméno volaného návěští
+        self.calls = [None] * len(instructions)
+        self.returns = [False] * len(instructions)
+        for index, instruction in enumerate(instructions):
+            name = interpret.INSTRUCTIONS[instruction.opcode][0]
+            if(name == 'CALL'):
+                self.calls[index] = instruction.args[0].name
+            elif(name == 'RETURN'):
+                self.returns[index] = True
+
+        # zásobník funkcí: [jméno, cesta pro folded stacks, začátek, čas volaných funkcí]
+        self.stack = [[self.MAIN, self.MAIN, time.perf_counter(), 0.0]]
+        self.functions = {self.MAIN: {'calls': 1, 'inclusive': 0.0, 'exclusive': 0.0}}
+        self.active = {self.MAIN: 1}
+        self.folded = {}
+
+    #
+    # Vykoná program jádrem table (obslužné funkce instrukcí mění čítač instrukcí interpretu)
+    #
+    def execute(self, instructions):
+        interpreter = self.interpreter
+        clock = time.perf_counter
+        end = len(instructions)
+        limits = interpreter.limits
+        executed = 0
+        checkpoint = limits.start() if limits != None else None
+        while interpreter.instructionIndex < end:
+            index = interpreter.instructionIndex
+            if(checkpoint != None and executed >= checkpoint):
+                checkpoint = limits.check(executed, index)
+            executed += 1
+            interpreter.instructionIndex += 1
+            start = clock()
+            interpreter.executeInstruction(instructions[index])
+            self.record(index, start, clock())
+
+    #
+    # Vykoná program přeložený na uzávěry (každý uzávěr vrací index následující instrukce)
+    #
+    def run(self, steps):
+        interpreter = self.interpreter
+        clock = time.perf_counter
+        index = 0
+        end = len(steps)
+        limits = interpreter.limits
+        executed = 0
+        checkpoint = limits.start() if limits != None else None
+        while index < end:
+            if(checkpoint != None and executed >= checkpoint):
+                checkpoint = limits.check(executed, index)
+            executed += 1
+            start = clock()
+            nextIndex = steps[index]()
+            if(interpreter.statsParameters):
+                interpreter.updateStats()
+            self.record(index, start, clock())
+            index = nextIndex
+
+    #
+    # Započítá jedno vykonání instrukce
+    #
+    def record(self, index, start, stop):
+        self.counts[index] += 1
+        self.times[index] += stop - start
+
+        if(self.calls[index] != None):
+            self.enter(self.calls[index], stop)
+        elif(self.returns[index] and len(self.stack) > 1):
+            self.leave(stop)
+
+    def enter(self, name, now):
+        function = self.functions.get(name)
+        if(function == None):
+            function = self.functions[name] = {'calls': 0, 'inclusive': 0.0, 'exclusive': 0.0}
+        function['calls'] += 1
+        self.active[name] = self.active.get(name, 0) + 1
+        self.stack.append([name, self.stack[-1][1] + ';' + name, now, 0.0])
+
+    def leave(self, now):
+        name, path, start, children = self.stack.pop()
+        inclusive = now - start
+        exclusive = inclusive - children
+        function = self.functions[name]
+        function['exclusive'] += exclusive
+
+        # rekurzivní volání už je v inkluzivním čase vnějšího volání
+        self.active[name] -= 1
+        if(self.active[name] == 0):
+            function['inclusive'] += inclusive
+
+        if(self.stack):
+            self.stack[-1][3] += inclusive
+        self.folded[path] = self.folded.get(path, 0.0) + exclusive
+
+    #
+    # Ukončí všechny rozpracované funkce (program skončil instrukcí EXIT, chybou nebo koncem programu)
+    #
+    def finish(self):
+        now = time.perf_counter()
+        while self.stack:
+            self.leave(now)
+
+    #
+    # Vrátí výsledky profilování jako slovník pro JSON
+    #
+    def getReport(self):
+        opcodes = {}
+        labels = {}
+        instructions = []
+        label = self.MAIN
+        for index, instruction in enumerate(self.instructions):
+            name = interpret.INSTRUCTIONS[instruction.opcode][0]
+            if(instruction.opcode == interpret.OPCODE_LABEL):
+                label = instruction.args[0].name
+
+            count = self.counts[index]
+            if(count == 0):
+                continue
+            elapsed = self.times[index]
+            instructions.append({'order': instruction.order, 'opcode': name, 'label': label, 'count': count, 'time': elapsed})
+            for table, key in ((opcodes, name), (labels, label)):
+                entry = table.setdefault(key, {'count': 0, 'time': 0.0})
+                entry['count'] += count
+                entry['time'] += elapsed
+
+        return {
+            'total': {'count': sum(self.counts), 'time': sum(self.times)},
+            'opcodes': opcodes,
+            'labels': labels,
+            'functions': self.functions,
+            'instructions': instructions,
+        }
 
     #
-    # Nastavuje hodnotu a typ proměnné dle uvedeného rámce.
-    # V případě varValue None nebo varType None se jedná o deklaraci
+    # Vrátí řádky ve formátu folded stacks (exkluzivní čas cesty v mikrosekundách)
     #
-    def setVariable(self, varFrame, varName, varValue = None, varType = None):
-
-        # konverze na typ
-        varValue = self.getValueByType(varValue, varType)
+    def getFolded(self):
+        return [path + ' ' + str(int(round(elapsed * 1e6))) for path, elapsed in sorted(self.folded.items())]
 
-        # globální rámec
-        if(varFrame == self.FRAME_GLOBAL):
+#
+# Server s předehřátým interpretem (--serve), naslouchá na unixovém socketu a každý požadavek vykoná
+# novou instancí interpret, požadavky se tak navzájem neovlivňují. Požadavky obsluhuje zásobárna
+# pracovních procesů (fork), které přijímají spojení ze společného socketu, skončený pracovní proces
+# se nahradí novým. Klientem kompatibilním s parametry interpret.py je interpret_client.py.
+#
+# Každý požadavek má limity vykonávání (ExecutionLimits), výchozí jsou REQUEST_TIMEOUT a REQUEST_MAX_INSTS,
+# případně --timeout, --max-insts a --max-memory serveru, a požadavek je může přepsat. Vykonávání skončí
+# chybou 59 také tehdy, když klient spojení zavře. Pracovní proces, jehož požadavek běží o KILL_GRACE
+# déle než časový limit (např. jediná instrukce nad obrovským číslem), hlavní proces ukončí a nahradí,
+# klient pak nedostane odpověď.
+#
+# Požadavek i odpověď jsou objekty JSON, klient po odeslání požadavku ukončí zápis a server po odeslání
+# odpovědi spojení zavře. Bajtová data jsou kódovaná base64.
+#
+# Požadavek: {"source": cesta nebo "sourceData": XML, "input": vstup, "stats": ["insts", "vars"], "engine": jádro,
+#             "maxInsts": n, "timeout": sekundy, "maxMemory": velikost}
+# Odpověď:   {"exitCode": kód, "stdout": výstup, "stderr": chybový výstup,
+#             "stats": {"insts": n} nebo null při chybě před vykonáváním programu}
+#
+class Server:
 
-            # automaticky inicializován na začátku interpretace, kontroluju tedy pouze zda proměnná existuje pokud se nejedná o deklaraci
-            if(varValue != None or varType != None):
-                if(varName not in self.GF):
-                    self.error('Proměnná:' + varName + ' na GF neexistuje', 54)
+    BACKLOG = 64
 
-            # nastav
-            self.GF[varName] = {"value": varValue, "type": varType}
- 
-        # lokální rámec
-        elif(varFrame == self.FRAME_LOCAL):
+    # výchozí limity jednoho požadavku
+    REQUEST_TIMEOUT = 30
+    REQUEST_MAX_INSTS = 10 ** 9
 
-            # zásobník rámců musí obsahovat alespoň 1 lokální rámec
-            if(len(self.LFStack) == 0):
-                self.error('Zásobník rámců je prázdný, žádný lokální rámec není v aktuální chvíli definovaný', 55)
+    # rezerva nad časovým limitem požadavku, po které hlavní proces pracovní proces ukončí, a interval kontroly
+    KILL_GRACE = 5
+    WATCHDOG_INTERVAL = 0.5
 
-            currentLFStack = len(self.LFStack) - 1
+    # limity, které může přepsat požadavek
+    LIMITS = ('maxInsts', 'timeout', 'maxMemory')
 
-            # kontrola zda proměnná existuje pokud se nejedná o deklaraci
-            if(varValue != None or varType != None):
-                if(varName not in self.LFStack[currentLFStack]):
-                    self.error('Proměnná:' + varName + ' na aktuálním LF neexistuje', 54)
+    #
+    # options: výchozí nastavení interpretu pro požadavky (engine, cacheDir, cacheSize a limity vykonávání)
+    #
+    def __init__(self, path, workers, options):
+        self.path = path
+        self.workers = workers
+        self.options = dict(options)
+        if(self.options.get('timeout') == None):
+            self.options['timeout'] = self.REQUEST_TIMEOUT
+        if(self.options.get('maxInsts') == None):
+            self.options['maxInsts'] = self.REQUEST_MAX_INSTS
 
-            # nastav
-            self.LFStack[currentLFStack][varName] = {'value': varValue, 'type': varType}
+        # termín dokončení požadavku každého pracovního procesu (time.monotonic, 0 bez požadavku),
+        # sdílený s hlavním procesem
+        self.deadlines = None
+        self.slot = None
 
-        # dočasný rámec
-        elif(varFrame == self.FRAME_TEMPORARY):
+    #
+    # Spustí pracovní procesy a obnovuje je až do ukončení signálem SIGINT nebo SIGTERM
+    #
+    def serve(self):
 
-            # dočasný rámec musí existovat
-            if(self.TF == None):
-                self.error('Dočasný rámec je nedefinovaný', 55)
+        # socket po předchozím serveru se nahradí
+        if(os.path.exists(self.path) and stat.S_ISSOCK(os.stat(self.path).st_mode)):
+            os.unlink(self.path)
 
-            # kontrola zda proměnná existuje pokud se nejedná o deklaraci
-            if(varValue != None or varType != None):
-                if(varName not in self.TF):
-                    self.error('Proměnná:' + varName + ' na TF neexistuje', 54)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            listener.bind(self.path)
+            listener.listen(self.BACKLOG)
+        except OSError:
+            raise OutputFileError('Nepodařilo se vytvořit socket: ' + self.path, 12)
+
+        signal.signal(signal.SIGTERM, self.terminate)
+        self.deadlines = mmap.mmap(-1, 8 * self.workers)
+        children = {}
+        try:
+            while True:
+                for slot in range(self.workers):
+                    if(slot not in children):
+                        self.setDeadline(slot, 0)
+                        pid = os.fork()
+                        if(pid == 0):
+                            self.work(listener, slot)
+                        children[slot] = pid
+
+                # skončený pracovní proces se nahradí, jinak se ukončí procesy po termínu
+                pid, status = os.waitpid(-1, os.WNOHANG)
+                if(pid != 0):
+                    for slot in [slot for slot in children if children[slot] == pid]:
+                        del children[slot]
+                    continue
+                self.killOverdue(children)
+                time.sleep(self.WATCHDOG_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for pid in children.values():
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                    os.waitpid(pid, 0)
+                except OSError:
+                    pass
+            listener.close()
+            os.unlink(self.path)
 
-            # nastav
-            self.TF[varName] = {'value': varValue, 'type': varType}
+        return 0
 
     #
-    # Vrací hodnotu proměnné dle uvedeného rámce.
+    # Ukončení signálem SIGTERM proběhne stejně jako přerušení (úklid pracovních procesů a socketu)
+    #
+    def terminate(self, signum, frame):
+        raise KeyboardInterrupt
+
     #
-    # Výstup: {'value': X, 'type': Y}
+    # Ukončí pracovní procesy, jejichž požadavek překročil termín
     #
-    def getVariable(self, varFrame, varName):
+    def killOverdue(self, children):
+        now = time.monotonic()
+        for slot, pid in children.items():
+            deadline = self.getDeadline(slot)
+            if(deadline != 0 and now > deadline):
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except OSError:
+                    pass
 
-         # globální rámec
-        if(varFrame == self.FRAME_GLOBAL):
+    def getDeadline(self, slot):
+        return struct.unpack_from('d', self.deadlines, 8 * slot)[0]
 
-            # globální rámec je automaticky inicializován na začátku interpretace, stačí kontrolovat zda proměnná existuje
-            if(varName not in self.GF):
-                self.error('Proměnná:' + varName + ' na GF neexistuje', 54)
+    def setDeadline(self, slot, deadline):
+        struct.pack_into('d', self.deadlines, 8 * slot, deadline)
 
-            # vrať
-            return self.GF[varName]
+    #
+    # Smyčka pracovního procesu, proces se nikdy nevrací
+    #
+    def work(self, listener, slot):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        self.slot = slot
+        try:
+            while True:
+                connection, address = listener.accept()
 
-        # lokální rámec
-        elif(varFrame == self.FRAME_LOCAL):
+                # termín pro čtení požadavku a načtení programu, po vytvoření interpretu ho nahradí jeho limit
+                self.setDeadline(slot, time.monotonic() + self.REQUEST_TIMEOUT + self.KILL_GRACE)
+                try:
+                    self.handleConnection(connection)
+                except Exception:
+                    # klient spojení přerušil nebo poslal nevalidní požadavek
+                    pass
+                finally:
+                    self.setDeadline(slot, 0)
+                    connection.close()
+        finally:
+            os._exit(0)
 
-            # zásobník rámců musí obsahovat alespoň 1 lokální rámec
-            if(len(self.LFStack) == 0):
-                self.error('Zásobník rámců je prázdný, žádný lokální rámec není v aktuální chvíli definovaný', 55)
+    #
+    # Přečte požadavek ze spojení a odešle odpověď
+    #
+    def handleConnection(self, connection):
+        chunks = []
+        while True:
+            chunk = connection.recv(65536)
+            if(not chunk):
+                break
+            chunks.append(chunk)
+
+        request = json.loads(b''.join(chunks).decode('utf-8'))
+        connection.sendall(json.dumps(self.handle(request, connection)).encode('utf-8'))
+
+    #
+    # Vykoná jeden požadavek, vrací odpověď. Se spojením connection se vykonávání přeruší, když ho klient zavře.
+    #
+    def handle(self, request, connection = None):
+        output = io.StringIO()
+        errors = io.StringIO()
+        stats = None
+        try:
+            options = dict(self.options)
+            options['engine'] = request.get('engine', options['engine'])
+            for name in self.LIMITS:
+                if(request.get(name) != None):
+                    options[name] = request[name]
+            program = interpret(stats = request.get('stats', []), **options)
+
+            # termín pro hlavní proces podle časového limitu požadavku
+            if(self.slot != None):
+                self.setDeadline(self.slot, time.monotonic() + program.limits.timeout + self.KILL_GRACE)
+
+            # zavřené spojení (POLLHUP) přeruší vykonávání v kontrolním bodě limitů
+            if(connection != None):
+                poller = select.poll()
+                poller.register(connection, select.POLLHUP)
+                program.limits.cancelled = lambda: bool(poller.poll(0))
+
+            if('sourceData' in request):
+                program.load(base64.b64decode(request['sourceData']))
+            else:
+                program.load(request['source'])
+
+            result = program.run(base64.b64decode(request.get('input', '')).decode('utf-8'), output, errors)
+            exitCode = result.exitCode
+            stats = result.stats
+        except InterpretError as error:
+            errors.write(error.message + '\n')
+            exitCode = error.code
+            stats = error.stats
+        except Exception:
+            errors.write(traceback.format_exc())
+            exitCode = 99
+
+        return {
+            'exitCode': exitCode,
+            'stdout': base64.b64encode(output.getvalue().encode('utf-8')).decode('ascii'),
+            'stderr': base64.b64encode(errors.getvalue().encode('utf-8')).decode('ascii'),
+            'stats': stats,
+        }
 
-            currentLFStack = len(self.LFStack) - 1
-            if(varName not in self.LFStack[currentLFStack]):
-                self.error('Proměnná:' + varName + ' na GF neexistuje', 54)
+#
+# Dávkové spuštění testů (--batch) ve formátu testovacího skriptu test.php (--int-only): ke každému
+# souboru .src se dohledají soubory .in, .out a .rc se stejným jménem (chybějící .in a .out jsou prázdné,
+# chybějící .rc obsahuje 0). Testy se rozdělí mezi pracovní procesy, každý proces interpret načte
+# jednou a výstup porovná sám se stejnou sémantikou jako diff -w. Výstup se porovnává jen u testů
+# s očekávaným návratovým kódem 0.
+#
+class Batch:
 
-            # vrať
-            return self.LFStack[currentLFStack][varName]
+    FORMAT_JSON = 'json'
+    FORMAT_HTML = 'html'
 
-        # dočasný rámec
-        elif(varFrame == self.FRAME_TEMPORARY):
+    #
+    # options: nastavení interpretu pro testy (engine, cacheDir, cacheSize a limity vykonávání)
+    #
+    def __init__(self, directory, recursive, jobs, options):
+        self.directory = directory
+        self.recursive = recursive
+        self.jobs = jobs
+        self.options = options
 
-            # dočasný rámec musí existovat
-            if(self.TF == None):
-                self.error('Dočasný rámec je nedefinovaný', 55)
+    #
+    # Najde soubory .src stejně jako test.php (nejdříve v adresáři, poté v podadresářích)
+    #
+    def findTests(self, directory):
+        names = sorted(os.listdir(directory))
+        tests = [os.path.join(directory, name) for name in names if name.endswith('.src') and os.path.isfile(os.path.join(directory, name))]
+        if(self.recursive):
+            for name in names:
+                if(os.path.isdir(os.path.join(directory, name))):
+                    tests += self.findTests(os.path.join(directory, name))
+        return tests
 
-            # neexistuje proměnná
-            if(varName not in self.TF):
-                self.error('Proměnná:' + varName + ' na TF neexistuje', 54)
+    #
+    # Vykoná všechny testy, vrací souhrn výsledků
+    #
+    def run(self):
+        if(not os.path.isdir(self.directory)):
+            raise InputFileError('Nepodařilo se otevřít adresář s testy: ' + self.directory, 11)
 
-            # vrať
-            return self.TF[varName]
+        start = time.perf_counter()
+        tests = self.findTests(self.directory)
+        if(self.jobs == 1 or len(tests) < 2):
+            results = [self.runTest(test) for test in tests]
+        else:
+            # multiprocessing se načítá až zde, běžné spuštění interpretu ho nepotřebuje
+            import multiprocessing
+            with multiprocessing.Pool(self.jobs) as pool:
+                results = pool.map(self.runTest, tests, max(1, len(tests) // (self.jobs * 8)))
+
+        folders = {}
+        for result in results:
+            folder = folders.setdefault(os.path.dirname(result['source']), {'tests': 0, 'passed': 0})
+            folder['tests'] += 1
+            folder['passed'] += result['passed']
+
+        passed = sum(result['passed'] for result in results)
+        return {
+            'tests': len(results),
+            'passed': passed,
+            'failed': len(results) - passed,
+            'time': time.perf_counter() - start,
+            'folders': folders,
+            'results': results,
+        }
+
+    #
+    # Vykoná jeden test, vrací jeho výsledek
+    #
+    def runTest(self, source):
+        base = source[:-len('.src')]
+        start = time.perf_counter()
+        expectedCode = self.readTestFile(base + '.rc', b'0').strip()
+        try:
+            program = interpret(**self.options)
+            program.load(source)
+            result = program.run(self.readTestFile(base + '.in', b'').decode('utf-8'), None, io.StringIO())
+            exitCode = result.exitCode
+            output = result.output
+        except InterpretError as error:
+            exitCode = error.code
+            output = error.output or b''
+        except Exception:
+            # chyba interpretu samotného (případně vstup mimo UTF-8) neukončí celou dávku
+            exitCode = 99
+            output = b''
+
+        returnCode = str(exitCode).encode('ascii') == expectedCode
+        outputMatches = None
+        if(expectedCode == b'0'):
+            outputMatches = self.normalizeOutput(output) == self.normalizeOutput(self.readTestFile(base + '.out', b''))
+
+        return {
+            'name': os.path.basename(base),
+            'source': source,
+            'exitCode': exitCode,
+            'expectedCode': int(expectedCode) if expectedCode.isdigit() else expectedCode.decode('utf-8', 'replace'),
+            'returnCode': returnCode,
+            'output': outputMatches,
+            'passed': returnCode and outputMatches != False,
+            'time': time.perf_counter() - start,
+        }
+
+    #
+    # Přečte soubor testu, chybějící soubor má výchozí obsah
+    #
+    def readTestFile(self, path, default):
+        try:
+            with open(path, 'rb') as file:
+                return file.read()
+        except OSError:
+            return default
 
-    def getVariableFrame(self, arg):
-        return arg.text.split("@")[0]
+    #
+    # Rozdělí výstup na řádky bez bílých znaků (diff -w), chybějící konec posledního řádku se ignoruje
+    #
+    def normalizeOutput(self, output):
+        lines = output.split(b'\n')
+        if(lines[-1] == b''):
+            lines.pop()
+        return [re.sub(rb'\s+', b'', line) for line in lines]
 
-    def getVariableName(self, arg):
-        return arg.text.split("@")[1]
+    #
+    # Vrátí souhrn výsledků ve formátu JSON
+    #
+    def formatJson(self, summary):
+        return json.dumps(summary, indent=2, ensure_ascii=False) + '\n'
 
     #
-    # Instruction DEFVAR
+    # Vrátí souhrn výsledků jako HTML stránku (obdoba výstupu test.php)
     #
-    def defVarIns(self, opCode, args):
+    def formatHtml(self, summary):
+        import html
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_VAR])
+        def color(success):
+            return 'style="color: ' + ('green' if success else 'red') + ';"'
 
-        # nastav (bez určení typu a hodnoty)
-        self.setVariable(
-            self.getVariableFrame(args[0]),
-            self.getVariableName(args[0])
-        )
+        page = ["<!DOCTYPE html>\n<html dir='ltr' lang='cs-cz'>\n<head><meta charset=\"UTF-8\"></head>\n<body>\n<h1>Testy:</h1>\n"]
+        for index, result in enumerate(summary['results'], 1):
+            page.append('<h2 ' + color(result['passed']) + '>' + str(index) + '. ' + html.escape(result['name']) + '</h2>\n')
+            page.append('<p>Složka: ' + html.escape(os.path.dirname(result['source'])) + '</p>\n<ul>\n')
+            if(result['output'] != None):
+                page.append('<li>Test porovnání výstupu interpretace: <span ' + color(result['output']) + '>' + str(result['output']).lower() + '</span></li>\n')
+            page.append('<li>Test návratového kódu: <span ' + color(result['returnCode']) + '>' + str(result['returnCode']).lower() + '</span>')
+            page.append(' (' + str(result['exitCode']) + ', očekáváno ' + html.escape(str(result['expectedCode'])) + ')</li>\n</ul>\n')
+
+        page.append('<h1 ' + color(summary['failed'] == 0) + '>Celková úspěšnost: ' + str(summary['passed']) + '/' + str(summary['tests']) + '</h1>\n')
+        page.append('<h1>Složky:</h1>\n')
+        for index, (name, folder) in enumerate(summary['folders'].items(), 1):
+            page.append('<h2 ' + color(folder['passed'] == folder['tests']) + '>' + str(index) + '. ' + html.escape(name))
+            page.append(' (' + str(folder['passed']) + '/' + str(folder['tests']) + ')</h2>\n')
+        page.append('<p>Čas: ' + '%.3f' % summary['time'] + ' s</p>\n</body>\n</html>\n')
+        return ''.join(page)
+
+#
+# Vykonání jednoho načteného programu nad mnoha vstupními soubory (--input-glob, --inputs-from).
+# Program se načte a zvaliduje jednou, pracovní procesy vzniklé pomocí fork ho sdílejí (copy-on-write)
+# a vykonávají vstupy na přeskáčku (proces i zpracuje vstupy i, i + N, ...). Výsledky se čtou
+# z rour procesů ve stejném pořadí, takže výstup nezávisí na rychlosti procesů.
+#
+# Výsledek vstupu je řádek JSON {"input": cesta, "exitCode": kód, "stdout": výstup, "stderr": chybový výstup,
+# "stats": statistiky nebo null při chybě}, s --output-dir se místo toho zapíší soubory <jméno>.out,
+# <jméno>.err, <jméno>.rc a s --stats i <jméno>.stats.
+#
+class FanOut:
+
+    def __init__(self, interpreter, inputs, jobs, outputDir = None):
+        self.interpreter = interpreter
+        self.inputs = inputs
+        self.jobs = jobs
+        self.outputDir = outputDir
+
+        # jména výstupních souborů podle jmen vstupů
+        self.names = [os.path.splitext(os.path.basename(path))[0] for path in inputs]
+        if(outputDir != None):
+            if(len(set(self.names)) != len(self.names)):
+                raise ParameterError('Vstupní soubory s --output-dir musí mít různá jména.', 10)
+            if(not os.path.isdir(outputDir)):
+                raise OutputFileError('Nepodařilo se otevřít výstupní adresář: ' + outputDir, 12)
 
     #
-    # Instruction CALL
+    # Vykoná program nad všemi vstupy, výsledky zapisuje v pořadí vstupů
     #
-    def callIns(self, opCode, args):
+    def run(self, stream):
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [self.TYPE_LABEL])
+        # objekty načtené před fork se nebudou procházet garbage collectorem, který by je kopíroval
+        if(hasattr(gc, 'freeze')):
+            gc.freeze()
 
-        # uloží inkrementovanou aktuální pozici z interního čítače instrukcí do zásobníku volání
-        nextInstructionIndex = self.instructionIndex + 1
-        self.callStack.append(nextInstructionIndex)
+        jobs = min(self.jobs, len(self.inputs))
+        if(jobs < 2):
+            for position in range(len(self.inputs)):
+                self.report(position, self.runInput(self.inputs[position]), stream)
+            return
 
-        # provede skok na zadané návěští
-        self.jumpTo = self.getLabel(args[0])
+        stream.flush()
+        readers = []
+        children = []
+        try:
+            for index in range(jobs):
+                readFd, writeFd = os.pipe()
+                pid = os.fork()
+                if(pid == 0):
+                    os.close(readFd)
+                    for reader in readers:
+                        reader.close()
+                    self.work(index, jobs, os.fdopen(writeFd, 'w', encoding='utf-8'))
+                os.close(writeFd)
+                readers.append(os.fdopen(readFd, 'r', encoding='utf-8'))
+                children.append(pid)
+
+            for position in range(len(self.inputs)):
+                line = readers[position % jobs].readline()
+                if(not line):
+                    raise InterpretError('Pracovní proces skončil předčasně při vstupu: ' + self.inputs[position], 99)
+                self.report(position, json.loads(line), stream)
+        finally:
+            for reader in readers:
+                reader.close()
+            for pid in children:
+                os.waitpid(pid, 0)
+
+    #
+    # Smyčka pracovního procesu, proces se nikdy nevrací
+    #
+    def work(self, index, jobs, writer):
+        try:
+            for position in range(index, len(self.inputs), jobs):
+                writer.write(json.dumps(self.runInput(self.inputs[position])) + '\n')
+                writer.flush()
+        finally:
+            os._exit(0)
 
     #
-    # Instruction RETURN
+    # Vykoná program nad jedním vstupem, vrací výsledek
     #
-    def returnIns(self, opCode, args):
+    def runInput(self, path):
+        errors = io.StringIO()
+        stats = None
+        try:
+            with open(path, 'r') as inputFile:
+                result = self.interpreter.run(inputFile, None, errors)
+            exitCode = result.exitCode
+            output = result.output
+            stats = result.stats
+        except OSError:
+            errors.write('Nepodařilo se otevřít soubor pro čtení vstupu: ' + path + '\n')
+            exitCode = 11
+            output = b''
+        except InterpretError as error:
+            errors.write(error.message + '\n')
+            exitCode = error.code
+            output = error.output or b''
+            stats = error.stats
+
+        return {'input': path, 'exitCode': exitCode, 'stdout': output.decode('utf-8'), 'stderr': errors.getvalue(), 'stats': stats}
+
+    #
+    # Zapíše výsledek vstupu jako řádek JSON, případně do souborů v --output-dir
+    #
+    def report(self, position, result, stream):
+        if(self.outputDir == None):
+            stream.write(json.dumps(result, ensure_ascii=False) + '\n')
+            return
+
+        base = os.path.join(self.outputDir, self.names[position])
+        try:
+            with open(base + '.out', 'w', encoding='utf-8') as file:
+                file.write(result['stdout'])
+            with open(base + '.err', 'w', encoding='utf-8') as file:
+                file.write(result['stderr'])
+            with open(base + '.rc', 'w') as file:
+                file.write(str(result['exitCode']) + '\n')
+            if(result['stats']):
+                with open(base + '.stats', 'w') as file:
+                    for name in result['stats']:
+                        file.write(str(result['stats'][name]) + '\n')
+        except OSError:
+            raise OutputFileError('Nepodařilo se zapsat výsledek vstupu: ' + base, 12)
 
-        # ověření argumentů
-        self.checkInstructionArgs(opCode, args, [])
+#
+# Rozhraní příkazové řádky, tenká vrstva nad knihovním rozhraním třídy interpret: zpracuje parametry,
+# načte a jednou spustí program, uloží statistiky --stats a chybu vypíše na standardní chybový výstup.
+#
+class CommandLine:
 
-        # vyjme pozici ze zásobníku volání
-        value = self.callStack.pop()
+    #
+    # Spustí interpret podle parametrů příkazové řádky, vrací návratový kód procesu
+    #
+    def main(self):
+        try:
+            opts = self.parseCmdArgs()
+            if(opts == None):
+                return 0
 
-        # skočí na tuto pozici nastavením interního čítače instrukcí
-        self.jumpTo = value
-
-    #
-    # Funkce obstarává zavolání pro každou instrukci zvlášť, opcode v xml buď odpovídá některé z povolených instrukcí nebo funkce skončí chybou.
-    # Parametry: opcode a argumenty(args) pro danou instrukci.
-    #
-    def executePreRunInstruction(self, opcode, args):
-        upperOpCode = opcode.upper()
-
-        if upperOpCode == 'LABEL':
-            self.labelIns(opcode, args)
-
-    #
-    # Funkce obstarává zavolání pro každou instrukci zvlášť, opcode v xml buď odpovídá některé z povolených instrukcí nebo funkce skončí chybou.
-    # Parametry: opcode a argumenty(args) pro danou instrukci.
-    #
-    def executeInstruction(self, opcode, args):
-        upperOpCode = opcode.upper()
-
-        if(upperOpCode == 'CALL'):
-            self.callIns(opcode, args)
-        elif(upperOpCode == 'RETURN'):
-            self.returnIns(opcode, args)
-        elif(upperOpCode == 'MOVE'):
-            self.moveIns(opcode, args)
-        elif(upperOpCode == 'CREATEFRAME'):
-            self.createFrameIns(opcode, args)
-        elif(upperOpCode == 'PUSHFRAME'):
-            self.pushFrameIns(opcode, args)
-        elif(upperOpCode == 'INT2CHAR'):
-            self.int2charIns(opcode, args)
-        elif(upperOpCode == 'INT2FLOAT'):
-            self.int2floatIns(opcode, args)
-        elif(upperOpCode == 'FLOAT2INT'):
-            self.float2intIns(opcode, args)
-        elif(upperOpCode == 'BREAK'):
-            self.breakIns()
-        elif(upperOpCode == 'POPS'):
-            self.popsIns(opcode, args)
-        elif(upperOpCode == 'PUSHS'):
-            self.pushsIns(opcode, args)
-        elif(upperOpCode == 'DEFVAR'):
-            self.defVarIns(opcode, args)
-        elif(upperOpCode == 'WRITE'):
-            self.writeIns(opcode, args)
-        elif(upperOpCode == 'DPRINT'):
-            self.dprintIns(opcode, args)
-        elif(upperOpCode == 'ADD'):
-            self.addIns(opcode, args)
-        elif(upperOpCode == 'SUB'):
-            self.subIns(opcode, args)
-        elif(upperOpCode == 'MUL'):
-            self.mulIns(opcode, args)
-        elif(upperOpCode == 'IDIV'):
-            self.idivIns(opcode, args)
-        elif(upperOpCode == 'LT'):
-            self.ltIns(opcode, args)
-        elif(upperOpCode == 'EQ'):
-            self.eqIns(opcode, args)
-        elif(upperOpCode == 'GT'):
-            self.gtIns(opcode, args)
-        elif(upperOpCode == 'AND'):
-            self.andIns(opcode, args)
-        elif(upperOpCode == 'OR'):
-            self.orIns(opcode, args)
-        elif(upperOpCode == 'NOT'):
-            self.notIns(opcode, args)
-        elif(upperOpCode == 'STRI2INT'):
-            self.stri2intIns(opcode, args)
-        elif(upperOpCode == 'CONCAT'):
-            self.concatIns(opcode, args)
-        elif(upperOpCode == 'GETCHAR'):
-            self.getcharIns(opcode, args)
-        elif(upperOpCode == 'SETCHAR'):
-            self.setcharIns(opcode, args)
-        elif(upperOpCode == 'READ'):
-            self.readIns(opcode, args)
-        elif(upperOpCode == 'STRLEN'):
-            self.strlenIns(opcode, args)
-        elif(upperOpCode == 'TYPE'):
-            self.typeIns(opcode, args)
-        elif(upperOpCode == 'LABEL'):
-            pass # pre run
-        elif(upperOpCode == 'JUMP'):
-            self.jumpIns(opcode, args)
-        elif(upperOpCode == 'JUMPIFEQ'):
-            self.jumpifeqIns(opcode, args)
-        elif(upperOpCode == 'JUMPIFNEQ'):
-            self.jumpifneqIns(opcode, args)
-        elif(upperOpCode == 'EXIT'):
-            self.exitIns(opcode, args)
+            # nastavení interpretu pro server a dávku testů
+            options = {'engine': opts.engine, 'cacheDir': opts.cacheDir, 'cacheSize': opts.cacheSize, 'maxInsts': opts.maxInsts, 'timeout': opts.timeout, 'maxMemory': opts.maxMemory}
 
-        # neznámý operační kód
-        else:
-            self.error('Instrukce: ' + opcode.upper() + ' neexistuje', 32)
+            # server s předehřátým interpretem
+            if(opts.serve != None):
+                return Server(opts.serve, opts.workers, options).serve()
 
-        # instrukci se podařilo provést bez erroru, inkrementujeme provedené instrukce
-        if(self.statsParameters.get('--insts', None) != None):
-            self.statsParameters['--insts'] += 1
+            # dávkové spuštění testů, souhrn výsledků se vypíše na standardní výstup
+            if(opts.batch != None):
+                batch = Batch(opts.batch, opts.recursive, opts.jobs, options)
+                summary = batch.run()
+                if(opts.batchFormat == Batch.FORMAT_HTML):
+                    sys.stdout.write(batch.formatHtml(summary))
+                else:
+                    sys.stdout.write(batch.formatJson(summary))
+                return 0 if summary['failed'] == 0 else 1
 
-        # projde všechny rámce a sečte proměnné, které jsou inicializované
-        if(self.statsParameters.get('--vars', None) != None):
+            interpreter = interpret(engine = opts.engine, stats = opts.statsNames, outputBuffer = opts.outputBuffer, cacheDir = opts.cacheDir,
+                cacheSize = opts.cacheSize, profile = opts.profile, profileFolded = opts.profileFolded, dumpSource = opts.dumpSource,
+                maxInsts = opts.maxInsts, timeout = opts.timeout, maxMemory = opts.maxMemory)
 
-            # pokud je to víc než je zatím uloženo, přepíše hodnotu
-            count = self.getTotalCountOfInitializedVariables()
-            if(count > self.statsParameters['--vars']):
-                self.statsParameters['--vars'] = count
+            # zdroj XML reprezentace programu, standartní vstup se čte také proudově
+            if(opts.source != None):
+                source = opts.source
+            else:
+                try:
+                    source = sys.stdin.buffer
+                except AttributeError:
+                    source = sys.stdin
 
-    #
-    # Vrátí celkový počet inicializovaných proměnných ze všech aktuálně existujících rámců
-    #
-    def getTotalCountOfInitializedVariables(self):
+            # v případě existujícího input souboru se ho pokusíme otevřít, jinak se čte standardní vstup
+            inputFile = sys.stdin
+            if(opts.input != None):
+                try:
+                    inputFile = open(opts.input, "r")
+                except:
+                    self.error('Nepodařilo se otevřít soubor pro čtení vstupu: ' + opts.input, 11)
 
-        # globální rámec
-        count = 0
-        for GFVariableName in self.GF:
-            if(self.GF[GFVariableName].get("value") != None):
-                count += 1
+            # jeden program nad mnoha vstupy
+            if(opts.inputGlob != None or opts.inputsFrom != None):
+                inputs = self.collectInputs(opts)
+                interpreter.load(source)
+                FanOut(interpreter, inputs, opts.jobs, opts.outputDir).run(sys.stdout)
+                return 0
 
-        # projde všechny lokální rámce
-        if(self.LFStack != None):
-            for LF in self.LFStack:
-                for LFVariableName in LF:
-                    if(self.LFStack[LF][LFVariableName].get("value") != None):
-                        count += 1
+            # načtení a interpretace, statistiky se uloží i po chybě během vykonávání (do okamžiku chyby)
+            interpreter.load(source)
+            try:
+                result = interpreter.run(inputFile, sys.stdout)
+            except InterpretError as error:
+                if(opts.stats != None and error.stats != None):
+                    self.writeStats(opts.stats, error.stats)
+                raise
+
+            # uložíme statistiky do souboru dle pořadí pokud je rozšíření aktivováno
+            if(opts.stats != None):
+                self.writeStats(opts.stats, result.stats)
+
+            # v případě existujícího input souboru se ho pokusíme zavřít
+            if(opts.input != None):
+                try:
+                    inputFile.close()
+                except:
+                    self.error('Nepodařilo se zavřít soubor pro čtení vstupu: ' + opts.input, 11)
 
-        # dočasný rámec
-        if(self.TF != None):
-            for TFVariableName in self.TF:
-                if(self.TF[TFVariableName].get("value") != None):
-                    count += 1
+            return result.exitCode
+        except InterpretError as error:
+            print(error.message, file=sys.stderr)
+            return error.code
 
-        return count
+    #
+    # Uloží statistiky do souboru po řádcích v pořadí parametrů
+    #
+    def writeStats(self, path, stats):
+        try:
+            with open(path, "w") as f:
+                for name in stats:
+                    f.write(str(stats[name]) + "\n")
+        except:
+            self.error('Nepodařilo se otevřít soubor pro zápis statistik: ' + path, 12)
 
     #
     # Funkce slouží na parsování argumentů z příkazové řádky
     #
     def parseCmdArgs(self):
-        argparser = argparse.ArgumentParser(prog='python3.6 interpret.py', add_help=False, description='Interpret XML reprezentace kódu ' + self.language + '. Pro správnou funkčnost je nutná verze Python3.6.')
+        argparser = argparse.ArgumentParser(prog='python3.6 interpret.py', add_help=False, description='Interpret XML reprezentace kódu ' + interpret.language + '. Pro správnou funkčnost je nutná verze Python3.6.')
         argparser.add_argument('--help', dest='help', action='store_true', default=False, help='Nápověda.')
         argparser.add_argument('--source', dest='source', default=None, help='Vstupní soubor s XML reprezentací zdrojového kódu dle definice ze sekce.')
         argparser.add_argument('--input', dest='input', default=None, help='Soubor se vstupy pro samotnou interpretaci zadaného zdrojového kódu.')
-        argparser.add_argument('--stats', dest='stats', default=None, help='Sbírání statistik interpretace kódu. Podpora parametru --insts pro výpis počtu vykonaných instrukcí během interpretace do statistik.Podpora parametru --vars pro výpis maximálního počtu inicializovaných proměnných přítomných ve všech platných rámcích během interpretace zadaného programu do statistik.')
+        argparser.add_argument('--stats', dest='stats', default=None, help='Sbírání statistik interpretace kódu. Podpora parametru --insts pro výpis počtu vykonaných instrukcí během interpretace do statistik.Podpora parametru --vars pro výpis maximálního počtu inicializovaných proměnných přítomných ve všech platných rámcích během interpretace zadaného programu do statistik. Statistiky se zapíšou po každém vykonání programu, i ukončeném instrukcí EXIT nebo chybou (hodnoty do okamžiku chyby), ale ne po chybě před vykonáváním (parametry, vstupní soubory, XML, sémantické kontroly).')
         argparser.add_argument('--insts', dest='insts', action='store_true', default=None)
         argparser.add_argument('--vars', dest='vars', action='store_true', default=None)
+        argparser.add_argument('--engine', dest='engine', default=interpret.ENGINE_TABLE, choices=[interpret.ENGINE_TABLE, interpret.ENGINE_CLOSURE, interpret.ENGINE_TRANSPILE], help='Interpretační jádro. ' + interpret.ENGINE_TABLE + ' (výchozí) vykonává instrukce přes tabulku obslužných funkcí, ' + interpret.ENGINE_CLOSURE + ' před spuštěním přeloží každou instrukci na uzávěr s předem navázanými operandy, ' + interpret.ENGINE_TRANSPILE + ' přeloží základní bloky programu do funkcí v Pythonu.')
+        argparser.add_argument('--output-buffer', dest='outputBuffer', default=interpret.OUTPUT_BUFFER_DEFAULT, help='Velikost výstupní vyrovnávací paměti instrukce WRITE ve znacích, případně s příponou K nebo M (výchozí ' + interpret.OUTPUT_BUFFER_DEFAULT + ', 0 vypíná).')
+        argparser.add_argument('--cache-dir', dest='cacheDir', default=None, help='Adresář mezipaměti přeložených programů, opakované spuštění stejného programu se načte z mezipaměti místo z XML. Adresář mohou sdílet souběžné běhy a musí být důvěryhodný.')
+        argparser.add_argument('--cache-size', dest='cacheSize', default=interpret.CACHE_SIZE_DEFAULT, help='Maximální velikost adresáře mezipaměti v bajtech, případně s příponou K nebo M (výchozí ' + interpret.CACHE_SIZE_DEFAULT + ').')
+        argparser.add_argument('--dump-source', dest='dumpSource', default=None, help='Soubor, do kterého jádro ' + interpret.ENGINE_TRANSPILE + ' uloží vygenerovaný zdrojový kód v Pythonu.')
+        argparser.add_argument('--profile', dest='profile', default=None, help='Soubor JSON, do kterého se uloží profil interpretace: počet vykonání a čas každé instrukce (podle order), operačních kódů, návěští a funkcí volaných instrukcí CALL (inkluzivní a exkluzivní čas). Jádro ' + interpret.ENGINE_TRANSPILE + ' se profiluje po instrukcích přes uzávěry jádra ' + interpret.ENGINE_CLOSURE + '.')
+        argparser.add_argument('--profile-folded', dest='profileFolded', default=None, help='Soubor, do kterého se s --profile uloží exkluzivní časy cest zásobníkem volání ve formátu folded stacks (flame graph).')
+        argparser.add_argument('--max-insts', dest='maxInsts', default=None, help='Maximální počet vykonaných instrukcí, po jeho překročení interpretace skončí chybou 59 s order instrukce, před kterou se zastavila.')
+        argparser.add_argument('--timeout', dest='timeout', default=None, help='Maximální doba interpretace v sekundách (kontroluje se po skupinách instrukcí, nikoliv během čekání instrukce READ), po překročení chyba 59.')
+        argparser.add_argument('--max-memory', dest='maxMemory', default=None, help='Maximální rezidentní paměť procesu interpretu v bajtech, případně s příponou K, M nebo G, po překročení chyba 59.')
+        argparser.add_argument('--serve', dest='serve', default=None, help='Spustí server s předehřátým interpretem na zadaném unixovém socketu, programy se mu předávají klientem interpret_client.py (parametry jako u interpret.py, socket v proměnné prostředí INTERPRET_SOCKET).')
+        argparser.add_argument('--workers', dest='workers', default=None, help='Počet pracovních procesů serveru --serve (výchozí počet procesorů).')
+        argparser.add_argument('--batch', dest='batch', default=None, help='Spustí testy ze zadaného adresáře (soubory .src, .in, .out a .rc jako u test.php --int-only) a vypíše souhrn výsledků. Návratový kód je 0, pokud všechny testy prošly, jinak 1.')
+        argparser.add_argument('--recursive', dest='recursive', action='store_true', default=False, help='Testy --batch se hledají i rekurzivně v podadresářích.')
+        argparser.add_argument('--jobs', dest='jobs', default=None, help='Počet pracovních procesů pro --batch, --input-glob a --inputs-from (výchozí počet procesorů).')
+        argparser.add_argument('--batch-format', dest='batchFormat', default=None, choices=[Batch.FORMAT_JSON, Batch.FORMAT_HTML], help='Formát souhrnu výsledků --batch (výchozí ' + Batch.FORMAT_JSON + ').')
+        argparser.add_argument('--input-glob', dest='inputGlob', default=None, help='Vzor cest vstupních souborů (podporuje **), program se načte jednou a vykoná nad každým vstupem. Výsledky se vypíší jako řádky JSON v seřazeném pořadí vstupů, statistiky (--stats) se uvádějí u každého vstupu.')
+        argparser.add_argument('--inputs-from', dest='inputsFrom', default=None, help='Soubor se seznamem cest vstupních souborů (jedna na řádek), jinak stejné jako --input-glob.')
+        argparser.add_argument('--output-dir', dest='outputDir', default=None, help='Adresář, do kterého se s --input-glob nebo --inputs-from zapíší soubory <jméno vstupu>.out, .err, .rc a .stats místo řádků JSON.')
 
         # parsování argumentů
         result = argparser.parse_args()
@@ -1559,7 +4866,7 @@ class interpret:
         # nápověda
         if result.help == True:
             argparser.print_help()
-            sys.exit(0)
+            return None
 
         # validování argumentů
         self.validateCmdArgs(result)
@@ -1573,19 +4880,49 @@ class interpret:
     # Funkce se stará o parsování argumentů pro rozšíření --stats (záleží na pořadí)
     #
     def parseExtensionStatsParameters(self, opts):
+        opts.statsNames = []
         if(opts.stats != None):
             for arg in sys.argv:
-                if(arg == '--insts' or arg == '--vars'):
-                    self.statsParameters[arg] = 0
+                if((arg == '--insts' or arg == '--vars') and arg[2:] not in opts.statsNames):
+                    opts.statsNames.append(arg[2:])
 
     #
     # Funkce se stará o validování argumentů (nevhodné rozmezí hodnot, nevhodné kombinace argumentů atp.)
     #
-    def validateCmdArgs(self, opts): 
+    def validateCmdArgs(self, opts):
+
+        # server dostává programy v požadavcích
+        if(opts.serve != None):
+            opts.workers = self.parseProcessCount(opts.workers)
+            return
+
+        # --workers patří k serveru --serve
+        if(opts.workers != None):
+            self.error('Zadaný parametr --workers vyžaduje parametr --serve.', 10)
+
+        # dávka testů nepotřebuje --source ani --input
+        if(opts.batch != None):
+            opts.jobs = self.parseProcessCount(opts.jobs)
+            return
+
+        # --recursive a --batch-format patří k --batch
+        if(opts.recursive or opts.batchFormat != None):
+            self.error('Zadané parametry --recursive a --batch-format vyžadují parametr --batch.', 10)
+
+        # vstupy jsou dány jedním ze způsobů --input, --input-glob nebo --inputs-from
+        fanOut = opts.inputGlob != None or opts.inputsFrom != None
+        if(sum(option != None for option in (opts.input, opts.inputGlob, opts.inputsFrom)) > 1):
+            self.error('Parametry --input, --input-glob a --inputs-from se navzájem vylučují.', 10)
+        if(fanOut):
+            if(opts.profile != None):
+                self.error('Parametr --profile nelze použít s více vstupy.', 10)
+            opts.jobs = self.parseProcessCount(opts.jobs)
+        elif(opts.jobs != None or opts.outputDir != None):
+            self.error('Zadané parametry --jobs a --output-dir vyžadují parametr --batch, --input-glob nebo --inputs-from.', 10)
 
         # alespoň jeden z parametrů (--source nebo --input) musí být vždy zadán
         # pokud jeden z nich chybí, tak jsou odpovídající data načítána ze standardního vstupu.
-        if(opts.source == None and opts.input == None):
+        if(opts.source == None and opts.input == None and not fanOut):
             self.error('Alespoň jeden z parametrů (--source nebo --input) musí být vždy zadán', 10)
 
         # chybí-li při zadání --stats --insts či --vars parametr, jedná se o chybu 10
@@ -1597,12 +4934,35 @@ class interpret:
             self.error('Zadaný parametr --stats vyžaduje alespoň jeden z parametrů --insts (pro počítání instrukcí) či parametr --vars (pro počítání maximálního počtu inicializovaných proměnných).', 10)
 
     #
-    # Vypíše error message na standartní chybový výstup a ukončí program se specifikovaným kódem
+    # Vrátí cesty vstupních souborů --input-glob (seřazené) nebo --inputs-from (v pořadí souboru)
     #
-    def error(self, message, code = -1):
-        print(message, file=sys.stderr)
-        sys.exit(code)
+    def collectInputs(self, opts):
+        if(opts.inputGlob != None):
+            # glob se načítá až zde, běžné spuštění interpretu ho nepotřebuje
+            import glob
+            return sorted(path for path in glob.glob(opts.inputGlob, recursive=True) if os.path.isfile(path))
+
+        try:
+            with open(opts.inputsFrom, 'r') as file:
+                return [line.strip() for line in file if line.strip()]
+        except OSError:
+            self.error('Nepodařilo se otevřít soubor se seznamem vstupů: ' + opts.inputsFrom, 11)
+
+    #
+    # Převede počet pracovních procesů (výchozí počet procesorů)
+    #
+    def parseProcessCount(self, value):
+        if(value == None):
+            return os.cpu_count() or 1
+        if(not value.isdigit() or int(value) == 0):
+            self.error('Nevalidní počet pracovních procesů: ' + value, 10)
+        return int(value)
+
+    #
+    # Vyvolá výjimku InterpretError (podtřídu podle kódu) se zprávou a návratovým kódem
+    #
+    def error(self, message, code):
+        raise interpret.ERROR_TYPES.get(code, InterpretError)(message, code)
 
 if __name__ == "__main__":
-    interpret = interpret()
-    exit(0)
+    sys.exit(CommandLine().main())
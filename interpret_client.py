@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+#
+# Klient serveru interpretu (interpret.py --serve=SOCKET) s parametry kompatibilními s interpret.py
+# (--source, --input, --stats, --insts, --vars, --engine, --max-insts, --timeout, --max-memory). Cesta
+# k socketu se zadává parametrem --socket nebo proměnnou prostředí INTERPRET_SOCKET. Limity vykonávání
+# přepíší výchozí limity požadavku na serveru.
+#
+# Není-li server dostupný nebo parametry vyžadují víc než vykonání programu (nápověda, chyba v parametrech,
+# nečitelný soubor apod.), předá se běh přímo interpret.py, takže výstup i návratový kód zůstanou stejné.
+# Vstup ze standardního vstupu se přečte celý před vykonáním programu.
+#
+import base64, json, os, socket, sys
+
+INTERPRET = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'interpret.py')
+
+OPTIONS = ('--source', '--input', '--stats', '--engine', '--socket', '--max-insts', '--timeout', '--max-memory')
+FLAGS = ('--insts', '--vars')
+
+# limity vykonávání a jejich jména v požadavku
+LIMITS = {'--max-insts': 'maxInsts', '--timeout': 'timeout', '--max-memory': 'maxMemory'}
+
+#
+# Rozdělí parametry, vrací (parametry, statistiky v pořadí zadání, parametry pro interpret.py)
+# nebo None, pokud parametry obslouží jen interpret.py
+#
+def parseArgs(argv):
+    opts = {}
+    stats = []
+    forward = []
+    i = 0
+    while(i < len(argv)):
+        name, separator, value = argv[i].partition('=')
+        if(name in OPTIONS):
+            if(not separator):
+                i += 1
+                if(i == len(argv)):
+                    return None
+                value = argv[i]
+            if(name in opts):
+                return None
+            opts[name] = value
+            if(name != '--socket'):
+                forward += [name + '=' + value]
+        elif(argv[i] in FLAGS):
+            if(argv[i][2:] not in stats):
+                stats.append(argv[i][2:])
+            forward += [argv[i]]
+        else:
+            return None
+        i += 1
+
+    # chyby v parametrech ohlásí interpret.py
+    if('--source' not in opts and '--input' not in opts):
+        return None
+    if(stats and '--stats' not in opts):
+        return None
+
+    return opts, stats, forward
+
+#
+# Spustí přímo interpret.py, nevrací se
+#
+def fallback(argv):
+    sys.stdout.flush()
+    os.execv(sys.executable, [sys.executable, INTERPRET] + argv)
+
+#
+# Přečte celý soubor, vrací None při chybě
+#
+def readFile(path):
+    try:
+        with open(path, 'rb') as file:
+            return file.read()
+    except OSError:
+        return None
+
+def main():
+    argv = sys.argv[1:]
+    parsed = parseArgs(argv)
+    if(parsed == None):
+        fallback([arg for arg in argv if arg.partition('=')[0] != '--socket'])
+    opts, stats, forward = parsed
+
+    path = opts.get('--socket', os.environ.get('INTERPRET_SOCKET'))
+    if(path == None):
+        fallback(forward)
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except OSError:
+        connection.close()
+        fallback(forward)
+
+    request = {'stats': stats}
+    if('--engine' in opts):
+        request['engine'] = opts['--engine']
+    for option, name in LIMITS.items():
+        if(option in opts):
+            request[name] = opts[option]
+
+    # soubory se čtou před standardním vstupem, aby šlo při chybě stále předat běh interpret.py
+    inputData = sys.stdin.buffer if '--input' not in opts else readFile(opts['--input'])
+    sourceData = sys.stdin.buffer if '--source' not in opts else readFile(opts['--source'])
+    if(inputData == None or sourceData == None):
+        connection.close()
+        fallback(forward)
+    if(inputData == sys.stdin.buffer):
+        inputData = inputData.read()
+    if(sourceData == sys.stdin.buffer):
+        sourceData = sourceData.read()
+
+    request['sourceData'] = base64.b64encode(sourceData).decode('ascii')
+    request['input'] = base64.b64encode(inputData).decode('ascii')
+
+    connection.sendall(json.dumps(request).encode('utf-8'))
+    connection.shutdown(socket.SHUT_WR)
+    chunks = []
+    while True:
+        chunk = connection.recv(65536)
+        if(not chunk):
+            break
+        chunks.append(chunk)
+    connection.close()
+
+    # server pracovní proces ukončil, protože požadavek překročil časový limit
+    if(not chunks):
+        print('Server požadavek nedokončil v časovém limitu', file=sys.stderr)
+        return 59
+    response = json.loads(b''.join(chunks).decode('utf-8'))
+
+    sys.stdout.buffer.write(base64.b64decode(response['stdout']))
+    sys.stdout.flush()
+    sys.stderr.buffer.write(base64.b64decode(response['stderr']))
+    sys.stderr.flush()
+
+    # rozšíření --stats se zapisuje po každém vykonání programu (i ukončeném instrukcí EXIT nebo chybou),
+    # ne však po chybě před vykonáváním (parametry, XML, sémantika), stejně jako v interpret.py
+    if('--stats' in opts and response['stats'] != None):
+        try:
+            with open(opts['--stats'], 'w') as file:
+                for name in stats:
+                    print(response['stats'][name], file=file)
+        except OSError:
+            print('Nepodařilo se otevřít soubor pro zápis statistik: ' + opts['--stats'], file=sys.stderr)
+            return 12
+
+    return response['exitCode']
+
+if __name__ == "__main__":
+    sys.exit(main())
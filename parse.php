@@ -323,6 +323,19 @@ class Parser {
           case "POPFRAME":
           case "RETURN":
           case "BREAK":
+          case "CLEARS":
+          case "ADDS":
+          case "SUBS":
+          case "MULS":
+          case "IDIVS":
+          case "LTS":
+          case "GTS":
+          case "EQS":
+          case "ANDS":
+          case "ORS":
+          case "NOTS":
+          case "INT2CHARS":
+          case "STRI2INTS":
             if(($ecode = $this->ins($ins, $args)) != 0) {
                 return $ecode;
             }
@@ -335,6 +348,8 @@ class Parser {
             break;
           case "JUMP":
           case "CALL":
+          case "JUMPIFEQS":
+          case "JUMPIFNEQS":
             $this->jumpsCount++;
             if(($ecode = $this->ins($ins, $args, array(Parser::INS_ARG_LABEL))) != 0) {
                 return $ecode;
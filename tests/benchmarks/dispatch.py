@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+#
+# Mikrobenchmark výběru obslužné funkce instrukce.
+#
+# Porovnává původní řetězec porovnání if/elif nad opcode.upper() (před) s indexováním do tabulky
+# obslužných funkcí podle číselného identifikátoru operačního kódu (po). Vypisuje cenu jednoho
+# výběru obsluhy v ns pro každý operační kód.
+#
+# Použití: python3 tests/benchmarks/dispatch.py [počet opakování]
+#
+
+import os, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from interpret import interpret
+
+def noop(opCode, args):
+    pass
+
+#
+# Pořadí větví v původní funkci executeInstruction
+#
+CHAIN_ORDER = (
+    'CALL', 'RETURN', 'MOVE', 'CREATEFRAME', 'PUSHFRAME', 'INT2CHAR', 'INT2FLOAT', 'FLOAT2INT', 'BREAK',
+    'POPS', 'PUSHS', 'DEFVAR', 'WRITE', 'DPRINT', 'ADD', 'SUB', 'MUL', 'IDIV', 'LT', 'EQ', 'GT', 'AND',
+    'OR', 'NOT', 'STRI2INT', 'CONCAT', 'GETCHAR', 'SETCHAR', 'READ', 'STRLEN', 'TYPE', 'LABEL', 'JUMP',
+    'JUMPIFEQ', 'JUMPIFNEQ', 'EXIT',
+)
+
+#
+# Původní výběr obsluhy: lineární řetězec porovnání nad opcode.upper()
+#
+def buildChainDispatch():
+    lines = ['def executeInstruction(opcode, args):', '    upperOpCode = opcode.upper()']
+    for index, name in enumerate(CHAIN_ORDER):
+        lines.append('    ' + ('if' if index == 0 else 'elif') + '(upperOpCode == ' + repr(name) + '):')
+        lines.append('        noop(opcode, args)')
+    lines.append('    else:')
+    lines.append('        raise ValueError(opcode)')
+    namespace = {'noop': noop}
+    exec('\n'.join(lines), namespace)
+    return namespace['executeInstruction']
+
+#
+# Nový výběr obsluhy: indexování do tabulky podle opcode id
+#
+def buildTableDispatch():
+    handlers = [noop for name, method, requiredArgs in interpret.INSTRUCTIONS]
+    def executeInstruction(opcode, name, args):
+        handlers[opcode](name, args)
+    return executeInstruction
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    chain = buildChainDispatch()
+    table = buildTableDispatch()
+    args = []
+
+    print('%-12s %12s %12s %8s' % ('opcode', 'před [ns]', 'po [ns]', 'zrychlení'))
+    for name in CHAIN_ORDER:
+        opcode = interpret.OPCODES[name]
+        before = min(timeit.repeat(lambda: chain(name, args), number=number, repeat=3)) / number * 1e9
+        after = min(timeit.repeat(lambda: table(opcode, name, args), number=number, repeat=3)) / number * 1e9
+        print('%-12s %12.1f %12.1f %7.1fx' % (name, before, after, before / after))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+#
+# Benchmark interpretačních jader (--engine) na těsné smyčce.
+#
+# Vygeneruje program s cyklem o zadaném počtu iterací, spustí ho každým jádrem a vypíše dobu běhu
+# a počet vykonaných instrukcí za sekundu (počet instrukcí se bere ze statistik --insts).
+#
+# Použití: python3 tests/benchmarks/engines.py [počet iterací]
+#
+
+import os, sys, subprocess, tempfile, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, ROOT)
+from interpret import interpret
+
+#
+# Těsná smyčka: aritmetika, řetězce a podmíněný skok
+#
+PROGRAM = '''<?xml version="1.0" encoding="UTF-8"?>
+<program language="IPPcode19">
+ <instruction order="1" opcode="DEFVAR"><arg1 type="var">GF@i</arg1></instruction>
+ <instruction order="2" opcode="DEFVAR"><arg1 type="var">GF@s</arg1></instruction>
+ <instruction order="3" opcode="MOVE"><arg1 type="var">GF@i</arg1><arg2 type="int">0</arg2></instruction>
+ <instruction order="4" opcode="LABEL"><arg1 type="label">loop</arg1></instruction>
+ <instruction order="5" opcode="ADD"><arg1 type="var">GF@i</arg1><arg2 type="var">GF@i</arg2><arg3 type="int">1</arg3></instruction>
+ <instruction order="6" opcode="MOVE"><arg1 type="var">GF@s</arg1><arg2 type="string">ab</arg2></instruction>
+ <instruction order="7" opcode="CONCAT"><arg1 type="var">GF@s</arg1><arg2 type="var">GF@s</arg2><arg3 type="string">c</arg3></instruction>
+ <instruction order="8" opcode="JUMPIFNEQ"><arg1 type="label">loop</arg1><arg2 type="var">GF@i</arg2><arg3 type="int">%d</arg3></instruction>
+ <instruction order="9" opcode="WRITE"><arg1 type="var">GF@i</arg1></instruction>
+</program>
+'''
+
+ENGINES = (interpret.ENGINE_TABLE, interpret.ENGINE_CLOSURE, interpret.ENGINE_TRANSPILE)
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'loop.xml')
+        stats = os.path.join(directory, 'stats')
+        with open(source, 'w') as f:
+            f.write(PROGRAM % iterations)
+
+        print('%-10s %10s %14s' % ('jádro', 'čas [s]', 'instrukcí/s'))
+        for engine in ENGINES:
+            start = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(ROOT, 'interpret.py'), '--source=' + source, '--input=' + os.devnull,
+                '--engine=' + engine, '--stats=' + stats, '--insts'], stdout=subprocess.DEVNULL, check=True)
+            elapsed = time.perf_counter() - start
+            with open(stats) as f:
+                insts = int(f.readline())
+            print('%-10s %10.3f %14.0f' % (engine, elapsed, insts / elapsed))
+
+if __name__ == "__main__":
+    main()
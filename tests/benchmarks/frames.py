@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+#
+# Benchmark zásobárny lokálních rámců na hluboké rekurzi.
+#
+# Vygeneruje program, který opakovaně zanoří rekurzivní funkci (CREATEFRAME, PUSHFRAME, ...,
+# POPFRAME, RETURN) do zadané hloubky, spustí ho každým jádrem a vypíše dobu běhu a počet
+# alokovaných a znovu použitých rámců (bere se z výpisu instrukce BREAK na konci programu).
+#
+# Použití: python3 tests/benchmarks/frames.py [hloubka rekurze] [počet opakování]
+#
+
+import os, re, sys, subprocess, tempfile, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, ROOT)
+from interpret import interpret
+
+#
+# Rekurzivní funkce rec sníží GF@n až na nulu, každé zanoření má vlastní lokální rámec
+#
+PROGRAM = '''<?xml version="1.0" encoding="UTF-8"?>
+<program language="IPPcode19">
+ <instruction order="1" opcode="DEFVAR"><arg1 type="var">GF@n</arg1></instruction>
+ <instruction order="2" opcode="DEFVAR"><arg1 type="var">GF@i</arg1></instruction>
+ <instruction order="3" opcode="MOVE"><arg1 type="var">GF@i</arg1><arg2 type="int">0</arg2></instruction>
+ <instruction order="4" opcode="LABEL"><arg1 type="label">repeat</arg1></instruction>
+ <instruction order="5" opcode="MOVE"><arg1 type="var">GF@n</arg1><arg2 type="int">%d</arg2></instruction>
+ <instruction order="6" opcode="CALL"><arg1 type="label">rec</arg1></instruction>
+ <instruction order="7" opcode="ADD"><arg1 type="var">GF@i</arg1><arg2 type="var">GF@i</arg2><arg3 type="int">1</arg3></instruction>
+ <instruction order="8" opcode="JUMPIFNEQ"><arg1 type="label">repeat</arg1><arg2 type="var">GF@i</arg2><arg3 type="int">%d</arg3></instruction>
+ <instruction order="9" opcode="WRITE"><arg1 type="var">GF@i</arg1></instruction>
+ <instruction order="10" opcode="BREAK"></instruction>
+ <instruction order="11" opcode="JUMP"><arg1 type="label">end</arg1></instruction>
+ <instruction order="12" opcode="LABEL"><arg1 type="label">rec</arg1></instruction>
+ <instruction order="13" opcode="CREATEFRAME"></instruction>
+ <instruction order="14" opcode="PUSHFRAME"></instruction>
+ <instruction order="15" opcode="DEFVAR"><arg1 type="var">LF@n</arg1></instruction>
+ <instruction order="16" opcode="MOVE"><arg1 type="var">LF@n</arg1><arg2 type="var">GF@n</arg2></instruction>
+ <instruction order="17" opcode="JUMPIFEQ"><arg1 type="label">base</arg1><arg2 type="var">LF@n</arg2><arg3 type="int">0</arg3></instruction>
+ <instruction order="18" opcode="SUB"><arg1 type="var">GF@n</arg1><arg2 type="var">LF@n</arg2><arg3 type="int">1</arg3></instruction>
+ <instruction order="19" opcode="CALL"><arg1 type="label">rec</arg1></instruction>
+ <instruction order="20" opcode="LABEL"><arg1 type="label">base</arg1></instruction>
+ <instruction order="21" opcode="POPFRAME"></instruction>
+ <instruction order="22" opcode="RETURN"></instruction>
+ <instruction order="23" opcode="LABEL"><arg1 type="label">end</arg1></instruction>
+</program>
+'''
+
+ENGINES = (interpret.ENGINE_TABLE, interpret.ENGINE_CLOSURE, interpret.ENGINE_TRANSPILE)
+FRAMES_REGEX = re.compile(r'Alokované rámce: (\d+), znovu použité rámce: (\d+)')
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'frames.xml')
+        with open(source, 'w') as f:
+            f.write(PROGRAM % (depth, repeats))
+
+        print('%-10s %10s %12s %12s' % ('jádro', 'čas [s]', 'alokované', 'znovu použité'))
+        for engine in ENGINES:
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, os.path.join(ROOT, 'interpret.py'), '--source=' + source, '--input=' + os.devnull,
+                '--engine=' + engine], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+            elapsed = time.perf_counter() - start
+            assert int(result.stdout) == repeats
+            allocated, reused = FRAMES_REGEX.search(result.stderr.decode()).groups()
+            print('%-10s %10.3f %12s %12s' % (engine, elapsed, allocated, reused))
+
+if __name__ == "__main__":
+    main()
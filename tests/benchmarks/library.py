@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+#
+# Benchmark opakovaného spouštění krátkého programu.
+#
+# Porovnává spuštění nového procesu interpretu pro každý běh (před) s knihovním rozhraním, kde se
+# program načte jednou a v jednom procesu se opakovaně spouští funkcí run (po). Vypisuje počet
+# běhů za sekundu.
+#
+# Použití: python3 tests/benchmarks/library.py [počet běhů]
+#
+
+import os, sys, subprocess, tempfile, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, ROOT)
+from interpret import interpret
+
+#
+# Program přečte číslo a vypíše součet čísel od 1 do něj
+#
+PROGRAM = '''<?xml version="1.0" encoding="UTF-8"?>
+<program language="IPPcode19">
+ <instruction order="1" opcode="DEFVAR"><arg1 type="var">GF@n</arg1></instruction>
+ <instruction order="2" opcode="DEFVAR"><arg1 type="var">GF@sum</arg1></instruction>
+ <instruction order="3" opcode="READ"><arg1 type="var">GF@n</arg1><arg2 type="type">int</arg2></instruction>
+ <instruction order="4" opcode="MOVE"><arg1 type="var">GF@sum</arg1><arg2 type="int">0</arg2></instruction>
+ <instruction order="5" opcode="LABEL"><arg1 type="label">loop</arg1></instruction>
+ <instruction order="6" opcode="JUMPIFEQ"><arg1 type="label">end</arg1><arg2 type="var">GF@n</arg2><arg3 type="int">0</arg3></instruction>
+ <instruction order="7" opcode="ADD"><arg1 type="var">GF@sum</arg1><arg2 type="var">GF@sum</arg2><arg3 type="var">GF@n</arg3></instruction>
+ <instruction order="8" opcode="SUB"><arg1 type="var">GF@n</arg1><arg2 type="var">GF@n</arg2><arg3 type="int">1</arg3></instruction>
+ <instruction order="9" opcode="JUMP"><arg1 type="label">loop</arg1></instruction>
+ <instruction order="10" opcode="LABEL"><arg1 type="label">end</arg1></instruction>
+ <instruction order="11" opcode="WRITE"><arg1 type="var">GF@sum</arg1></instruction>
+</program>
+'''
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'sum.xml')
+        input = os.path.join(directory, 'sum.in')
+        with open(source, 'w') as f:
+            f.write(PROGRAM)
+        with open(input, 'w') as f:
+            f.write('100\n')
+
+        print('%-12s %10s %12s' % ('spouštění', 'čas [s]', 'běhů/s'))
+
+        start = time.perf_counter()
+        for run in range(runs):
+            result = subprocess.run([sys.executable, os.path.join(ROOT, 'interpret.py'), '--source=' + source, '--input=' + input],
+                stdout=subprocess.PIPE, check=True)
+            assert result.stdout == b'5050'
+        elapsed = time.perf_counter() - start
+        print('%-12s %10.3f %12.0f' % ('proces', elapsed, runs / elapsed))
+
+        start = time.perf_counter()
+        program = interpret()
+        program.load(source)
+        for run in range(runs):
+            assert program.run(input = '100\n').output == b'5050'
+        elapsed = time.perf_counter() - start
+        print('%-12s %10.3f %12.0f' % ('knihovna', elapsed, runs / elapsed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+#
+# Benchmark režie limitů vykonávání (--max-insts, --timeout, --max-memory).
+#
+# Spustí stejný program každým jádrem bez limitů a s limity, které se nepřekročí, a vypíše nejlepší
+# dobu ze tří běhů. Nakonec ověří, že nekonečná smyčka skončí chybou 59 po zadaném počtu instrukcí.
+#
+# Použití: python3 tests/benchmarks/limits.py [počet iterací]
+#
+
+import os, sys, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, ROOT)
+from interpret import interpret, LimitExceededError
+
+#
+# Smyčka s aritmetikou, řetězci a podmíněným skokem, po dosažení počtu iterací skok na návěští loop
+# (nekonečná smyčka) nebo konec programu
+#
+PROGRAM = '''<?xml version="1.0" encoding="UTF-8"?>
+<program language="IPPcode19">
+ <instruction order="1" opcode="DEFVAR"><arg1 type="var">GF@i</arg1></instruction>
+ <instruction order="2" opcode="DEFVAR"><arg1 type="var">GF@s</arg1></instruction>
+ <instruction order="3" opcode="MOVE"><arg1 type="var">GF@i</arg1><arg2 type="int">0</arg2></instruction>
+ <instruction order="4" opcode="LABEL"><arg1 type="label">loop</arg1></instruction>
+ <instruction order="5" opcode="ADD"><arg1 type="var">GF@i</arg1><arg2 type="var">GF@i</arg2><arg3 type="int">1</arg3></instruction>
+ <instruction order="6" opcode="MOVE"><arg1 type="var">GF@s</arg1><arg2 type="string">ab</arg2></instruction>
+ <instruction order="7" opcode="CONCAT"><arg1 type="var">GF@s</arg1><arg2 type="var">GF@s</arg2><arg3 type="string">c</arg3></instruction>
+ <instruction order="8" opcode="%s"><arg1 type="label">loop</arg1><arg2 type="var">GF@i</arg2><arg3 type="int">%d</arg3></instruction>
+ <instruction order="9" opcode="WRITE"><arg1 type="var">GF@i</arg1></instruction>
+</program>
+'''
+
+LIMITS = {'maxInsts': 10 ** 12, 'timeout': 3600, 'maxMemory': '64G'}
+
+def measure(program):
+    best = None
+    for run in range(3):
+        start = time.perf_counter()
+        program.run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return best
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    source = (PROGRAM % ('JUMPIFNEQ', iterations)).encode('utf-8')
+
+    print('%-10s %12s %12s %10s' % ('jádro', 'bez [s]', 'limity [s]', 'režie'))
+    for engine in (interpret.ENGINE_TABLE, interpret.ENGINE_CLOSURE, interpret.ENGINE_TRANSPILE):
+        plain = interpret(engine = engine)
+        plain.load(source)
+        limited = interpret(engine = engine, **LIMITS)
+        limited.load(source)
+
+        before = measure(plain)
+        after = measure(limited)
+        print('%-10s %12.3f %12.3f %9.1f%%' % (engine, before, after, (after / before - 1) * 100))
+
+    # nekonečná smyčka (JUMPIFEQ nikdy neskočí za smyčku)
+    for engine in (interpret.ENGINE_TABLE, interpret.ENGINE_CLOSURE, interpret.ENGINE_TRANSPILE):
+        program = interpret(engine = engine, maxInsts = 100000)
+        program.load((PROGRAM % ('JUMPIFNEQ', -1)).encode('utf-8'))
+        try:
+            program.run()
+            raise AssertionError('smyčka neskončila')
+        except LimitExceededError as error:
+            assert error.code == 59
+            print(engine + ': ' + error.message)
+
+if __name__ == "__main__":
+    main()
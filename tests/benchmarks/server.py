@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+#
+# Kontrola izolace požadavků serveru (interpret.py --serve) proti zacykleným programům.
+#
+# Spustí server s několika pracovními procesy a pošle mu přes interpret_client.py víc nekonečných smyček,
+# než má pracovních procesů. Klienty ukončí jako časový limit testovacího skriptu a ověří, že server
+# další požadavek obslouží (pracovní procesy se neblokují), že limit --timeout klienta skončí chybou 59
+# a že klient zapíše statistiky --stats stejně jako interpret.py (po EXIT i chybě za běhu, ne po chybě
+# před vykonáváním). Vypíše doby odpovědí.
+#
+# Použití: python3 tests/benchmarks/server.py [počet pracovních procesů]
+#
+
+import os, subprocess, sys, tempfile, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+INTERPRET = os.path.join(ROOT, 'interpret.py')
+CLIENT = os.path.join(ROOT, 'interpret_client.py')
+
+#
+# Nekonečná smyčka
+#
+LOOP = '''<?xml version="1.0" encoding="UTF-8"?>
+<program language="IPPcode19">
+ <instruction order="1" opcode="LABEL"><arg1 type="label">loop</arg1></instruction>
+ <instruction order="2" opcode="JUMP"><arg1 type="label">loop</arg1></instruction>
+</program>
+'''
+
+#
+# Krátký program ukončený instrukcí EXIT
+#
+EXIT = '''<?xml version="1.0" encoding="UTF-8"?>
+<program language="IPPcode19">
+ <instruction order="1" opcode="DEFVAR"><arg1 type="var">GF@a</arg1></instruction>
+ <instruction order="2" opcode="MOVE"><arg1 type="var">GF@a</arg1><arg2 type="int">1</arg2></instruction>
+ <instruction order="3" opcode="WRITE"><arg1 type="var">GF@a</arg1></instruction>
+ <instruction order="4" opcode="EXIT"><arg1 type="int">3</arg1></instruction>
+</program>
+'''
+
+#
+# Chyba za běhu (neexistující proměnná) po dvou instrukcích a sémantická chyba (skok na neexistující návěští)
+#
+ERROR = '''<?xml version="1.0" encoding="UTF-8"?>
+<program language="IPPcode19">
+ <instruction order="1" opcode="DEFVAR"><arg1 type="var">GF@a</arg1></instruction>
+ <instruction order="2" opcode="MOVE"><arg1 type="var">GF@a</arg1><arg2 type="int">1</arg2></instruction>
+ <instruction order="3" opcode="WRITE"><arg1 type="var">GF@b</arg1></instruction>
+</program>
+'''
+
+INVALID = '''<?xml version="1.0" encoding="UTF-8"?>
+<program language="IPPcode19">
+ <instruction order="1" opcode="JUMP"><arg1 type="label">end</arg1></instruction>
+</program>
+'''
+
+def client(socket, source, *args):
+    return [sys.executable, CLIENT, '--socket=' + socket, '--source=' + source, '--input=' + os.devnull] + list(args)
+
+#
+# Spustí program klientem i přímo interpret.py, vrací (návratový kód, obsah souboru statistik nebo None)
+# pro oba běhy
+#
+def compareStats(socket, source, stats):
+    results = []
+    for command in (client(socket, source), [sys.executable, INTERPRET, '--source=' + source, '--input=' + os.devnull]):
+        if(os.path.exists(stats)):
+            os.unlink(stats)
+        result = subprocess.run(command + ['--stats=' + stats, '--insts', '--vars'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10)
+        results.append((result.returncode, readStats(stats)))
+    return results
+
+def readStats(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+def write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    with tempfile.TemporaryDirectory() as directory:
+        socket = os.path.join(directory, 'interpret.sock')
+        loop = os.path.join(directory, 'loop.xml')
+        exit = os.path.join(directory, 'exit.xml')
+        stats = os.path.join(directory, 'stats')
+        error = os.path.join(directory, 'error.xml')
+        invalid = os.path.join(directory, 'invalid.xml')
+        write(loop, LOOP)
+        write(exit, EXIT)
+        write(error, ERROR)
+        write(invalid, INVALID)
+
+        server = subprocess.Popen([sys.executable, INTERPRET, '--serve=' + socket, '--workers=' + str(workers)])
+        try:
+            while not os.path.exists(socket):
+                time.sleep(0.05)
+
+            # víc zacyklených požadavků než pracovních procesů, klienti se ukončí jako po časovém limitu
+            clients = [subprocess.Popen(client(socket, loop), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) for run in range(2 * workers)]
+            time.sleep(0.5)
+            for process in clients:
+                process.kill()
+                process.wait()
+
+            # pracovní procesy zjistí zavřené spojení a obslouží další požadavek
+            start = time.perf_counter()
+            result = subprocess.run(client(socket, exit), stdout=subprocess.PIPE, timeout=10)
+            elapsed = time.perf_counter() - start
+            assert result.returncode == 3 and result.stdout == b'1', result
+            print('%-36s %8.3f s' % ('odpověď po zacyklených klientech', elapsed))
+
+            # statistiky klienta a interpret.py po EXIT, chybě za běhu a chybě před vykonáváním
+            for source, exitCode, written in ((exit, 3, '3\n1\n'), (error, 54, '2\n1\n'), (invalid, 52, None)):
+                results = compareStats(socket, source, stats)
+                assert results == [(exitCode, written)] * 2, (source, results)
+
+            # limit požadavku
+            start = time.perf_counter()
+            result = subprocess.run(client(socket, loop, '--timeout=0.5'), stderr=subprocess.PIPE, timeout=10)
+            elapsed = time.perf_counter() - start
+            assert result.returncode == 59, result
+            print('%-36s %8.3f s' % ('zacyklený požadavek s --timeout=0.5', elapsed))
+
+            # nevalidní limit v požadavku
+            result = subprocess.run(client(socket, loop, '--max-insts=x'), stderr=subprocess.DEVNULL, timeout=10)
+            assert result.returncode == 10, result
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
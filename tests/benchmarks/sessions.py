@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+#
+# Benchmark souběžných interaktivních relací v jedné smyčce asyncio (interpret.runAsync).
+#
+# Každá relace má vlastní klon načteného programu, vstup instrukce READ dostává po řádcích přes
+# asyncio.StreamReader (řádek za každou obrátku smyčky událostí) a výstup instrukce WRITE zapisuje do
+# asynchronního zapisovače. Vypíše počet dokončených relací za sekundu na jedno jádro (jeden proces),
+# počet vykonaných instrukcí za sekundu a nárůst rezidentní paměti na jednu souběžnou relaci.
+#
+# Použití: python3 tests/benchmarks/sessions.py [počet relací] [počet vstupů na relaci] [budget]
+#
+
+import asyncio, os, sys, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, ROOT)
+from interpret import interpret
+
+#
+# Interaktivní program: čte čísla a po každém vypíše průběžný součet, končí číslem 0 (nebo koncem vstupu)
+#
+PROGRAM = '''<?xml version="1.0" encoding="UTF-8"?>
+<program language="IPPcode19">
+ <instruction order="1" opcode="DEFVAR"><arg1 type="var">GF@n</arg1></instruction>
+ <instruction order="2" opcode="DEFVAR"><arg1 type="var">GF@sum</arg1></instruction>
+ <instruction order="3" opcode="MOVE"><arg1 type="var">GF@sum</arg1><arg2 type="int">0</arg2></instruction>
+ <instruction order="4" opcode="LABEL"><arg1 type="label">loop</arg1></instruction>
+ <instruction order="5" opcode="READ"><arg1 type="var">GF@n</arg1><arg2 type="type">int</arg2></instruction>
+ <instruction order="6" opcode="JUMPIFEQ"><arg1 type="label">end</arg1><arg2 type="var">GF@n</arg2><arg3 type="int">0</arg3></instruction>
+ <instruction order="7" opcode="ADD"><arg1 type="var">GF@sum</arg1><arg2 type="var">GF@sum</arg2><arg3 type="var">GF@n</arg3></instruction>
+ <instruction order="8" opcode="WRITE"><arg1 type="var">GF@sum</arg1></instruction>
+ <instruction order="9" opcode="WRITE"><arg1 type="string">\\010</arg1></instruction>
+ <instruction order="10" opcode="JUMP"><arg1 type="label">loop</arg1></instruction>
+ <instruction order="11" opcode="LABEL"><arg1 type="label">end</arg1></instruction>
+</program>
+'''
+
+#
+# Asynchronní zapisovač, který jen počítá zapsané bajty
+#
+class CountingWriter:
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+    async def drain(self):
+        pass
+
+def getMemoryUsage():
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return None
+
+async def feed(reader, inputs):
+    for number in range(1, inputs + 1):
+        reader.feed_data(b'%d\n' % number)
+        await asyncio.sleep(0)
+    reader.feed_eof()
+
+async def session(program, inputs, budget, started):
+    reader = asyncio.StreamReader()
+    writer = CountingWriter()
+    started.append(getMemoryUsage())
+    feeder = asyncio.ensure_future(feed(reader, inputs))
+    result = await program.clone().runAsync(reader, writer, budget = budget)
+    await feeder
+    assert result.exitCode == 0 and writer.size > 0
+    return result.stats['insts']
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    inputs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    budget = int(sys.argv[3]) if len(sys.argv) > 3 else interpret.ASYNC_BUDGET
+
+    program = interpret(stats = ['insts'])
+    program.load(PROGRAM.encode('utf-8'))
+
+    loop = asyncio.get_event_loop()
+    started = []
+    before = getMemoryUsage()
+    start = time.perf_counter()
+    instructions = loop.run_until_complete(asyncio.gather(*[session(program, inputs, budget, started) for run in range(sessions)]))
+    elapsed = time.perf_counter() - start
+
+    print('relací: %d, vstupů na relaci: %d, budget: %d' % (sessions, inputs, budget))
+    print('%-28s %12.3f' % ('čas [s]', elapsed))
+    print('%-28s %12.0f' % ('relací/s na jádro', sessions / elapsed))
+    print('%-28s %12.0f' % ('instrukcí/s', sum(instructions) / elapsed))
+    if(before != None):
+        # všechny relace běží souběžně od chvíle, kdy poslední z nich začala
+        print('%-28s %12.1f' % ('paměť na relaci [KiB]', (max(started) - before) / sessions / 1024))
+
+if __name__ == "__main__":
+    main()
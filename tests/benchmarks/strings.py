@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+#
+# Benchmark sestavování dlouhého řetězce instrukcí CONCAT po jednom znaku.
+#
+# Vygeneruje program, který připojuje znak na konec proměnné (CONCAT GF@s GF@s string@a), dokud
+# řetězec nemá zadanou délku, poté každý druhý znak přepíše instrukcí SETCHAR na prvních 100000
+# pozicích a vypíše délku řetězce. Program se spustí každým jádrem a vypíše se doba běhu a počet
+# připojených znaků za sekundu.
+#
+# Použití: python3 tests/benchmarks/strings.py [délka řetězce] [jádro ...]
+#
+
+import os, sys, subprocess, tempfile, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, ROOT)
+from interpret import interpret
+
+PROGRAM = '''<?xml version="1.0" encoding="UTF-8"?>
+<program language="IPPcode19">
+ <instruction order="1" opcode="DEFVAR"><arg1 type="var">GF@i</arg1></instruction>
+ <instruction order="2" opcode="DEFVAR"><arg1 type="var">GF@s</arg1></instruction>
+ <instruction order="3" opcode="MOVE"><arg1 type="var">GF@i</arg1><arg2 type="int">0</arg2></instruction>
+ <instruction order="4" opcode="MOVE"><arg1 type="var">GF@s</arg1><arg2 type="string"></arg2></instruction>
+ <instruction order="5" opcode="LABEL"><arg1 type="label">append</arg1></instruction>
+ <instruction order="6" opcode="CONCAT"><arg1 type="var">GF@s</arg1><arg2 type="var">GF@s</arg2><arg3 type="string">a</arg3></instruction>
+ <instruction order="7" opcode="ADD"><arg1 type="var">GF@i</arg1><arg2 type="var">GF@i</arg2><arg3 type="int">1</arg3></instruction>
+ <instruction order="8" opcode="JUMPIFNEQ"><arg1 type="label">append</arg1><arg2 type="var">GF@i</arg2><arg3 type="int">%d</arg3></instruction>
+ <instruction order="9" opcode="MOVE"><arg1 type="var">GF@i</arg1><arg2 type="int">0</arg2></instruction>
+ <instruction order="10" opcode="LABEL"><arg1 type="label">set</arg1></instruction>
+ <instruction order="11" opcode="SETCHAR"><arg1 type="var">GF@s</arg1><arg2 type="var">GF@i</arg2><arg3 type="string">b</arg3></instruction>
+ <instruction order="12" opcode="ADD"><arg1 type="var">GF@i</arg1><arg2 type="var">GF@i</arg2><arg3 type="int">2</arg3></instruction>
+ <instruction order="13" opcode="JUMPIFNEQ"><arg1 type="label">set</arg1><arg2 type="var">GF@i</arg2><arg3 type="int">%d</arg3></instruction>
+ <instruction order="14" opcode="STRLEN"><arg1 type="var">GF@i</arg1><arg2 type="var">GF@s</arg2></instruction>
+ <instruction order="15" opcode="WRITE"><arg1 type="var">GF@i</arg1></instruction>
+</program>
+'''
+
+ENGINES = (interpret.ENGINE_TABLE, interpret.ENGINE_CLOSURE, interpret.ENGINE_TRANSPILE)
+
+def main():
+    length = int(sys.argv[1]) if len(sys.argv) > 1 else 10 * 1024 * 1024
+    engines = sys.argv[2:] or ENGINES
+    updates = min(length, 100000) // 2 * 2
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'strings.xml')
+        with open(source, 'w') as f:
+            f.write(PROGRAM % (length, updates))
+
+        print('%-10s %10s %14s' % ('jádro', 'čas [s]', 'znaků/s'))
+        for engine in engines:
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, os.path.join(ROOT, 'interpret.py'), '--source=' + source, '--input=' + os.devnull,
+                '--engine=' + engine], stdout=subprocess.PIPE, check=True)
+            elapsed = time.perf_counter() - start
+            assert int(result.stdout) == length
+            print('%-10s %10.3f %14.0f' % (engine, elapsed, length / elapsed))
+
+if __name__ == "__main__":
+    main()